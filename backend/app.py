@@ -1,288 +1,400 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+import hashlib
 import os
+import threading
+import time
 from services.db import Database
-from pymysql.err import IntegrityError
-from datetime import datetime, date, timedelta
+from services.metricas import METRICAS, AmostradorPerfil, encerrar_fases, iniciar_fases
+from services import comandos, eventos, migracoes, parametros, replicas, roteiros, rotas, tenants
+from services.pool import PoolEsgotado
+from services.serializacao import csv_do_bloco, dumps_json, serializar_lista
+from pymysql.err import OperationalError
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
 # ======================================================
-# BANCO DE DADOS
+# BANCO DE DADOS (criado no primeiro uso, um por processo)
 # ======================================================
-DB = Database(
-    host=os.getenv("DB_HOST", "localhost"),
-    port=int(os.getenv("DB_PORT", 3306)),
-    user=os.getenv("DB_USER", "appuser"),
-    password=os.getenv("DB_PASSWORD", "app_password_here"),
-    database=os.getenv("DB_NAME", "medcore")
-)
-
-# ======================================================
-# FUNÇÕES AUXILIARES — SERIALIZA JSON
-# ======================================================
-def serializar(obj):
-    if isinstance(obj, timedelta):
-        return str(obj)
-
-    if isinstance(obj, datetime):
-        # Garante o formato dia/mês/ano para data e hora
-        return obj.strftime('%d/%m/%Y %H:%M:%S')
-
-    if isinstance(obj, date):
-        # Garante o formato dia/mês/ano para datas
-        return obj.strftime('%d/%m/%Y')
-
-    return obj
+_DB = None
+_DB_PID = None
+_DB_LOCK = threading.Lock()
+
+
+def conexao_padrao():
+    return {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': int(os.getenv("DB_PORT", 3306)),
+        'user': os.getenv("DB_USER", "appuser"),
+        'password': os.getenv("DB_PASSWORD", "app_password_here"),
+        'database': os.getenv("DB_NAME", "medcore"),
+    }
+
+
+def criar_database(tenant=None, conexao=None):
+    primario = dict(conexao or conexao_padrao())
+    lista_replicas = primario.pop('replicas', None)
+    if lista_replicas is None:
+        # DB_REPLICAS é do banco padrão; as clínicas declaram as suas no registro
+        lista_replicas = os.getenv("DB_REPLICAS") if tenant is None else None
+    arquivo_auditoria = os.getenv("AUDITORIA_ARQUIVO") or None
+    if tenant and arquivo_auditoria:
+        # Arquivo de auditoria separado por clínica
+        arquivo_auditoria = os.path.join(arquivo_auditoria, tenant)
+    return Database(
+        **primario,
+        # Quem espera o MySQL subir é o deploy (docker-compose/migrações), não a requisição
+        retries=int(os.getenv("DB_RETRIES", 1)),
+        delay=float(os.getenv("DB_RETRY_DELAY", 3)),
+        pool_min=int(os.getenv("DB_POOL_MIN", 1)),
+        pool_max=int(os.getenv("DB_POOL_MAX", 10)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        pool_max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+        auditoria_modo=os.getenv("AUDITORIA_MODO", "assincrono"),
+        auditoria_lote=int(os.getenv("AUDITORIA_LOTE", 200)),
+        auditoria_intervalo=float(os.getenv("AUDITORIA_INTERVALO", 1.0)),
+        contadores_ttl=float(os.getenv("CONTADORES_TTL", 2.0)),
+        cache_backend=os.getenv("CACHE_BACKEND", "memoria"),
+        cache_max_itens=int(os.getenv("CACHE_MAX_ITENS", 10000)),
+        # Padrão por backend (services/cache.py): 30 s em memória, 300 s no Redis
+        cache_ttl=float(os.getenv("CACHE_TTL", 0)) or None,
+        cache_redis_url=os.getenv("CACHE_REDIS_URL"),
+        slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", 500)),
+        arquivo_auditoria=arquivo_auditoria,
+        replicas_leitura=replicas.ler_replicas(lista_replicas, primario),
+        replica_atraso_maximo=float(os.getenv("DB_REPLICA_ATRASO_MAX", 5.0)),
+        replica_intervalo=float(os.getenv("DB_REPLICA_INTERVALO", 5.0)),
+        tenant=tenant,
+        autocomplete_intervalo=float(os.getenv("AUTOCOMPLETE_INTERVALO", 10))
+    )
 
 
-def serializar_lista(lista):
-    dados = []
-    for item in lista:
-        novo = {}
-        for chave, valor in item.items():
-            novo[chave] = serializar(valor)
-        dados.append(novo)
-    return dados
+def criar_tenants():
+    # Sem TENANTS/TENANTS_ARQUIVO: uma clínica só, com o banco do DB_NAME
+    registro = tenants.ler_registro(os.getenv("TENANTS"), os.getenv("TENANTS_ARQUIVO"), conexao_padrao())
+    if not registro:
+        return None
+    return tenants.Tenants(
+        registro,
+        criar_database,
+        ocioso=float(os.getenv("TENANT_OCIOSO", tenants.OCIOSO)),
+        maximo_ativos=int(os.getenv("TENANT_MAXIMO_ATIVOS", tenants.MAXIMO_ATIVOS))
+    )
 
 
-# ======================================================
-# CARGOS
-# ======================================================
-@app.route('/api/cargos', methods=['GET'])
-def listar_cargos():
-    nome = request.args.get('nome', '')
-    return jsonify(DB.buscar_cargos_por_nome(nome)), 200
+TENANTS = criar_tenants()
 
 
-@app.route('/api/cargos', methods=['POST'])
-def adicionar_cargo():
-    data = request.json or {}
+# Só destes endereços o X-Clinica vale (o proxy que o define); dos demais é ignorado
+PROXIES_CONFIAVEIS = tenants.ler_proxies(os.getenv("TENANT_PROXIES"))
 
-    if not data.get('nome') or data.get('salario') is None:
-        return jsonify({'erro': 'Nome e salário são obrigatórios'}), 400
 
-    novo_id = DB.inserir_cargo(
-        data['nome'],
-        data['salario'],
-        data.get('descricao', '')
+def tenant_da_requisicao():
+    return tenants.resolver(
+        request.headers.get(tenants.CABECALHO),
+        request.host,
+        dominio=os.getenv("TENANT_DOMINIO"),
+        padrao=os.getenv("TENANT_PADRAO"),
+        origem=request.remote_addr,
+        proxies=PROXIES_CONFIAVEIS
     )
-    return jsonify({'id': novo_id}), 201
 
 
-@app.route('/api/cargos/<int:id>', methods=['PUT'])
-def editar_cargo(id):
-    atualizado = DB.atualizar_cargo(
-        id,
-        request.json.get('nome'),
-        request.json.get('salario'),
-        request.json.get('descricao')
-    )
+def get_db():
+    """Database deste processo (ou da clínica da requisição). Importar o app não conecta."""
+    if TENANTS is not None:
+        if 'tenant_db' not in g:
+            nome = tenant_da_requisicao()
+            g.tenant_db = TENANTS.obter(nome)
+            g.tenant = nome  # devolvido no teardown
+        return g.tenant_db
 
-    if atualizado:
-        return jsonify({'mensagem': 'Cargo atualizado'}), 200
+    global _DB, _DB_PID
+    if _DB is None or _DB_PID != os.getpid():
+        with _DB_LOCK:
+            if _DB is None or _DB_PID != os.getpid():
+                # Um Database herdado do master (gunicorn --preload) tem sockets e a thread de
+                # auditoria do outro processo: o worker abandona a referência e cria o seu
+                _DB = criar_database()
+                _DB_PID = os.getpid()
+    return _DB
 
-    return jsonify({'erro': 'Cargo não encontrado'}), 404
 
+def db_se_criado():
+    # Para rotas de monitoramento, que não devem abrir conexão só para responder
+    if TENANTS is not None:
+        return None
+    return _DB if _DB_PID == os.getpid() else None
 
-@app.route('/api/cargos/<int:id>', methods=['DELETE'])
-def remover_cargo(id):
-    try:
-        if DB.deletar_cargo(id):
-            return jsonify({'mensagem': 'Cargo excluído'}), 200
-        return jsonify({'erro': 'Cargo não encontrado'}), 404
-    except IntegrityError:
-        return jsonify({'erro': 'Existem funcionários vinculados a este cargo'}), 400
+
+# Amostragem opcional com cProfile: PROFILE_ROTA=/api/funcionarios PROFILE_TAXA=0.05
+PERFIL = AmostradorPerfil(
+    os.getenv("PROFILE_ROTA"),
+    taxa=float(os.getenv("PROFILE_TAXA", 0.01)),
+    diretorio=os.getenv("PROFILE_DIR", "perfis")
+) if os.getenv("PROFILE_ROTA") else None
 
 
 # ======================================================
-# FUNCIONÁRIOS
+# INSTRUMENTAÇÃO
 # ======================================================
-@app.route('/api/funcionarios', methods=['GET'])
-def listar_funcionarios():
-    return jsonify(DB.buscar_funcionarios(
-        request.args.get('nome', ''),
-        request.args.get('cpf', '')
-    )), 200
+def rota_atual():
+    # O padrão da rota (/api/pacientes/<int:id>), não o caminho, para não explodir as séries
+    return request.url_rule.rule if request.url_rule else 'desconhecida'
 
 
-@app.route('/api/funcionarios', methods=['POST'])
-def adicionar_funcionario():
-    data = request.json or {}
+@api.before_app_request
+def iniciar_medicao():
+    g.inicio = time.perf_counter()
+    iniciar_fases()
+    replicas.nova_requisicao()
+    g.perfil = PERFIL.iniciar(rota_atual()) if PERFIL else None
 
-    try:
-        novo_id = DB.inserir_funcionario(
-            data['nome'],
-            data.get('data_nascimento'),
-            data.get('endereco'),
-            data['cpf'],
-            data.get('email'),
-            data.get('telefone'),
-            data['cargo_id']
-        )
-        return jsonify({'id': novo_id}), 201
 
-    except IntegrityError:
-        return jsonify({'erro': 'CPF já cadastrado'}), 400
+@api.after_app_request
+def registrar_medicao(response):
+    if g.get('perfil') is not None:
+        PERFIL.finalizar(g.pop('perfil'))
+    if 'inicio' in g:
+        duracao = time.perf_counter() - g.pop('inicio')
+        METRICAS.observar_rota(request.method, rota_atual(), response.status_code, duracao, encerrar_fases())
+        if 'tenant' in g:
+            TENANTS.observar(g.tenant, response.status_code, duracao)
+    return response
 
 
-@app.route('/api/funcionarios/<int:id>', methods=['PUT'])
-def editar_funcionario(id):
-    if DB.atualizar_funcionario(id, request.json):
-        return jsonify({'mensagem': 'Funcionário atualizado'}), 200
+@api.teardown_app_request
+def devolver_tenant(_erro):
+    # Depois do fim do stream (stream_with_context): a clínica só fica ociosa quando nada mais a usa
+    if 'tenant' in g:
+        TENANTS.devolver(g.pop('tenant'))
 
-    return jsonify({'erro': 'Funcionário não encontrado'}), 404
 
+# ======================================================
+# FUNÇÕES AUXILIARES — RESPOSTAS JSON
+# ======================================================
+def resposta_json(dados, status=200):
+    return Response(dumps_json(dados), status=status, mimetype='application/json')
 
-@app.route('/api/funcionarios/<int:id>', methods=['DELETE'])
-def excluir_funcionario(id):
-    if DB.deletar_funcionario(id):
-        return jsonify({'mensagem': 'Funcionário excluído'}), 200
 
-    return jsonify({'erro': 'Funcionário não encontrado'}), 404
+def resposta_stream(blocos, formato):
+    def gerar():
+        if formato == 'ndjson':
+            for linhas in blocos:
+                yield b''.join(dumps_json(item) + b'\n' for item in serializar_lista(linhas))
+            return
 
+        if formato == 'csv':
+            # Cabeçalho junto com o primeiro bloco, depois só as linhas
+            cabecalho = True
+            for linhas in blocos:
+                yield csv_do_bloco(serializar_lista(linhas), cabecalho)
+                cabecalho = cabecalho and not linhas
+            return
 
-# ======================================================
-# CONTADORES
-# ======================================================
-@app.route('/api/counts', methods=['GET'])
-def api_counts():
-    return jsonify(DB.buscar_counts()), 200
+        # O '[' sai antes da primeira linha chegar do banco
+        yield b'['
+        separador = b''
+        for linhas in blocos:
+            # Serializa o bloco inteiro de uma vez e tira os colchetes
+            yield separador + dumps_json(serializar_lista(linhas))[1:-1]
+            separador = b','
+        yield b']'
+
+    return Response(stream_with_context(gerar()), mimetype=parametros.MIMETYPES_STREAM[formato])
 
 
 # ======================================================
-# PACIENTES
+# ROTAS DA API (services/rotas.py, as mesmas do asgi.py)
 # ======================================================
-@app.route('/api/pacientes', methods=['GET'])
-def listar_pacientes():
-    nome = request.args.get('nome', '')
-    cpf = request.args.get('cpf', '')
+def pedido_atual(rota):
+    csv = None
+    if rota.csv:
+        if 'arquivo' in request.files:
+            csv = request.files['arquivo'].read()
+        elif request.mimetype == 'text/csv':
+            csv = request.get_data()
+    return rotas.Pedido(request.args, request.get_json(silent=True), request.accept_mimetypes, csv)
 
-    pacientes = DB.buscar_pacientes(nome, cpf)
-    return jsonify(serializar_lista(pacientes)), 200
 
+def responder(resposta):
+    if isinstance(resposta, rotas.Stream):
+        return resposta_stream(resposta.blocos, resposta.formato)
+    if isinstance(resposta, rotas.Json):
+        return resposta_json(resposta.dados, resposta.status)
+    dados, status = resposta
+    return jsonify(dados), status
 
-@app.route('/api/pacientes/<int:id>', methods=['GET'])
-def buscar_paciente(id):
-    paciente = DB.buscar_paciente_por_id(id)
 
-    if paciente:
-        return jsonify(serializar_lista([paciente])[0]), 200
+def view_da_rota(rota):
+    def view(**parametros_url):
+        return responder(roteiros.rodar(rota.funcao(get_db, pedido_atual(rota), **parametros_url)))
+    return view
 
-    return jsonify({'erro': 'Paciente não encontrado'}), 404
 
+for _rota in rotas.ROTAS:
+    api.add_url_rule(_rota.caminho, _rota.funcao.__name__, view_da_rota(_rota), methods=[_rota.metodo])
 
-@app.route('/api/pacientes', methods=['POST'])
-def criar_paciente():
-    data = request.json or {}
 
-    if not data.get('nome') or not data.get('cpf'):
-        return jsonify({'erro': 'Nome e CPF são obrigatórios'}), 400
-
-    try:
-        paciente_id = DB.inserir_paciente(
-            data['nome'],
-            data['cpf'],
-            data.get('data_nascimento'),
-            data.get('telefone'),
-            data.get('email')
-        )
-        return jsonify({'id': paciente_id}), 201
-
-    except IntegrityError:
-        return jsonify({'erro': 'CPF já cadastrado'}), 400
+# ======================================================
+# CONTADORES
+# ======================================================
+@api.route('/api/counts', methods=['GET'])
+def api_counts():
+    counts = get_db().buscar_counts()
+    resposta = jsonify(counts)
+    # Polls sem mudança recebem 304 sem corpo
+    resposta.set_etag(hashlib.md5(resposta.get_data()).hexdigest())
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta.make_conditional(request)
 
 
-@app.route('/api/pacientes/<int:id>', methods=['PUT'])
-def atualizar_paciente(id):
-    if DB.atualizar_paciente(id, request.json):
-        return jsonify({'mensagem': 'Paciente atualizado'}), 200
+# ======================================================
+# EVENTOS (SSE)
+# ======================================================
+@api.route('/api/events', methods=['GET'])
+def eventos_sse():
+    # Mudanças e totais em tempo real; o navegador reconecta sozinho mandando o Last-Event-ID
+    db = get_db()
+    try:
+        assinatura = eventos.BARRAMENTO.assinar(request.headers.get('Last-Event-ID'), tenant=db.tenant)
+    except eventos.BarramentoCheio:
+        # Cada cliente SSE prende uma thread do worker: acima do limite, o cliente volta ao polling
+        resposta = jsonify({'erro': 'Limite de conexões de eventos atingido, use /api/counts'})
+        resposta.headers['Retry-After'] = '30'
+        return resposta, 503
+
+    fluxo = eventos.fluxo_sse(
+        assinatura, db.buscar_counts,
+        heartbeat=float(os.getenv("SSE_HEARTBEAT", eventos.HEARTBEAT)),
+        duracao_maxima=float(os.getenv("SSE_DURACAO_MAXIMA", eventos.DURACAO_MAXIMA))
+    )
+    resposta = Response(stream_with_context(fluxo), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
 
-    return jsonify({'erro': 'Paciente não encontrado'}), 404
 
+# ======================================================
+# SAÚDE (LIVENESS E READINESS)
+# ======================================================
+@api.route('/api/health', methods=['GET'])
+def health():
+    # Liveness: o processo responde; não toca no banco
+    return jsonify({'status': 'ok'}), 200
+
+
+@api.route('/api/ready', methods=['GET'])
+def ready():
+    # Readiness: banco alcançável e esquema na versão do código
+    if TENANTS is not None:
+        try:
+            tenant_da_requisicao()
+        except tenants.TenantAusente:
+            # Várias clínicas e nenhuma na requisição: o processo está pronto, cada banco abre no uso
+            return jsonify({'status': 'pronto', 'clinicas': len(TENANTS.registro)}), 200
+    inicio = time.perf_counter()
+    try:
+        versao = get_db().ping()
+    except Exception as e:
+        return jsonify({'status': 'indisponivel', 'banco': 'erro', 'erro': str(e)}), 503
 
-@app.route('/api/pacientes/<int:id>', methods=['DELETE'])
-def deletar_paciente(id):
-    DB.deletar_paciente(id)
-    return jsonify({'mensagem': 'Paciente excluído'}), 200
+    resposta = {
+        'status': 'pronto',
+        'banco': 'ok',
+        'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        'versao_esquema': versao,
+        'versao_esperada': migracoes.VERSAO_ATUAL
+    }
+    if versao < migracoes.VERSAO_ATUAL:
+        resposta['status'] = 'esquema_desatualizado'
+        return jsonify(resposta), 503
+    return jsonify(resposta), 200
 
 
 # ======================================================
-# CONSULTAS
+# MONITORAMENTO (POOL, CACHE E MÉTRICAS)
 # ======================================================
-@app.route('/api/consultas', methods=['GET'])
-def listar_consultas():
-    consultas = DB.buscar_consultas()
-    return jsonify(serializar_lista(consultas)), 200
-
-
-@app.route('/api/consultas', methods=['POST'])
-def criar_consulta():
-    data = request.json or {}
-
-    consulta_id = DB.inserir_consulta(
-        data['paciente_id'],
-        data['consulta'],
-        data['data'],
-        data['hora'],
-        data.get('status', 'Agendada')
-    )
-    return jsonify({'id': consulta_id}), 201
+@api.route('/api/pool', methods=['GET'])
+def estatisticas_pool():
+    db = get_db()
+    return jsonify({**db.pool.estatisticas(), 'nos': db.roteador.estatisticas()}), 200
 
 
-@app.route('/api/consultas/<int:id>', methods=['PATCH'])
-def atualizar_status_consulta(id):
-    DB.atualizar_status_consulta(id, request.json.get('status'))
-    return jsonify({'mensagem': 'Status atualizado'}), 200
+@api.route('/api/cache', methods=['GET'])
+def estatisticas_cache():
+    return jsonify(get_db().cache.estatisticas()), 200
 
 
-@app.route('/api/consultas/<int:id>', methods=['DELETE'])
-def deletar_consulta(id):
-    DB.deletar_consulta(id)
-    return jsonify({'mensagem': 'Consulta excluída'}), 200
+@api.route('/api/tenants', methods=['GET'])
+def estatisticas_tenants():
+    if TENANTS is None:
+        return jsonify({'registradas': 0}), 200
+    return jsonify(TENANTS.estatisticas()), 200
 
 
-# ======================================================
-# AUDITORIA
-# ======================================================
-@app.route('/api/auditoria', methods=['GET'])
-def listar_auditoria():
-    registros = DB.buscar_auditoria()
-    return jsonify(serializar_lista(registros)), 200
+@api.route('/metrics', methods=['GET'])
+def metricas():
+    extras = [
+        ('medcore_sse_clientes', eventos.BARRAMENTO.clientes, 'Clientes conectados no /api/events.'),
+        ('medcore_sse_desconectados_total', eventos.BARRAMENTO.desconectados,
+         'Clientes SSE desconectados por não consumirem a tempo.'),
+    ]
+    db = db_se_criado()
+    if db is not None:
+        pool = db.pool.estatisticas()
+        cache = db.cache.estatisticas()
+        extras += [
+            ('medcore_pool_conexoes_em_uso', pool['em_uso'], 'Conexões emprestadas do pool.'),
+            ('medcore_pool_conexoes_livres', pool['livres'], 'Conexões ociosas no pool.'),
+            ('medcore_pool_esperas_total', pool['esperas'], 'Checkouts que precisaram esperar.'),
+            ('medcore_pool_timeouts_total', pool['timeouts'], 'Checkouts que estouraram o tempo.'),
+            ('medcore_cache_hits_total', cache['hits'], 'Leituras atendidas pelo cache.'),
+            ('medcore_cache_misses_total', cache['misses'], 'Leituras que foram ao banco.'),
+            ('medcore_auditoria_pendentes', db.auditoria.pendentes(), 'Eventos de auditoria na fila.'),
+            ('medcore_autocomplete_pacientes', len(db.autocomplete), 'Pacientes no índice do autocomplete.'),
+            ('medcore_autocomplete_buscas_total', db.autocomplete.buscas, 'Buscas atendidas pelo índice do autocomplete.'),
+        ] + db.roteador.metricas()
+    if TENANTS is not None:
+        extras += TENANTS.metricas(lambda db: db.pool.estatisticas())
+    return Response(METRICAS.exportar(extras), mimetype='text/plain; version=0.0.4')
 
 
-# 🔹 DELETE INDIVIDUAL (corrige o erro do frontend)
-@app.route('/api/auditoria/<int:id>', methods=['DELETE'])
-def excluir_auditoria(id):
-    try:
-        total = DB.excluir_auditoria_em_lote([id])
+@api.app_errorhandler(tenants.TenantDesconhecido)
+def tenant_desconhecido(e):
+    return jsonify({'erro': str(e)}), 400 if isinstance(e, tenants.TenantAusente) else 404
 
-        if total == 0:
-            return jsonify({'erro': 'Registro não encontrado'}), 404
 
-        return jsonify({'mensagem': 'Registro de auditoria excluído'}), 200
+@api.app_errorhandler(PoolEsgotado)
+def pool_esgotado(e):
+    return jsonify({'erro': 'Servidor ocupado, tente novamente'}), 503
+
+
+@api.app_errorhandler(OperationalError)
+def banco_indisponivel(e):
+    print(f"[DB] Erro operacional: {e}")
+    return jsonify({'erro': 'Banco de dados indisponível, tente novamente'}), 503
 
-    except Exception as e:
-        print('Erro ao excluir auditoria:', e)
-        return jsonify({'erro': 'Erro ao excluir auditoria'}), 500
 
+@api.app_errorhandler(comandos.HorarioOcupado)
+def horario_ocupado(e):
+    return jsonify({'erro': str(e)}), 409
 
-# 🔹 DELETE EM LOTE
-@app.route('/api/auditoria', methods=['DELETE'])
-def excluir_auditoria_em_lote():
-    dados = request.json or {}
-    ids = dados.get('ids', [])
 
-    if not ids or not isinstance(ids, list):
-        return jsonify({'erro': 'Lista de IDs inválida'}), 400
+# ======================================================
+# APLICAÇÃO
+# ======================================================
+def create_app():
+    """Monta o app Flask. Não conecta no banco: isso fica para o primeiro get_db()."""
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    eventos.BARRAMENTO.maximo_clientes = int(os.getenv("SSE_MAXIMO_CLIENTES", 4))
+    return app
 
-    total = DB.excluir_auditoria_em_lote(ids)
 
-    return jsonify({
-        'mensagem': 'Registros de auditoria excluídos com sucesso',
-        'total_excluidos': total
-    }), 200
+# gunicorn app:app (ou 'app:create_app()')
+app = create_app()
 
 
 # ======================================================
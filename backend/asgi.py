@@ -0,0 +1,375 @@
+"""
+asgi.py
+
+A mesma API do app.py servida em ASGI, com o DatabaseAsync (aiomysql).
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Rotas e operações do banco são as mesmas do modo WSGI, escritas uma vez
+em services/rotas.py e services/operacoes.py; aqui ficam o ciclo de vida
+do pool, o SSE em corrotina e as rotas de monitoramento. Dependências
+extras em requirements-async.txt.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+
+from quart import Quart, Response, g, jsonify, request
+from pymysql.err import OperationalError
+
+from services import comandos, eventos, migracoes, parametros, replicas, roteiros, rotas, tenants
+from services.db_async import DatabaseAsync
+from services.metricas import METRICAS, encerrar_fases, iniciar_fases
+from services.serializacao import csv_do_bloco, dumps_json, serializar_lista
+
+app = Quart(__name__)
+
+# ======================================================
+# BANCO DE DADOS
+# ======================================================
+CONEXAO = {
+    'host': os.getenv("DB_HOST", "localhost"),
+    'port': int(os.getenv("DB_PORT", 3306)),
+    'user': os.getenv("DB_USER", "appuser"),
+    'password': os.getenv("DB_PASSWORD", "app_password_here"),
+    'database': os.getenv("DB_NAME", "medcore"),
+}
+
+DB = None
+
+# Cada cliente SSE aqui é só uma corrotina: o limite pode ser bem maior que no WSGI
+eventos.BARRAMENTO.maximo_clientes = int(os.getenv("SSE_MAXIMO_CLIENTES", 1000))
+
+
+def criar_database(tenant=None, conexao=None):
+    primario = dict(conexao or CONEXAO)
+    lista_replicas = primario.pop('replicas', None)
+    if lista_replicas is None:
+        # DB_REPLICAS é do banco padrão; as clínicas declaram as suas no registro
+        lista_replicas = os.getenv("DB_REPLICAS") if tenant is None else None
+    arquivo_auditoria = os.getenv("AUDITORIA_ARQUIVO") or None
+    if tenant and arquivo_auditoria:
+        arquivo_auditoria = os.path.join(arquivo_auditoria, tenant)
+    return DatabaseAsync.conectar(
+        **primario,
+        pool_min=int(os.getenv("DB_POOL_MIN", 1)),
+        pool_max=int(os.getenv("DB_POOL_MAX", 50)),
+        pool_max_lifetime=int(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+        auditoria_modo=os.getenv("AUDITORIA_MODO", "assincrono"),
+        auditoria_lote=int(os.getenv("AUDITORIA_LOTE", 200)),
+        auditoria_intervalo=float(os.getenv("AUDITORIA_INTERVALO", 1.0)),
+        contadores_ttl=float(os.getenv("CONTADORES_TTL", 2.0)),
+        cache_backend=os.getenv("CACHE_BACKEND", "memoria"),
+        cache_max_itens=int(os.getenv("CACHE_MAX_ITENS", 10000)),
+        # Padrão por backend (services/cache.py): 30 s em memória, 300 s no Redis
+        cache_ttl=float(os.getenv("CACHE_TTL", 0)) or None,
+        cache_redis_url=os.getenv("CACHE_REDIS_URL"),
+        slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", 500)),
+        arquivo_auditoria=arquivo_auditoria,
+        replicas_leitura=replicas.ler_replicas(lista_replicas, primario),
+        replica_atraso_maximo=float(os.getenv("DB_REPLICA_ATRASO_MAX", 5.0)),
+        replica_intervalo=float(os.getenv("DB_REPLICA_INTERVALO", 5.0)),
+        tenant=tenant,
+        autocomplete_intervalo=float(os.getenv("AUTOCOMPLETE_INTERVALO", 10))
+    )
+
+
+# Várias clínicas (TENANTS/TENANTS_ARQUIVO): um DatabaseAsync por clínica, aberto no primeiro uso
+_REGISTRO = tenants.ler_registro(os.getenv("TENANTS"), os.getenv("TENANTS_ARQUIVO"), CONEXAO)
+TENANTS = tenants.TenantsAsync(
+    _REGISTRO,
+    criar_database,
+    ocioso=float(os.getenv("TENANT_OCIOSO", tenants.OCIOSO)),
+    maximo_ativos=int(os.getenv("TENANT_MAXIMO_ATIVOS", tenants.MAXIMO_ATIVOS))
+) if _REGISTRO else None
+
+
+# Só destes endereços o X-Clinica vale (o proxy que o define); dos demais é ignorado
+PROXIES_CONFIAVEIS = tenants.ler_proxies(os.getenv("TENANT_PROXIES"))
+
+
+def tenant_da_requisicao():
+    return tenants.resolver(
+        request.headers.get(tenants.CABECALHO),
+        request.host,
+        dominio=os.getenv("TENANT_DOMINIO"),
+        padrao=os.getenv("TENANT_PADRAO"),
+        origem=request.remote_addr,
+        proxies=PROXIES_CONFIAVEIS
+    )
+
+
+def get_db():
+    """DatabaseAsync do processo, ou o da clínica da requisição (aberto em abrir_tenant)."""
+    if TENANTS is None:
+        return DB
+    if 'tenant_db' not in g:
+        raise tenants.TenantDesconhecido(f'Clínica desconhecida: {tenant_da_requisicao()}')
+    return g.tenant_db
+
+
+@app.before_serving
+async def conectar():
+    global DB
+    if TENANTS is not None:
+        return
+    DB = await criar_database()
+    print("[DB] Pool assíncrono pronto")
+
+
+@app.after_serving
+async def desconectar():
+    if DB is not None:
+        await DB.fechar()
+    if TENANTS is not None:
+        await TENANTS.fechar()
+
+
+# ======================================================
+# INSTRUMENTAÇÃO E CORS
+# ======================================================
+def rota_atual():
+    return request.url_rule.rule if request.url_rule else 'desconhecida'
+
+
+@app.before_request
+async def iniciar_medicao():
+    g.inicio = time.perf_counter()
+    iniciar_fases()
+    replicas.nova_requisicao()
+    if TENANTS is not None:
+        await abrir_tenant()
+
+
+async def abrir_tenant():
+    # Abrir o banco da clínica é assíncrono: fica aqui, e as rotas só leem g.tenant_db pelo get_db()
+    try:
+        nome = tenant_da_requisicao()
+    except tenants.TenantAusente:
+        return
+    if nome in TENANTS.registro:
+        g.tenant_db = await TENANTS.obter(nome)
+        g.tenant = nome
+
+
+@app.teardown_request
+async def devolver_tenant(_erro):
+    if 'tenant' in g:
+        TENANTS.devolver(g.pop('tenant'))
+
+
+@app.after_request
+async def registrar_medicao(response):
+    # Mesmo efeito do flask_cors no app WSGI
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = f'Content-Type, {tenants.CABECALHO}'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
+    if 'inicio' in g:
+        duracao = time.perf_counter() - g.pop('inicio')
+        METRICAS.observar_rota(request.method, rota_atual(), response.status_code, duracao, encerrar_fases())
+        if 'tenant' in g:
+            TENANTS.observar(g.tenant, response.status_code, duracao)
+    return response
+
+
+# ======================================================
+# FUNÇÕES AUXILIARES — RESPOSTAS JSON
+# ======================================================
+def resposta_json(dados, status=200):
+    return Response(dumps_json(dados), status=status, mimetype='application/json')
+
+
+def resposta_stream(blocos, formato):
+    async def gerar():
+        if formato == 'ndjson':
+            async for linhas in blocos:
+                yield b''.join(dumps_json(item) + b'\n' for item in serializar_lista(linhas))
+            return
+
+        if formato == 'csv':
+            cabecalho = True
+            async for linhas in blocos:
+                yield csv_do_bloco(serializar_lista(linhas), cabecalho)
+                cabecalho = cabecalho and not linhas
+            return
+
+        yield b'['
+        separador = b''
+        async for linhas in blocos:
+            yield separador + dumps_json(serializar_lista(linhas))[1:-1]
+            separador = b','
+        yield b']'
+
+    return Response(gerar(), mimetype=parametros.MIMETYPES_STREAM[formato])
+
+
+# ======================================================
+# ROTAS DA API (services/rotas.py, as mesmas do app.py)
+# ======================================================
+async def pedido_atual(rota):
+    csv = None
+    if rota.csv:
+        arquivos = await request.files
+        if 'arquivo' in arquivos:
+            csv = arquivos['arquivo'].read()
+        elif request.mimetype == 'text/csv':
+            csv = await request.get_data()
+    return rotas.Pedido(request.args, await request.get_json(silent=True), request.accept_mimetypes, csv)
+
+
+def responder(resposta):
+    if isinstance(resposta, rotas.Stream):
+        return resposta_stream(resposta.blocos, resposta.formato)
+    if isinstance(resposta, rotas.Json):
+        return resposta_json(resposta.dados, resposta.status)
+    dados, status = resposta
+    return jsonify(dados), status
+
+
+def view_da_rota(rota):
+    async def view(**parametros_url):
+        pedido = await pedido_atual(rota)
+        return responder(await roteiros.rodar_async(rota.funcao(get_db, pedido, **parametros_url)))
+    return view
+
+
+for _rota in rotas.ROTAS:
+    app.add_url_rule(_rota.caminho, _rota.funcao.__name__, view_da_rota(_rota), methods=[_rota.metodo])
+
+
+# ======================================================
+# CONTADORES
+# ======================================================
+@app.route('/api/counts', methods=['GET'])
+async def api_counts():
+    resposta = jsonify(await get_db().buscar_counts())
+    resposta.set_etag(hashlib.md5(await resposta.get_data()).hexdigest())
+    resposta.headers['Cache-Control'] = 'no-cache'
+    await resposta.make_conditional(request)
+    return resposta
+
+
+# ======================================================
+# EVENTOS (SSE)
+# ======================================================
+@app.route('/api/events', methods=['GET'])
+async def eventos_sse():
+    db = get_db()
+    try:
+        assinatura = eventos.BARRAMENTO.assinar(request.headers.get('Last-Event-ID'),
+                                                loop=asyncio.get_running_loop(), tenant=db.tenant)
+    except eventos.BarramentoCheio:
+        resposta = jsonify({'erro': 'Limite de conexões de eventos atingido, use /api/counts'})
+        resposta.headers['Retry-After'] = '30'
+        return resposta, 503
+
+    fluxo = eventos.fluxo_sse_async(
+        assinatura, db.buscar_counts,
+        heartbeat=float(os.getenv("SSE_HEARTBEAT", eventos.HEARTBEAT)),
+        duracao_maxima=float(os.getenv("SSE_DURACAO_MAXIMA", eventos.DURACAO_MAXIMA))
+    )
+    resposta = Response(fluxo, mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    # Sem limite de tempo do Quart para a resposta: o fluxo fecha sozinho em duracao_maxima
+    resposta.timeout = None
+    return resposta
+
+
+# ======================================================
+# SAÚDE (LIVENESS E READINESS)
+# ======================================================
+@app.route('/api/health', methods=['GET'])
+async def health():
+    return jsonify({'status': 'ok'}), 200
+
+
+@app.route('/api/ready', methods=['GET'])
+async def ready():
+    if TENANTS is not None and 'tenant_db' not in g:
+        try:
+            tenant_da_requisicao()
+        except tenants.TenantAusente:
+            # Várias clínicas e nenhuma na requisição: o processo está pronto, cada banco abre no uso
+            return jsonify({'status': 'pronto', 'clinicas': len(TENANTS.registro)}), 200
+    inicio = time.perf_counter()
+    try:
+        versao = await get_db().ping()
+    except Exception as e:
+        return jsonify({'status': 'indisponivel', 'banco': 'erro', 'erro': str(e)}), 503
+
+    resposta = {
+        'status': 'pronto',
+        'banco': 'ok',
+        'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        'versao_esquema': versao,
+        'versao_esperada': migracoes.VERSAO_ATUAL
+    }
+    if versao < migracoes.VERSAO_ATUAL:
+        resposta['status'] = 'esquema_desatualizado'
+        return jsonify(resposta), 503
+    return jsonify(resposta), 200
+
+
+# ======================================================
+# MONITORAMENTO (POOL, CACHE E MÉTRICAS)
+# ======================================================
+@app.route('/api/pool', methods=['GET'])
+async def estatisticas_pool():
+    db = get_db()
+    return jsonify({**db.estatisticas_pool(), 'nos': db.roteador.estatisticas()}), 200
+
+
+@app.route('/api/cache', methods=['GET'])
+async def estatisticas_cache():
+    return jsonify(get_db().cache.estatisticas()), 200
+
+
+@app.route('/api/tenants', methods=['GET'])
+async def estatisticas_tenants():
+    if TENANTS is None:
+        return jsonify({'registradas': 0}), 200
+    return jsonify(TENANTS.estatisticas()), 200
+
+
+@app.route('/metrics', methods=['GET'])
+async def metricas():
+    extras = [
+        ('medcore_sse_clientes', eventos.BARRAMENTO.clientes, 'Clientes conectados no /api/events.'),
+        ('medcore_sse_desconectados_total', eventos.BARRAMENTO.desconectados,
+         'Clientes SSE desconectados por não consumirem a tempo.'),
+    ]
+    if TENANTS is not None:
+        # Com várias clínicas, pool e demais medidas saem por clínica
+        extras += TENANTS.metricas(lambda db: db.estatisticas_pool())
+    else:
+        pool = DB.estatisticas_pool()
+        cache = DB.cache.estatisticas()
+        extras += [
+            ('medcore_pool_conexoes_em_uso', pool['em_uso'], 'Conexões emprestadas do pool.'),
+            ('medcore_pool_conexoes_livres', pool['livres'], 'Conexões ociosas no pool.'),
+            ('medcore_cache_hits_total', cache['hits'], 'Leituras atendidas pelo cache.'),
+            ('medcore_cache_misses_total', cache['misses'], 'Leituras que foram ao banco.'),
+            ('medcore_auditoria_pendentes', DB.auditoria.pendentes(), 'Eventos de auditoria na fila.'),
+            ('medcore_autocomplete_pacientes', len(DB.autocomplete), 'Pacientes no índice do autocomplete.'),
+            ('medcore_autocomplete_buscas_total', DB.autocomplete.buscas, 'Buscas atendidas pelo índice do autocomplete.'),
+        ] + DB.roteador.metricas()
+    return Response(METRICAS.exportar(extras), mimetype='text/plain; version=0.0.4')
+
+
+@app.errorhandler(tenants.TenantDesconhecido)
+async def tenant_desconhecido(e):
+    return jsonify({'erro': str(e)}), 400 if isinstance(e, tenants.TenantAusente) else 404
+
+
+@app.errorhandler(comandos.HorarioOcupado)
+async def horario_ocupado(e):
+    return jsonify({'erro': str(e)}), 409
+
+
+@app.errorhandler(OperationalError)
+async def banco_indisponivel(e):
+    print(f"[DB] Erro operacional: {e}")
+    return jsonify({'erro': 'Banco de dados indisponível, tente novamente'}), 503
@@ -0,0 +1,113 @@
+"""
+benchmarks/bench_async.py
+
+Compara a API em WSGI (gunicorn + threads, app.py) e em ASGI (uvicorn,
+asgi.py) com o mesmo banco, subindo cada servidor num subprocesso e
+aumentando o número de clientes concorrentes.
+
+Com poucas conexões os dois empatam; a diferença aparece quando há mais
+requisições em voo do que threads no gunicorn: no WSGI elas esperam na
+fila do servidor, no ASGI o event loop continua atendendo enquanto o
+MySQL responde.
+
+Uso (a partir de backend/, com o banco semeado por benchmarks.semear e
+as dependências de requirements-async.txt):
+    python -m benchmarks.bench_async
+    python -m benchmarks.bench_async --concorrencia 16,64,256 --endpoints paciente_id,consultas_pagina
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.carga import ClienteHTTP, contexto_do_banco, endpoints, executar_endpoint
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def comando_servidor(modo, porta, workers, threads):
+    if modo == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads),
+                '-b', f'127.0.0.1:{porta}', '--log-level', 'warning', 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(porta), '--log-level', 'warning', '--no-access-log']
+
+
+def aguardar(porta, prazo=60):
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        try:
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=2)
+            conexao.request('GET', '/api/counts')
+            if conexao.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'servidor na porta {porta} não respondeu em {prazo}s')
+
+
+def medir(modo, args, niveis):
+    porta = porta_livre()
+    processo = subprocess.Popen(comando_servidor(modo, porta, args.workers, args.threads))
+    try:
+        aguardar(porta)
+        url = f'http://127.0.0.1:{porta}'
+        criar_cliente = lambda: ClienteHTTP(url)
+        ctx = contexto_do_banco(criar_cliente)
+        selecionados = set(args.endpoints.split(','))
+        lista = [e for e in endpoints(ctx) if e[0] in selecionados]
+
+        resultado = {}
+        for clientes in niveis:
+            for endpoint in lista:
+                medida = executar_endpoint(criar_cliente, endpoint, clientes, max(args.requisicoes, clientes),
+                                           args.aquecimento, args.semente, medir_rss=False)
+                resultado[(endpoint[0], clientes)] = medida
+                print(f"{modo:5} {endpoint[0]:20} c={clientes:<4} p50={medida['p50_ms']:>8} ms  "
+                      f"p95={medida['p95_ms']:>8} ms  p99={medida['p99_ms']:>8} ms  "
+                      f"{medida['vazao_rps']:>8} req/s  erros={medida['erros']}")
+        return resultado
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concorrencia', default='8,32,128', help='níveis de clientes simultâneos')
+    parser.add_argument('--endpoints', default='counts,paciente_id,consultas_pagina')
+    parser.add_argument('--requisicoes', type=int, default=1000, help='por endpoint e nível')
+    parser.add_argument('--aquecimento', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2, help='processos de cada servidor')
+    parser.add_argument('--threads', type=int, default=8, help='threads por worker do gunicorn')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    args = parser.parse_args()
+
+    niveis = [int(n) for n in args.concorrencia.split(',')]
+    resultados = {modo: medir(modo, args, niveis) for modo in ('wsgi', 'asgi')}
+
+    print('\nendpoint              clientes   vazão wsgi   vazão asgi    p95 wsgi    p95 asgi')
+    for (nome, clientes), wsgi in resultados['wsgi'].items():
+        asgi = resultados['asgi'].get((nome, clientes))
+        if asgi:
+            print(f"{nome:20} {clientes:>10} {wsgi['vazao_rps']:>12} {asgi['vazao_rps']:>12} "
+                  f"{wsgi['p95_ms']:>11} {asgi['p95_ms']:>11}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({modo: {f'{nome}@{clientes}': m for (nome, clientes), m in r.items()}
+                       for modo, r in resultados.items()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
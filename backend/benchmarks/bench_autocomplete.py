@@ -0,0 +1,174 @@
+"""
+benchmarks/bench_autocomplete.py
+
+Confere e mede o índice do /api/pacientes/autocomplete
+(services/autocomplete.py) sem banco: gera pacientes sintéticos com
+nomes acentuados e CPFs válidos, monta o índice como na carga do
+Database e mede memória, tempo de montagem, latência das buscas
+(prefixo de nome, de sobrenome e de CPF) e das escritas depois do
+COMMIT. Cada busca é conferida contra uma varredura linear; sai com
+código 1 se alguma divergir ou se o p99 passar de --p99-max-ms.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_autocomplete --pacientes 100000
+    python -m benchmarks.bench_autocomplete --pacientes 20000 --buscas 5000 --semente 7
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_cpf import cpf_valido, formatado
+from services.autocomplete import IndiceAutocomplete, chaves_do_nome, cpf_como_inteiro, formatar_cpf
+from services.busca import normalizar_texto, parece_cpf
+from services.cpf import digitos
+
+PRENOMES = ['Maria', 'José', 'Ana', 'João', 'Antônio', 'Francisca', 'Luíza', 'Márcio', 'Patrícia', 'Cláudio',
+            'Fernanda', 'Sérgio', 'Débora', 'Inês', 'Otávio', 'Lúcia', 'Rafael', 'Juliana', 'Thiago', 'Bárbara']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Conceição', 'Araújo', 'Gonçalves', 'Lima', 'Pereira',
+              'Assunção', 'Ribeiro', 'Simões', 'Magalhães', 'Brandão', 'Gusmão', 'Leão', 'Romão', 'Falcão']
+
+
+def gerar_pacientes(rnd, quantidade):
+    linhas = []
+    for paciente_id in range(1, quantidade + 1):
+        partes = [rnd.choice(PRENOMES)]
+        if rnd.random() < 0.3:
+            partes.append(rnd.choice(PRENOMES))
+        partes += [rnd.choice(['da', 'de', 'dos'])] if rnd.random() < 0.4 else []
+        partes += rnd.sample(SOBRENOMES, rnd.randint(1, 3))
+        nome = ' '.join(partes)
+        linhas.append({'id': paciente_id, 'nome': nome, 'nome_busca': normalizar_texto(nome),
+                       'cpf_digitos': cpf_valido(rnd)})
+    return linhas
+
+
+def gerar_termo(rnd, linhas):
+    linha = rnd.choice(linhas)
+    tipo = rnd.randrange(4)
+    if tipo == 0:
+        # Começo do nome, com acento e maiúscula como o usuário digita
+        return linha['nome'][:rnd.randint(1, 8)]
+    if tipo == 1:
+        return normalizar_texto(linha['nome']).split()[-1][:rnd.randint(2, 6)]
+    if tipo == 2:
+        return formatado(linha['cpf_digitos'])[:rnd.randint(3, 14)]
+    return rnd.choice(['xyz', 'q', 'zz top', '999.999'])
+
+
+def referencia(pacientes, termo, limite):
+    """Mesma regra do índice por varredura linear: ordem alfabética, começos de nome antes de sobrenomes."""
+    termo = termo.strip()
+    if parece_cpf(termo):
+        numero = digitos(termo)[:11]
+        achados = sorted((cpf, i) for i, (_, cpf) in pacientes.items()
+                         if cpf is not None and f'{cpf:011d}'.startswith(numero))
+        return [i for _, i in achados[:limite]]
+    prefixo = normalizar_texto(termo)
+    if not prefixo:
+        return []
+    inicio, palavras = [], []
+    for i, (nome, _) in pacientes.items():
+        chave, sobrenomes = chaves_do_nome(normalizar_texto(nome))
+        inicio += [(chave, i)] if chave.startswith(prefixo) else []
+        palavras += [(s, i) for s in sobrenomes if s.startswith(prefixo)]
+    ids = []
+    for _, i in sorted(inicio) + sorted(palavras):
+        if i not in ids:
+            ids.append(i)
+    return ids[:limite]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pacientes', type=int, default=50000)
+    parser.add_argument('--buscas', type=int, default=20000)
+    parser.add_argument('--conferidas', type=int, default=300, help='buscas conferidas contra a varredura linear')
+    parser.add_argument('--escritas', type=int, default=2000)
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--p99-max-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semente)
+    linhas = gerar_pacientes(rnd, args.pacientes)
+
+    # 1) Montagem e memória (o tracemalloc deixa a montagem lenta: mede em separado)
+    indice = IndiceAutocomplete()
+    tracemalloc.start()
+    indice.iniciar_carga()
+    indice.concluir_carga(linhas)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    indice = IndiceAutocomplete()
+    inicio = time.perf_counter()
+    indice.iniciar_carga()
+    indice.concluir_carga(linhas)
+    montagem = time.perf_counter() - inicio
+    estatisticas = indice.estatisticas()
+    print(f"{args.pacientes} pacientes, {estatisticas['chaves']} chaves: montagem {montagem * 1000:.0f} ms, "
+          f"{memoria / 1e6:.1f} MB ({memoria / args.pacientes:.0f} bytes/paciente)")
+
+    # 2) Latência das buscas
+    termos = [gerar_termo(rnd, linhas) for _ in range(args.buscas)]
+    tempos = []
+    for termo in termos:
+        inicio = time.perf_counter()
+        indice.buscar(termo, args.limite)
+        tempos.append(time.perf_counter() - inicio)
+    p50, p99 = percentil(tempos, 50) * 1000, percentil(tempos, 99) * 1000
+    print(f'buscas: {len(termos)}  p50 {p50:.3f} ms  p99 {p99:.3f} ms  máx {max(tempos) * 1000:.3f} ms  '
+          f'média {statistics.mean(tempos) * 1e6:.0f} µs')
+
+    # 3) Escritas depois do COMMIT: cadastro, edição e exclusão
+    tempos_escrita = []
+    proximo_id = args.pacientes + 1
+    for _ in range(args.escritas):
+        operacao = rnd.randrange(3)
+        inicio = time.perf_counter()
+        if operacao == 0:
+            indice.inserir(proximo_id, f'{rnd.choice(PRENOMES)} {rnd.choice(SOBRENOMES)}', cpf_valido(rnd))
+            proximo_id += 1
+        elif operacao == 1:
+            indice.atualizar(rnd.randrange(1, proximo_id), f'{rnd.choice(PRENOMES)} {rnd.choice(SOBRENOMES)}',
+                             formatado(cpf_valido(rnd)))
+        else:
+            indice.remover(rnd.randrange(1, proximo_id))
+        tempos_escrita.append(time.perf_counter() - inicio)
+    print(f'escritas: {len(tempos_escrita)}  p50 {percentil(tempos_escrita, 50) * 1000:.3f} ms  '
+          f'p99 {percentil(tempos_escrita, 99) * 1000:.3f} ms')
+
+    # 4) Concordância com a varredura linear, já com as escritas aplicadas
+    pacientes = {i: (nome, cpf) for i, nome, cpf in indice.pacientes()}
+    falhas = 0
+    for termo in termos[:args.conferidas]:
+        esperado = referencia(pacientes, termo, args.limite)
+        obtido = indice.buscar(termo, args.limite)
+        if [p['id'] for p in obtido] != esperado or any(
+                p['cpf'] != formatar_cpf(pacientes[p['id']][1]) for p in obtido):
+            falhas += 1
+            if falhas <= 5:
+                print(f'  {termo!r}: esperado {esperado}, obtido {[p["id"] for p in obtido]}')
+    if any(cpf_como_inteiro(linha['cpf_digitos']) is None for linha in linhas):
+        falhas += 1
+        print('  gerador produziu CPF sem 11 dígitos')
+
+    if falhas:
+        print(f'FALHOU: {falhas} buscas divergentes')
+        sys.exit(1)
+    if p99 > args.p99_max_ms:
+        print(f'FALHOU: p99 {p99:.3f} ms acima de {args.p99_max_ms} ms')
+        sys.exit(1)
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
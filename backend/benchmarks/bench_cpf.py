@@ -0,0 +1,136 @@
+"""
+benchmarks/bench_cpf.py
+
+Confere e mede a validação de CPF de services/cpf.py.
+
+Gera CPFs aleatórios de vários tipos (válidos, com pontuação, com um
+dígito trocado, sequências repetidas, curtos, longos, lixo) e confere
+que o caminho escalar (validar), o vetorizado (validar_lote com NumPy)
+e a implementação anterior dão o mesmo resultado para cada um; depois
+compara os tempos. Sai com código 1 se algum CPF divergir.
+
+Uso (a partir de backend/; o caminho vetorizado precisa de NumPy,
+requirements-lote.txt):
+    python -m benchmarks.bench_cpf --quantidade 1000000
+    python -m benchmarks.bench_cpf --quantidade 20000 --semente 7 --rodadas 20
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from services import cpf
+
+
+# ======================================================
+# IMPLEMENTAÇÃO ANTERIOR (referência)
+# ======================================================
+def validar_antigo(valor):
+    if not valor: return False
+    valor = ''.join(filter(str.isdigit, str(valor)))
+    if len(valor) != 11 or valor == valor[0] * 11: return False
+    def calc(valor, peso):
+        soma = sum(int(valor[i]) * (peso - i) for i in range(peso - 1))
+        resto = (soma * 10) % 11
+        return resto if resto < 10 else 0
+    try:
+        return calc(valor, 10) == int(valor[9]) and calc(valor, 11) == int(valor[10])
+    except: return False
+
+
+# ======================================================
+# GERADOR
+# ======================================================
+def cpf_valido(rnd):
+    base = [rnd.randrange(10) for _ in range(9)]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        base.append(sum(d * p for d, p in zip(base, pesos)) * 10 % 11 % 10)
+    return ''.join(map(str, base))
+
+
+def formatado(numero):
+    return f'{numero[:3]}.{numero[3:6]}.{numero[6:9]}-{numero[9:]}'
+
+
+def gerar(rnd):
+    numero = cpf_valido(rnd)
+    tipo = rnd.randrange(10)
+    if tipo == 0:
+        return formatado(numero)
+    if tipo == 1:
+        # Um dígito trocado
+        i = rnd.randrange(11)
+        return numero[:i] + str((int(numero[i]) + rnd.randrange(1, 10)) % 10) + numero[i + 1:]
+    if tipo == 2:
+        return str(rnd.randrange(10)) * 11
+    if tipo == 3:
+        return numero[:rnd.randrange(11)]
+    if tipo == 4:
+        return numero + str(rnd.randrange(10)) * rnd.randrange(1, 4)
+    if tipo == 5:
+        return f' {formatado(numero)} '
+    if tipo == 6:
+        return ''.join(rnd.choice('0123456789.-/ abcx') for _ in range(rnd.randrange(0, 20)))
+    if tipo == 7:
+        return rnd.choice(['', None, '   ', '...-'])
+    return numero
+
+
+def divergencias(valores, esperado, obtido, nome):
+    erros = [(v, e, o) for v, e, o in zip(valores, esperado, obtido) if e != o]
+    for valor, e, o in erros[:5]:
+        print(f'  {nome}: {valor!r} esperado {e}, obtido {o}')
+    return len(erros)
+
+
+def cronometrar(funcao, rodadas):
+    melhor = float('inf')
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quantidade', type=int, default=200000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--rodadas', type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semente)
+    valores = [gerar(rnd) for _ in range(args.quantidade)]
+    print(f'{len(valores)} CPFs, {sum(map(validar_antigo, valores))} válidos; NumPy: {"sim" if cpf.np else "não"}')
+
+    # 1) Concordância
+    esperado = [validar_antigo(v) for v in valores]
+    falhas = divergencias(valores, esperado, [cpf.validar(v) for v in valores], 'validar')
+    falhas += divergencias(valores, esperado, cpf.validar_lote(valores), 'validar_lote')
+    if cpf.np is not None:
+        # Lotes pequenos também, abaixo e acima do LOTE_MINIMO
+        for inicio in range(0, min(len(valores), 50000), 997):
+            bloco = valores[inicio:inicio + rnd.randrange(1, 2 * cpf.LOTE_MINIMO)]
+            falhas += divergencias(bloco, esperado[inicio:inicio + len(bloco)],
+                                   cpf._validar_vetorizado(bloco).tolist(), 'vetorizado')
+
+    # 2) Tempos
+    tempos = {
+        'anterior': cronometrar(lambda: [validar_antigo(v) for v in valores], args.rodadas),
+        'validar': cronometrar(lambda: [cpf.validar(v) for v in valores], args.rodadas),
+        'validar_lote': cronometrar(lambda: cpf.validar_lote(valores), args.rodadas),
+    }
+    base = tempos['anterior']
+    for nome, segundos in tempos.items():
+        print(f'  {nome:<13} {segundos * 1000:9.1f} ms  {len(valores) / segundos / 1e6:6.2f} M CPFs/s  '
+              f'{base / segundos:5.1f}x')
+
+    if falhas:
+        print(f'FALHOU: {falhas} divergências')
+        sys.exit(1)
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
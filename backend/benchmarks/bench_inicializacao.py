@@ -0,0 +1,103 @@
+"""
+benchmarks/bench_inicializacao.py
+
+Mede o tempo de partida da API, o que conta no autoscaling:
+
+    importacao - 'import app' num processo novo (o que o gunicorn --preload
+                 e a coleta de testes pagam); não precisa de banco
+    servidor   - do exec do gunicorn até /api/health (vivo) e até
+                 /api/ready (banco conectado e esquema em dia)
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_inicializacao --repeticoes 10
+    python -m benchmarks.bench_inicializacao --servidor --workers 4
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_async import porta_livre
+
+CODIGO_IMPORTACAO = (
+    "import time; inicio = time.perf_counter(); import app; "
+    "print(time.perf_counter() - inicio)"
+)
+
+
+def medir_importacao(repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', CODIGO_IMPORTACAO],
+                               capture_output=True, text=True, check=True)
+        tempos.append(float(saida.stdout.strip().splitlines()[-1]))
+    return tempos
+
+
+def status(porta, caminho):
+    try:
+        conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=2)
+        conexao.request('GET', caminho)
+        return conexao.getresponse().status
+    except OSError:
+        return None
+
+
+def medir_servidor(workers, prazo):
+    porta = porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', '8',
+                                 '-b', f'127.0.0.1:{porta}', '--log-level', 'warning', 'app:app'])
+    marcos = {}
+    try:
+        while len(marcos) < 2 and time.perf_counter() - inicio < prazo:
+            if 'vivo' not in marcos and status(porta, '/api/health') == 200:
+                marcos['vivo'] = time.perf_counter() - inicio
+            if 'vivo' in marcos and status(porta, '/api/ready') == 200:
+                marcos['pronto'] = time.perf_counter() - inicio
+            time.sleep(0.02)
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+    return marcos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--servidor', action='store_true', help='também sobe o gunicorn e mede health/ready')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--prazo', type=float, default=60, help='segundos até desistir do servidor')
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    args = parser.parse_args()
+
+    tempos = medir_importacao(args.repeticoes)
+    resultado = {
+        'importacao_ms': {
+            'mediana': round(statistics.median(tempos) * 1000, 1),
+            'min': round(min(tempos) * 1000, 1),
+            'max': round(max(tempos) * 1000, 1),
+        }
+    }
+    print(f"import app: mediana {resultado['importacao_ms']['mediana']} ms "
+          f"(min {resultado['importacao_ms']['min']}, max {resultado['importacao_ms']['max']}, "
+          f"{args.repeticoes} processos)")
+
+    if args.servidor:
+        marcos = medir_servidor(args.workers, args.prazo)
+        resultado['servidor_ms'] = {k: round(v * 1000, 1) for k, v in marcos.items()}
+        for marco in ('vivo', 'pronto'):
+            valor = resultado['servidor_ms'].get(marco)
+            print(f"gunicorn -w {args.workers} até {marco}: {f'{valor} ms' if valor is not None else 'não chegou'}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+benchmarks/bench_replicas.py
+
+Confere a separação de leitura e escrita (services/replicas.py) com um
+primário e réplicas de verdade: rodízio das leituras entre as réplicas,
+leitura do primário depois de uma escrita na mesma requisição e desvio
+para o primário quando uma réplica está fora do ar.
+
+Para testar localmente não precisa de replicação configurada: dois
+MySQL independentes servem de "réplicas" (sem replicação, o atraso conta
+como zero). Como eles não recebem as escritas do primário, o teste de
+read-your-writes fica visível: o cargo novo só aparece se a leitura foi
+ao primário.
+
+    docker compose up -d db
+    for n in 1 2; do
+      docker run -d --name medcore_replica$n -e MYSQL_ROOT_PASSWORD=root -e MYSQL_DATABASE=medcore \\
+        -v "$PWD/../database/script.sql:/docker-entrypoint-initdb.d/init.sql:ro" -p 330$((n + 6)):3306 mysql:8.0
+    done
+    DB_PORT=3307 python -m services.migracoes && DB_PORT=3308 python -m services.migracoes
+
+Uso (a partir de backend/, com DB_USER/DB_PASSWORD de um usuário que
+exista nos três):
+    python -m benchmarks.bench_replicas --replicas 127.0.0.1:3307,127.0.0.1:3308
+    python -m benchmarks.bench_replicas --replicas 127.0.0.1:3307,127.0.0.1:3399   # uma fora do ar
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+from services import replicas
+from services.db import Database
+
+
+def consultas_por_no(db):
+    return {no['no']: no['consultas'] for no in db.roteador.estatisticas()}
+
+
+def diferenca(depois, antes):
+    return {no: depois[no] - antes.get(no, 0) for no in depois}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replicas', required=True, help='host:porta ou mysql://... separados por vírgula')
+    parser.add_argument('--leituras', type=int, default=200)
+    parser.add_argument('--atraso-maximo', type=float, default=5.0)
+    args = parser.parse_args()
+
+    primario = {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': int(os.getenv("DB_PORT", 3306)),
+        'user': os.getenv("DB_USER", "appuser"),
+        'password': os.getenv("DB_PASSWORD", "app_password_here"),
+        'database': os.getenv("DB_NAME", "medcore"),
+    }
+    db = Database(**primario, auditoria_modo='transacao', cache_backend='memoria',
+                  replicas_leitura=replicas.ler_replicas(args.replicas, primario),
+                  replica_atraso_maximo=args.atraso_maximo, replica_intervalo=1.0)
+    time.sleep(1.5)  # primeiro check das réplicas
+    falhas = []
+
+    # 1) Leituras sem escrita: rodízio entre as réplicas disponíveis
+    replicas.nova_requisicao()
+    antes = consultas_por_no(db)
+    inicio = time.perf_counter()
+    for _ in range(args.leituras):
+        db.buscar_funcionarios()
+    duracao = time.perf_counter() - inicio
+    leituras = diferenca(consultas_por_no(db), antes)
+    print(f'leituras: {args.leituras} em {duracao:.2f}s → {leituras}')
+    disponiveis = [no for no in db.roteador.replicas if no.saudavel and no.motivo is None]
+    if disponiveis and leituras['primario']:
+        falhas.append('leituras foram ao primário com réplica disponível')
+
+    # 2) Escrita e leitura na mesma requisição: a leitura vê o cargo novo
+    replicas.nova_requisicao()
+    nome = f'bench-replica-{uuid.uuid4().hex[:8]}'
+    cargo_id = db.inserir_cargo(nome, 1000, 'bench_replicas', usuario='bench')
+    antes = consultas_por_no(db)
+    # Sem cache de propósito: é a mesma rota de leitura do buscar_funcionarios
+    visto = bool(db._buscar("SELECT nome FROM cargos WHERE id = %s", (cargo_id,)))
+    depois = diferenca(consultas_por_no(db), antes)
+    print(f'read-your-writes: cargo {"visto" if visto else "NÃO visto"}, leituras → {depois}')
+    if not visto or any(v for no, v in depois.items() if no != 'primario'):
+        falhas.append('leitura depois da escrita não foi ao primário')
+    db.deletar_cargo(cargo_id, usuario='bench')
+
+    # 3) Estado final de cada nó (erros > 0 numa réplica: leituras desviadas para o primário)
+    for no in db.roteador.estatisticas():
+        print(f"  {no['no']:<22} {no['papel']:<9} consultas={no['consultas']:<6} erros={no['erros']:<3} "
+              f"atraso={no['atraso_s']} {no['motivo'] or ''}")
+
+    db.auditoria.fechar()
+    if falhas:
+        print('FALHOU:', '; '.join(falhas))
+        sys.exit(1)
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+benchmarks/bench_serializacao.py
+
+Compara o serializador antigo (isinstance por valor + strftime) com o
+serializador por coluna de services/serializacao.py em linhas no
+formato de GET /api/consultas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serializacao --linhas 100000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from pymysql.constants import FIELD_TYPE
+
+from services.serializacao import Resultado, dumps_json, serializar_lista
+
+
+# ======================================================
+# IMPLEMENTAÇÃO ANTERIOR (referência)
+# ======================================================
+def serializar_antigo(obj):
+    if isinstance(obj, timedelta):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.strftime('%d/%m/%Y %H:%M:%S')
+    if isinstance(obj, date):
+        return obj.strftime('%d/%m/%Y')
+    return obj
+
+
+def serializar_lista_antigo(lista):
+    dados = []
+    for item in lista:
+        novo = {}
+        for chave, valor in item.items():
+            novo[chave] = serializar_antigo(valor)
+        dados.append(novo)
+    return dados
+
+
+# ======================================================
+# DADOS SINTÉTICOS
+# ======================================================
+DESCRICAO = (
+    ('id', FIELD_TYPE.LONG), ('paciente_id', FIELD_TYPE.LONG), ('consulta', FIELD_TYPE.VAR_STRING),
+    ('data', FIELD_TYPE.DATE), ('hora', FIELD_TYPE.TIME), ('status', FIELD_TYPE.VAR_STRING),
+    ('paciente_nome', FIELD_TYPE.VAR_STRING), ('paciente_cpf', FIELD_TYPE.VAR_STRING),
+)
+
+
+def gerar_consultas(total, semente=42):
+    rnd = random.Random(semente)
+    inicio = date(2023, 1, 1)
+    especialidades = ['Cardiologia', 'Clínico Geral', 'Dermatologia', 'Pediatria', 'Ortopedia']
+    status = ['Agendada', 'Confirmada', 'Realizada', 'Cancelada']
+    linhas = []
+    for i in range(total):
+        linhas.append({
+            'id': i + 1,
+            'paciente_id': rnd.randint(1, total // 3 + 1),
+            'consulta': rnd.choice(especialidades),
+            'data': inicio + timedelta(days=rnd.randint(0, 730)),
+            'hora': timedelta(hours=rnd.randint(8, 17), minutes=rnd.choice((0, 30))),
+            'status': rnd.choice(status),
+            'paciente_nome': f'Paciente {i}',
+            'paciente_cpf': f'{rnd.randint(0, 99999999999):011d}',
+        })
+    return Resultado(linhas, [(nome, tipo, None, None, None, None, True) for nome, tipo in DESCRICAO])
+
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    linhas = gerar_consultas(args.linhas)
+
+    # Os dois caminhos precisam produzir exatamente o mesmo JSON
+    assert serializar_lista_antigo(linhas[:1000]) == serializar_lista(Resultado(linhas[:1000], linhas.descricao))
+
+    casos = [
+        ('antigo: serializar_lista', lambda: serializar_lista_antigo(linhas)),
+        ('novo:   serializar_lista', lambda: serializar_lista(linhas)),
+        ('antigo: lista + json.dumps', lambda: json.dumps(serializar_lista_antigo(linhas), sort_keys=True)),
+        ('novo:   lista + dumps_json', lambda: dumps_json(serializar_lista(linhas))),
+    ]
+    print(f"{args.linhas} linhas, melhor de {args.repeticoes} execuções")
+    resultados = {}
+    for nome, funcao in casos:
+        resultados[nome] = medir(funcao, args.repeticoes)
+        print(f"  {nome:<28} {resultados[nome] * 1000:9.1f} ms")
+
+    base = resultados['antigo: lista + json.dumps']
+    print(f"  ganho ponta a ponta: {base / resultados['novo:   lista + dumps_json']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
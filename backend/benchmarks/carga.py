@@ -0,0 +1,288 @@
+"""
+benchmarks/carga.py
+
+Teste de carga dos endpoints da API com clientes concorrentes.
+
+Alvos:
+    teste  - Flask test client, no mesmo processo (mede app + banco, sem HTTP)
+    wsgi   - servidor WSGI real (werkzeug, com threads) subido neste processo
+    url    - servidor já rodando (ex.: gunicorn do docker-compose), via --url
+
+Para cada endpoint mede p50/p95/p99, vazão e o pico de RSS do processo
+(nos alvos teste/wsgi o servidor roda aqui, então o RSS inclui o app).
+Com --baseline compara com uma execução salva e sai com código 1 se
+algum endpoint regredir além da tolerância, para uso em CI.
+
+Uso (a partir de backend/, com o banco semeado por benchmarks.semear):
+    python -m benchmarks.carga --alvo teste --clientes 8 --requisicoes 500
+    python -m benchmarks.carga --alvo wsgi --saida baseline.json
+    python -m benchmarks.carga --alvo wsgi --baseline baseline.json --tolerancia 0.25
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import quote, urlsplit
+
+
+# ======================================================
+# ENDPOINTS
+# ======================================================
+def gerar_cpf(rnd):
+    # CPF com dígitos verificadores válidos, para o POST não cair na validação
+    numeros = [rnd.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(n * (tamanho + 1 - i) for i, n in enumerate(numeros[:tamanho]))
+        resto = (soma * 10) % 11
+        numeros.append(0 if resto == 10 else resto)
+    return ''.join(map(str, numeros))
+
+
+def endpoints(ctx):
+    """(nome, método, gerador de caminho, gerador de corpo, escrita)."""
+    dia = lambda rnd: (date.today() + timedelta(days=rnd.randint(-30, 7))).isoformat()
+    paciente = lambda rnd: rnd.randint(1, ctx['pacientes'])
+    consulta = lambda rnd: rnd.randint(1, ctx['consultas'])
+    nome = lambda rnd: quote(rnd.choice(['ana', 'silva', 'joao', 'mar', 'oliveira santos', 'li']))
+
+    return [
+        ('counts', 'GET', lambda rnd: '/api/counts', None, False),
+        ('cargos', 'GET', lambda rnd: '/api/cargos', None, False),
+        ('funcionarios', 'GET', lambda rnd: f'/api/funcionarios?nome={nome(rnd)}', None, False),
+        ('pacientes_busca', 'GET', lambda rnd: f'/api/pacientes?nome={nome(rnd)}', None, False),
+        ('paciente_id', 'GET', lambda rnd: f'/api/pacientes/{paciente(rnd)}', None, False),
+        ('search', 'GET', lambda rnd: f'/api/search?q={nome(rnd)}', None, False),
+        ('consultas_pagina', 'GET', lambda rnd: '/api/consultas?limit=100', None, False),
+        ('consultas_dia', 'GET', lambda rnd: f'/api/consultas?data_inicio={dia(rnd)}&data_fim={dia(rnd)}', None, False),
+        ('consultas_paciente', 'GET', lambda rnd: f'/api/consultas?paciente_id={paciente(rnd)}', None, False),
+        ('agenda_semana', 'GET', lambda rnd: f'/api/consultas/agenda?visao=semana&data={dia(rnd)}', None, False),
+        ('auditoria_pagina', 'GET', lambda rnd: '/api/auditoria?limit=100', None, False),
+        ('auditoria_modulo', 'GET', lambda rnd: '/api/auditoria?limit=100&modulo=Pacientes', None, False),
+        ('pool', 'GET', lambda rnd: '/api/pool', None, False),
+
+        ('paciente_criar', 'POST', lambda rnd: '/api/pacientes',
+         lambda rnd: {'nome': f'Carga {rnd.random()}', 'cpf': gerar_cpf(rnd),
+                      'data_nascimento': '1990-01-01', 'telefone': '', 'email': ''}, True),
+        ('consulta_criar', 'POST', lambda rnd: '/api/consultas',
+         lambda rnd: {'paciente_id': paciente(rnd), 'consulta': 'Clínico Geral', 'data': dia(rnd),
+                      'hora': f'{rnd.randint(8, 17):02d}:00', 'status': 'Agendada'}, True),
+        ('consulta_status', 'PATCH', lambda rnd: f'/api/consultas/{consulta(rnd)}',
+         lambda rnd: {'status': rnd.choice(['Agendada', 'Confirmada', 'Realizada'])}, True),
+    ]
+
+
+# ======================================================
+# CLIENTES
+# ======================================================
+class ClienteTeste:
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def requisitar(self, metodo, caminho, corpo):
+        resposta = self._cliente.open(caminho, method=metodo, json=corpo)
+        resposta.get_data()
+        return resposta.status_code
+
+
+class ClienteHTTP:
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self._host, self._porta = partes.hostname, partes.port or 80
+        self._conexao = None
+
+    def requisitar(self, metodo, caminho, corpo):
+        # Conexão keep-alive por cliente; reabre se o servidor fechar
+        for tentativa in range(2):
+            if self._conexao is None:
+                self._conexao = http.client.HTTPConnection(self._host, self._porta, timeout=60)
+            try:
+                dados = json.dumps(corpo).encode() if corpo is not None else None
+                cabecalhos = {'Content-Type': 'application/json'} if dados is not None else {}
+                self._conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+                resposta = self._conexao.getresponse()
+                resposta.read()
+                if resposta.getheader('Connection', '').lower() == 'close':
+                    self._conexao.close()
+                    self._conexao = None
+                return resposta.status
+            except (http.client.HTTPException, OSError):
+                self._conexao.close()
+                self._conexao = None
+                if tentativa:
+                    raise
+
+
+def iniciar_wsgi(app):
+    from werkzeug.serving import make_server
+
+    # Sem o log de acesso por requisição, que pesaria na medição
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name='wsgi-benchmark', daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_port}'
+
+
+# ======================================================
+# MEDIÇÃO
+# ======================================================
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    # Nearest-rank
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def rss_pico_mb():
+    # ru_maxrss vem em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def executar_endpoint(criar_cliente, endpoint, clientes, requisicoes, aquecimento, semente, medir_rss):
+    _, metodo, caminho, corpo, _ = endpoint
+    por_cliente = max(1, requisicoes // clientes)
+    largada = threading.Barrier(clientes)
+    janelas = []
+
+    def trabalhador(indice):
+        rnd = random.Random(semente * 1000 + indice)
+        cliente = criar_cliente()
+        for _ in range(aquecimento):
+            try:
+                cliente.requisitar(metodo, caminho(rnd), corpo(rnd) if corpo else None)
+            except Exception:
+                pass  # falhas reais aparecem na medição; aqui só não podem travar a largada
+        # Todos os clientes começam a medir juntos, depois do aquecimento
+        largada.wait()
+        comeco = time.perf_counter()
+        latencias = []
+        erros = 0
+        for _ in range(por_cliente):
+            inicio = time.perf_counter()
+            try:
+                status = cliente.requisitar(metodo, caminho(rnd), corpo(rnd) if corpo else None)
+            except Exception:
+                status = 599
+            latencias.append(time.perf_counter() - inicio)
+            # 404 de ID sorteado que não existe e 409 de horário já ocupado não são erros do servidor
+            if status >= 500 or status == 400:
+                erros += 1
+        janelas.append((comeco, time.perf_counter()))
+        return latencias, erros
+
+    with ThreadPoolExecutor(max_workers=clientes) as executor:
+        resultados = list(executor.map(trabalhador, range(clientes)))
+    duracao = max(fim for _, fim in janelas) - min(comeco for comeco, _ in janelas)
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    return {
+        'requisicoes': len(latencias),
+        'erros': sum(e for _, e in resultados),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'vazao_rps': round(len(latencias) / duracao, 1),
+        'rss_pico_mb': rss_pico_mb() if medir_rss else None,
+    }
+
+
+# ======================================================
+# BASELINE
+# ======================================================
+def comparar(atual, baseline, tolerancia):
+    regressoes = []
+    for nome, medida in atual['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(nome)
+        if not base:
+            continue
+        if medida['p95_ms'] > base['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {base['p95_ms']} -> {medida['p95_ms']} ms")
+        if medida['vazao_rps'] < base['vazao_rps'] * (1 - tolerancia):
+            regressoes.append(f"{nome}: vazão {base['vazao_rps']} -> {medida['vazao_rps']} req/s")
+        if medida['erros'] > base['erros']:
+            regressoes.append(f"{nome}: erros {base['erros']} -> {medida['erros']}")
+    return regressoes
+
+
+def contexto_do_banco(criar_cliente):
+    # Faixas de IDs para sortear a partir dos contadores do próprio app
+    cliente = criar_cliente()
+    if isinstance(cliente, ClienteTeste):
+        counts = cliente._cliente.get('/api/counts').get_json()
+    else:
+        cliente._conexao = http.client.HTTPConnection(cliente._host, cliente._porta, timeout=60)
+        cliente._conexao.request('GET', '/api/counts')
+        counts = json.loads(cliente._conexao.getresponse().read())
+    return {'pacientes': max(1, counts['pacientes']), 'consultas': max(1, counts['consultas_total'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alvo', choices=['teste', 'wsgi', 'url'], default='teste')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clientes', type=int, default=8)
+    parser.add_argument('--requisicoes', type=int, default=400, help='por endpoint, somando todos os clientes')
+    parser.add_argument('--aquecimento', type=int, default=5, help='requisições não medidas por cliente')
+    parser.add_argument('--endpoints', help='lista separada por vírgula (padrão: todos os de leitura)')
+    parser.add_argument('--escrita', action='store_true', help='inclui endpoints que alteram o banco')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='grava o resultado em JSON (serve de baseline)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    servidor = None
+    if args.alvo == 'url':
+        url = args.url
+        criar_cliente = lambda: ClienteHTTP(url)
+    else:
+        from app import app  # o Database é criado no primeiro request, com as variáveis DB_*
+        if args.alvo == 'teste':
+            criar_cliente = lambda: ClienteTeste(app)
+        else:
+            servidor, url = iniciar_wsgi(app)
+            criar_cliente = lambda: ClienteHTTP(url)
+
+    ctx = contexto_do_banco(criar_cliente)
+    selecionados = set(args.endpoints.split(',')) if args.endpoints else None
+    lista = [e for e in endpoints(ctx)
+             if (selecionados is None and (args.escrita or not e[4])) or (selecionados and e[0] in selecionados)]
+
+    resultado = {'alvo': args.alvo, 'clientes': args.clientes, 'contexto': ctx, 'endpoints': {}}
+    print(f"alvo={args.alvo} clientes={args.clientes} requisicoes={args.requisicoes} {ctx}")
+    print(f"  {'endpoint':<20} {'req':>6} {'erros':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'rss MB':>7}")
+    for endpoint in lista:
+        medida = executar_endpoint(criar_cliente, endpoint, args.clientes, args.requisicoes,
+                                   args.aquecimento, args.semente, medir_rss=args.alvo != 'url')
+        resultado['endpoints'][endpoint[0]] = medida
+        print(f"  {endpoint[0]:<20} {medida['requisicoes']:>6} {medida['erros']:>5} {medida['p50_ms']:>8} "
+              f"{medida['p95_ms']:>8} {medida['p99_ms']:>8} {medida['vazao_rps']:>8} {medida['rss_pico_mb'] or '-':>7}")
+
+    if servidor is not None:
+        servidor.shutdown()
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print("Regressões acima da tolerância:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            sys.exit(1)
+        print("Sem regressões acima da tolerância.")
+
+
+if __name__ == '__main__':
+    main()
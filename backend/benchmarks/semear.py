@@ -0,0 +1,212 @@
+"""
+benchmarks/semear.py
+
+Popula o banco com dados sintéticos para os benchmarks de carga.
+
+Usa as mesmas variáveis DB_* do app e aplica as migrações pendentes
+antes de semear, então roda contra o MySQL do docker-compose
+(docker compose up -d db) ou qualquer MySQL/MariaDB local, sem rede.
+
+Uso (a partir de backend/):
+    python -m benchmarks.semear --escala 1k --limpar
+    python -m benchmarks.semear --escala 100k --pacientes 250000
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from services import comandos, contadores, migracoes
+from services.busca import normalizar_texto
+from services.cpf import digitos as digitos_cpf
+from services.db import Database
+
+ESCALAS = {
+    '1k': {'cargos': 10, 'funcionarios': 100, 'pacientes': 1000, 'consultas': 3000, 'auditoria': 5000},
+    '100k': {'cargos': 20, 'funcionarios': 1000, 'pacientes': 100000, 'consultas': 300000, 'auditoria': 500000},
+    '1m': {'cargos': 30, 'funcionarios': 5000, 'pacientes': 1000000, 'consultas': 3000000, 'auditoria': 5000000},
+}
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João',
+         'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vitória', 'William']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Melo', 'Barbosa', 'Conceição']
+ESPECIALIDADES = ['Cardiologia', 'Clínico Geral', 'Dermatologia', 'Pediatria', 'Ortopedia', 'Ginecologia']
+STATUS = ['Agendada', 'Confirmada', 'Realizada', 'Cancelada']
+MODULOS = ['Pacientes', 'Consultas', 'Funcionários', 'Cargos']
+ACOES = ['INSERT', 'UPDATE', 'DELETE']
+
+TABELAS = ['auditoria', 'consultas', 'pacientes', 'funcionarios', 'cargos', 'contadores']
+
+
+def conectar():
+    db = Database(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 3306)),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD", "root"),
+        database=os.getenv("DB_NAME", "medcore"),
+        retries=1
+    )
+    with db._conexao() as conn:
+        migracoes.aplicar(conn)
+    return db
+
+
+# ======================================================
+# GERADORES
+# ======================================================
+def nome_aleatorio(rnd):
+    return f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}'
+
+
+def cpf_sequencial(i, prefixo):
+    # Único por tabela e por posição; não precisa ter dígito verificador válido
+    digitos = f'{prefixo}{i:010d}'
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def gerar_cargos(rnd, total, inicio):
+    for i in range(inicio, inicio + total):
+        yield comandos.valores_cargo(f'Cargo {i}', round(rnd.uniform(1500, 25000), 2), f'Descrição do cargo {i}')
+
+
+def gerar_funcionarios(rnd, total, inicio, cargos):
+    for i in range(inicio, inicio + total):
+        nome = nome_aleatorio(rnd)
+        cpf = cpf_sequencial(i, 1)
+        yield (nome, date(1960, 1, 1) + timedelta(days=rnd.randint(0, 15000)), f'Rua {i}', cpf,
+               f'funcionario{i}@medcore.local', f'(11) 9{i % 100000000:08d}', rnd.randint(1, cargos),
+               normalizar_texto(nome), digitos_cpf(cpf))
+
+
+def gerar_pacientes(rnd, total, inicio):
+    for i in range(inicio, inicio + total):
+        nome = nome_aleatorio(rnd)
+        cpf = cpf_sequencial(i, 2)
+        yield (nome, cpf, date(1940, 1, 1) + timedelta(days=rnd.randint(0, 30000)),
+               f'(11) 9{i % 100000000:08d}', f'paciente{i}@medcore.local', normalizar_texto(nome), digitos_cpf(cpf))
+
+
+def gerar_consultas(rnd, total, pacientes):
+    # Dois anos para trás e um mês para frente, como uma agenda real. Cada horário ativo
+    # é único por especialidade (uk_consultas_horario): os horários são sorteados sem
+    # repetição e o que passar da capacidade da agenda entra como cancelada
+    hoje = date.today()
+    horarios = [(especialidade, dia, hora, minuto)
+                for especialidade in ESPECIALIDADES
+                for dia in range(-730, 31)
+                for hora in range(8, 18)
+                for minuto in (0, 30)]
+    rnd.shuffle(horarios)
+    for i in range(total):
+        if i < len(horarios):
+            especialidade, dia, hora, minuto = horarios[i]
+            status = rnd.choice(STATUS)
+        else:
+            especialidade, dia, hora, minuto = rnd.choice(horarios)
+            status = 'Cancelada'
+        yield (rnd.randint(1, pacientes), especialidade, hoje + timedelta(days=dia),
+               timedelta(hours=hora, minutes=minuto), status)
+
+
+def gerar_auditoria(rnd, total):
+    agora = datetime.now()
+    for i in range(total):
+        yield (agora - timedelta(seconds=rnd.randint(0, 730 * 86400)), 'Sistema', rnd.choice(MODULOS),
+               rnd.choice(ACOES), f'Evento sintético {i}')
+
+
+SQL = {
+    'cargos': comandos.SQL_INSERIR_CARGO,
+    'funcionarios': """
+        INSERT INTO funcionarios (nome, data_nascimento, endereco, cpf, email, telefone, cargo_id, nome_busca, cpf_digitos)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """,
+    'pacientes': """
+        INSERT INTO pacientes (nome, cpf, data_nascimento, telefone, email, nome_busca, cpf_digitos)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """,
+    'consultas': "INSERT INTO consultas (paciente_id, consulta, data, hora, status) VALUES (%s, %s, %s, %s, %s)",
+    'auditoria': "INSERT INTO auditoria (data_hora, usuario, modulo, acao, detalhes) VALUES (%s, %s, %s, %s, %s)",
+}
+
+
+# ======================================================
+# CARGA
+# ======================================================
+def inserir(db, tabela, linhas, lote):
+    inicio = time.perf_counter()
+    total = 0
+    bloco = []
+    with db._conexao() as conn, conn.cursor() as cur:
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= lote:
+                cur.executemany(SQL[tabela], bloco)
+                conn.commit()
+                total += len(bloco)
+                bloco = []
+        if bloco:
+            cur.executemany(SQL[tabela], bloco)
+            conn.commit()
+            total += len(bloco)
+    duracao = time.perf_counter() - inicio
+    print(f"  {tabela:<13} {total:>10} linhas em {duracao:7.1f} s ({total / max(duracao, 1e-9):,.0f}/s)")
+
+
+def limpar(db):
+    with db._conexao() as conn, conn.cursor() as cur:
+        cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for tabela in TABELAS:
+            cur.execute(f"TRUNCATE TABLE {tabela}")
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        conn.commit()
+
+
+def proximo_id(db, tabela):
+    with db._conexao() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) AS maximo FROM {tabela}")
+        return cur.fetchone()['maximo'] + 1
+
+
+def ressemear_contadores(db):
+    # Os INSERTs diretos não passam pelos métodos de escrita: recalcula tudo
+    with db._conexao() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM contadores")
+        cur.execute(contadores.SQL_SEMEAR)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='1k')
+    for tabela in ESCALAS['1k']:
+        parser.add_argument(f'--{tabela}', type=int, help=f'sobrescreve o total de {tabela} da escala')
+    parser.add_argument('--lote', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--limpar', action='store_true', help='esvazia as tabelas antes de semear')
+    args = parser.parse_args()
+
+    totais = {t: getattr(args, t) if getattr(args, t) is not None else n for t, n in ESCALAS[args.escala].items()}
+    rnd = random.Random(args.semente)
+    db = conectar()
+    if args.limpar:
+        limpar(db)
+
+    print(f"Semeando escala {args.escala}: {totais}")
+    cargos = proximo_id(db, 'cargos') - 1 + totais['cargos']
+    pacientes = proximo_id(db, 'pacientes') - 1 + totais['pacientes']
+    inserir(db, 'cargos', gerar_cargos(rnd, totais['cargos'], proximo_id(db, 'cargos')), args.lote)
+    inserir(db, 'funcionarios', gerar_funcionarios(rnd, totais['funcionarios'], proximo_id(db, 'funcionarios'), cargos), args.lote)
+    inserir(db, 'pacientes', gerar_pacientes(rnd, totais['pacientes'], proximo_id(db, 'pacientes')), args.lote)
+    inserir(db, 'consultas', gerar_consultas(rnd, totais['consultas'], pacientes), args.lote)
+    inserir(db, 'auditoria', gerar_auditoria(rnd, totais['auditoria']), args.lote)
+    ressemear_contadores(db)
+    db.auditoria.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,22 +2,10 @@ from flask import Blueprint, app, request, jsonify
 from pymysql import IntegrityError
 from backend.app import DB
 from services.db import get_db
-import re
+from services.cpf import validar as validar_cpf
 
 funcionario_bp = Blueprint('funcionario_bp', __name__)
 
-def validar_cpf(cpf: str) -> bool:
-    cpf = re.sub(r'\D', '', cpf or '')
-    if len(cpf) != 11 or cpf == cpf[0] * 11:
-        return False
-    def calc(digs):
-        s = sum(int(digs[i]) * (len(digs) + 1 - i) for i in range(len(digs)))
-        r = s % 11
-        return 0 if r < 2 else 11 - r
-    d1 = calc(cpf[:9])
-    d2 = calc(cpf[:10])
-    return d1 == int(cpf[9]) and d2 == int(cpf[10])
-
 @funcionario_bp.route('', methods=['GET'])
 def list_funcionarios():
     nome = request.args.get('nome', '')
@@ -0,0 +1,35 @@
+"""
+gunicorn.conf.py
+
+Lido automaticamente pelo gunicorn quando roda a partir de backend/.
+
+Importar o app não abre conexão (get_db() é preguiçoso), então o master
+pode carregar o código uma vez só (preload) e os workers nascem por
+fork já com tudo importado. Cada worker cria o próprio Database logo
+depois do fork, para a primeira requisição não pagar a abertura do pool.
+"""
+
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# gthread: cada cliente do /api/events prende uma destas threads enquanto está conectado
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+
+
+def post_worker_init(worker):
+    if not os.getenv("SSE_MAXIMO_CLIENTES"):
+        # Metade das threads do worker para o SSE, metade para as requisições comuns
+        from services import eventos
+        eventos.BARRAMENTO.maximo_clientes = max(1, worker.cfg.threads // 2)
+    if os.getenv("DB_CONECTAR_NO_BOOT", "1") != "1":
+        return
+    from app import TENANTS, get_db
+    if TENANTS is not None:
+        # Várias clínicas: cada banco abre na primeira requisição da clínica
+        return
+    try:
+        get_db()
+    except Exception as e:
+        # O worker sobe mesmo assim: /api/health responde e /api/ready mostra o problema
+        worker.log.warning(f"[DB] Banco indisponível no boot do worker {worker.pid}: {e}")
@@ -0,0 +1,262 @@
+"""
+services/arquivo_auditoria.py
+
+Camada de arquivo da auditoria: registros antigos saem da tabela quente
+(services/retencao.py) e ficam em disco, um NDJSON com gzip por mês.
+
+O manifesto.json do diretório descreve cada mês (linhas, primeiro e
+último data_hora, e os valores de modulo/acao/usuario presentes). Uma
+busca só abre os meses que podem ter resultado: o período e os filtros
+são conferidos no manifesto antes de descompactar qualquer coisa.
+
+O /api/auditoria continua na tabela e, quando ela acaba, segue para o
+arquivo com o mesmo cursor (data_hora, id): tudo que está no arquivo é
+mais antigo do que o que ficou na tabela.
+
+Os meses lidos ficam em memória já ordenados (os MESES_EM_CACHE mais
+recentes), presos ao tamanho e mtime do arquivo: paginar fundo no
+arquivo não descompacta nem ordena o mês de novo a cada página, e uma
+gravação (daqui ou do expurgo em outro processo) invalida o mês.
+"""
+
+import gzip
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from services.busca import sem_acentos
+from services.paginacao import decodificar_cursor
+from services.serializacao import Resultado
+
+NOME_MANIFESTO = 'manifesto.json'
+
+# Acima disso o manifesto deixa de listar os valores da coluna (e o mês não é descartado por ela)
+MAXIMO_VALORES_DISTINTOS = 1000
+
+COLUNAS_FILTRO = (('modulo', 'modulos'), ('acao', 'acoes'), ('usuario', 'usuarios'))
+
+# Meses descompactados mantidos em memória
+MESES_EM_CACHE = 4
+
+
+def _mes(data_hora):
+    return f'{data_hora.year:04d}-{data_hora.month:02d}' if data_hora else '0000-00'
+
+
+def linha_arquivo(registro):
+    return json.dumps({
+        'id': registro['id'],
+        'data_hora': registro['data_hora'].isoformat() if registro['data_hora'] else None,
+        'usuario': registro['usuario'],
+        'modulo': registro['modulo'],
+        'acao': registro['acao'],
+        'detalhes': registro['detalhes'],
+    }, ensure_ascii=False)
+
+
+def _ordem(registro):
+    return (registro['data_hora'] or datetime.min, registro['id'])
+
+
+def ler_linha(texto):
+    registro = json.loads(texto)
+    if registro['data_hora']:
+        registro['data_hora'] = datetime.fromisoformat(registro['data_hora'])
+    return registro
+
+
+def chave_do_cursor(apos):
+    """(data_hora, id) de um cursor do /api/auditoria."""
+    data_hora, ultimo_id = decodificar_cursor(apos, 2)
+    try:
+        return datetime.fromisoformat(data_hora), int(ultimo_id)
+    except (TypeError, ValueError):
+        raise ValueError("Cursor inválido")
+
+
+class ArquivoAuditoria:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._manifesto = {}
+        self._manifesto_mtime = None
+        self._lidos = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ======================================================
+    # MANIFESTO
+    # ======================================================
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def manifesto(self):
+        # O expurgo roda em outro processo: relê quando o arquivo muda
+        caminho = self._caminho(NOME_MANIFESTO)
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._manifesto_mtime:
+            with open(caminho, encoding='utf-8') as arquivo:
+                self._manifesto = json.load(arquivo).get('particoes', {})
+            self._manifesto_mtime = mtime
+        return self._manifesto
+
+    def _salvar_manifesto(self, particoes):
+        temporario = self._caminho(NOME_MANIFESTO + '.tmp')
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'particoes': particoes}, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        # Troca atômica: quem lê nunca vê um manifesto pela metade
+        os.replace(temporario, self._caminho(NOME_MANIFESTO))
+
+    # ======================================================
+    # ESCRITA
+    # ======================================================
+    def gravar(self, registros):
+        """Anexa os registros aos arquivos dos meses deles e atualiza o manifesto."""
+        por_mes = {}
+        for registro in registros:
+            por_mes.setdefault(_mes(registro['data_hora']), []).append(registro)
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        particoes = dict(self.manifesto())
+        for mes, linhas in sorted(por_mes.items()):
+            nome = f'auditoria-{mes}.ndjson.gz'
+            with open(self._caminho(nome), 'ab') as bruto:
+                # Cada lote vira um membro gzip novo no fim do arquivo
+                with gzip.GzipFile(fileobj=bruto, mode='wb') as arquivo:
+                    arquivo.write(('\n'.join(linha_arquivo(r) for r in linhas) + '\n').encode('utf-8'))
+                bruto.flush()
+                os.fsync(bruto.fileno())
+            particoes[mes] = self._descrever(particoes.get(mes), nome, linhas)
+        self._salvar_manifesto(particoes)
+        return sorted(por_mes)
+
+    def _descrever(self, anterior, nome, linhas):
+        datas = [r['data_hora'].isoformat() for r in linhas if r['data_hora']]
+        particao = dict(anterior or {'arquivo': nome, 'linhas': 0, 'inicio': None, 'fim': None})
+        particao['linhas'] += len(linhas)
+        if datas:
+            particao['inicio'] = min(filter(None, [particao['inicio'], min(datas)]))
+            particao['fim'] = max(filter(None, [particao['fim'], max(datas)]))
+        for coluna, campo in COLUNAS_FILTRO:
+            if anterior is not None and anterior.get(campo) is None:
+                continue  # já passou do limite de valores distintos
+            valores = set(particao.get(campo) or []) | {r[coluna] for r in linhas}
+            particao[campo] = sorted(valores, key=str) if len(valores) <= MAXIMO_VALORES_DISTINTOS else None
+        return particao
+
+    # ======================================================
+    # LEITURA
+    # ======================================================
+    def particoes(self, modulo=None, acao=None, usuario=None, data_inicio=None, data_fim=None, antes_de=None):
+        """Meses que podem ter registros para os filtros, do mais novo para o mais antigo."""
+        filtros = {'modulo': modulo, 'acao': acao, 'usuario': usuario}
+        limite_fim = data_fim + timedelta(days=1) if data_fim else None
+        meses = []
+        for mes, particao in sorted(self.manifesto().items(), reverse=True):
+            inicio = datetime.fromisoformat(particao['inicio']) if particao.get('inicio') else None
+            fim = datetime.fromisoformat(particao['fim']) if particao.get('fim') else None
+            if data_inicio and fim and fim < data_inicio:
+                continue
+            if limite_fim and inicio and inicio >= limite_fim:
+                continue
+            if antes_de and inicio and inicio > antes_de[0]:
+                continue
+            if all(self._pode_conter(particao.get(campo), coluna, filtros[coluna]) for coluna, campo in COLUNAS_FILTRO):
+                meses.append(mes)
+        return meses
+
+    @staticmethod
+    def _pode_conter(valores, coluna, filtro):
+        if not filtro or valores is None:
+            return True
+        if coluna == 'usuario':
+            # Mesmo critério do SQL: prefixo, sem diferença de maiúsculas/acentos
+            return any(sem_acentos(v).startswith(sem_acentos(filtro)) for v in valores)
+        return filtro in valores
+
+    def _carregar(self, mes):
+        """Registros do mês em (data_hora, id) crescente e as chaves dessa ordem."""
+        caminho = self._caminho(self.manifesto()[mes]['arquivo'])
+        estado = os.stat(caminho)
+        versao = (estado.st_size, estado.st_mtime_ns)
+        with self._lock:
+            lido = self._lidos.get(mes)
+            if lido and lido[0] == versao:
+                self._lidos.move_to_end(mes)
+                return lido[1], lido[2]
+
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            registros = sorted((ler_linha(texto) for texto in arquivo if texto.strip()), key=_ordem)
+        chaves = [_ordem(r) for r in registros]
+
+        with self._lock:
+            self._lidos[mes] = (versao, registros, chaves)
+            self._lidos.move_to_end(mes)
+            while len(self._lidos) > MESES_EM_CACHE:
+                self._lidos.popitem(last=False)
+        return registros, chaves
+
+    def ler_particao(self, mes, modulo=None, acao=None, usuario=None, data_inicio=None, data_fim=None, antes_de=None,
+                     limite=None):
+        """Registros do mês que casam com os filtros, em data_hora DESC, id DESC (no máximo limite)."""
+        registros, chaves = self._carregar(mes)
+        limite_fim = data_fim + timedelta(days=1) if data_fim else None
+        # Começa logo antes do cursor (ou do fim do período) e anda para trás
+        posicao = len(registros)
+        if antes_de:
+            posicao = bisect_left(chaves, antes_de)
+        if limite_fim:
+            posicao = min(posicao, bisect_left(chaves, (limite_fim,)))
+
+        encontrados = []
+        for indice in range(posicao - 1, -1, -1):
+            if limite is not None and len(encontrados) >= limite:
+                break
+            registro = registros[indice]
+            data_hora = registro['data_hora']
+            if data_inicio and (data_hora is None or data_hora < data_inicio):
+                break  # daqui para trás só tem mais antigos
+            if limite_fim and data_hora is None:
+                break
+            if modulo and registro['modulo'] != modulo:
+                continue
+            if acao and registro['acao'] != acao:
+                continue
+            if usuario and not sem_acentos(registro['usuario']).startswith(sem_acentos(usuario)):
+                continue
+            # Cópia: quem chama pode alterar o registro sem mexer no cache
+            encontrados.append(dict(registro))
+        return encontrados
+
+    def buscar(self, limite, antes_de=None, **filtros):
+        registros = []
+        for mes in self.particoes(antes_de=antes_de, **filtros):
+            registros.extend(self.ler_particao(mes, antes_de=antes_de, limite=limite - len(registros), **filtros))
+            if len(registros) >= limite:
+                break
+        return registros[:limite]
+
+    def iterar(self, lote=500, **filtros):
+        for mes in self.particoes(**filtros):
+            registros = self.ler_particao(mes, **filtros)
+            for inicio in range(0, len(registros), lote):
+                yield Resultado(registros[inicio:inicio + lote])
+
+
+def completar_com_arquivo(arquivo, registros, limite, apos, filtros):
+    """Página do /api/auditoria: se a tabela não encheu a página, o resto vem do arquivo."""
+    if arquivo is None or len(registros) > limite:
+        return registros
+    if registros:
+        ultimo = registros[-1]
+        antes_de = (ultimo['data_hora'], ultimo['id'])
+    else:
+        antes_de = chave_do_cursor(apos) if apos else None
+    registros.extend(arquivo.buscar(limite + 1 - len(registros), antes_de, **filtros))
+    return registros
@@ -0,0 +1,221 @@
+"""
+services/auditoria.py
+
+Gravação de auditoria em lote.
+
+No modo "assincrono" (padrão) os eventos vão para uma fila em memória e
+uma thread os grava com INSERTs de várias linhas, disparados por tamanho
+de lote ou por tempo. O GravadorAuditoria tem essa lógica uma vez só; o
+AuditoriaWriter a roda numa thread e o AuditoriaAsync (services/db_async.py)
+numa task do event loop. No modo "transacao" o evento é inserido dentro da
+própria transação de negócio e sai no mesmo COMMIT.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from services import contadores, roteiros
+from services.roteiros import passo, roteiro
+
+MODOS = ('assincrono', 'transacao')
+
+SQL_INSERIR = """
+    INSERT INTO auditoria (data_hora, usuario, modulo, acao, detalhes)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+_PARAR = object()
+
+
+def agora_brasilia():
+    # ✅ FORÇA O HORÁRIO DE BRASÍLIA (UTC-3)
+    # Pegamos a hora UTC e subtraímos 3 horas
+    return datetime.utcnow() - timedelta(hours=3)
+
+
+def evento_auditoria(usuario, modulo, acao, detalhes):
+    # O horário é o do fato, não o da gravação do lote
+    return (agora_brasilia(), usuario, modulo, acao, detalhes)
+
+
+class GravadorAuditoria:
+    """Fila, lotes e contagem da auditoria, iguais no WSGI e no ASGI.
+
+    Os métodos são roteiros (services/roteiros.py); cada modo dá só as
+    primitivas: _gravar_lote (conexão, INSERT e COMMIT), _por e _tirar
+    (a fila, com espera máxima), _iniciar, _em_execucao e _esperar (a
+    thread ou a task do flush).
+    """
+
+    def __init__(self, pool, fila, modo='assincrono', lote=200, intervalo=1.0, espera_maxima=2.0):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de auditoria inválido: {modo}")
+        self.pool = pool
+        self.modo = modo
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self._fila = fila
+        self._fechado = False
+
+        self.gravados = 0
+        self.lotes = 0
+        self.falhas = 0
+        self.gravacoes_diretas = 0
+
+    @property
+    def mesma_transacao(self):
+        return self.modo == 'transacao'
+
+    # ======================================================
+    # GRAVAÇÃO
+    # ======================================================
+    @roteiro
+    def inserir(self, cur, eventos):
+        # executemany junta tudo em um único INSERT ... VALUES (...), (...)
+        yield passo(cur.executemany, SQL_INSERIR, eventos)
+        yield passo(cur.executemany, contadores.SQL_INCREMENTAR,
+                    contadores.linhas_incremento({'auditoria': len(eventos)}))
+
+    @roteiro
+    def _gravar(self, eventos):
+        try:
+            yield passo(self._gravar_lote, eventos)
+            self.gravados += len(eventos)
+            self.lotes += 1
+        except Exception as e:
+            self.falhas += len(eventos)
+            print(f"[DB] Erro ao registrar auditoria: {e}")
+
+    @roteiro
+    def registrar(self, eventos):
+        # Eventos fora de uma transação de negócio
+        if self.mesma_transacao:
+            yield passo(self._gravar, list(eventos))
+        else:
+            yield passo(self.enfileirar, eventos)
+
+    @roteiro
+    def enfileirar(self, eventos):
+        if self._fechado:
+            yield passo(self._gravar, list(eventos))
+            return
+        self._iniciar()
+        for i, evento in enumerate(eventos):
+            # Backpressure: com a fila cheia a requisição espera um pouco...
+            if not (yield passo(self._por, evento)):
+                # ...e, se ainda assim não houver vaga, grava direto para não perder eventos
+                self.gravacoes_diretas += 1
+                yield passo(self._gravar, list(eventos[i:]))
+                return
+
+    # ======================================================
+    # FLUSH (na thread ou na task)
+    # ======================================================
+    @roteiro
+    def _executar(self):
+        parar = False
+        while not parar:
+            item = yield passo(self._tirar, None)
+            if item is _PARAR:
+                break
+
+            eventos = [item]
+            prazo = time.monotonic() + self.intervalo
+            while len(eventos) < self.lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                item = yield passo(self._tirar, restante)
+                if item is None:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                eventos.append(item)
+            yield passo(self._gravar, eventos)
+
+        # Flush final do que sobrou na fila
+        restantes = []
+        while not self._fila.empty():
+            item = self._fila.get_nowait()
+            if item is not _PARAR:
+                restantes.append(item)
+        for i in range(0, len(restantes), self.lote):
+            yield passo(self._gravar, restantes[i:i + self.lote])
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def estatisticas(self):
+        return {
+            'modo': self.modo,
+            'pendentes': self.pendentes(),
+            'gravados': self.gravados,
+            'lotes': self.lotes,
+            'falhas': self.falhas,
+            'gravacoes_diretas': self.gravacoes_diretas,
+        }
+
+    @roteiro
+    def fechar(self, timeout=10):
+        self._fechado = True
+        if self._em_execucao():
+            yield passo(self._fila.put, _PARAR)
+            yield passo(self._esperar, timeout)
+
+
+class AuditoriaWriter(GravadorAuditoria):
+    _rodar = staticmethod(roteiros.rodar)
+
+    def __init__(self, pool, modo='assincrono', lote=200, intervalo=1.0, capacidade=10000, espera_maxima=2.0):
+        super().__init__(pool, queue.Queue(maxsize=capacidade), modo, lote, intervalo, espera_maxima)
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.fechar)
+
+    def _gravar_lote(self, eventos):
+        with self.pool.conexao() as conn:
+            try:
+                with conn.cursor() as cur:
+                    self.inserir(cur, eventos)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _por(self, evento):
+        try:
+            self._fila.put(evento, timeout=self.espera_maxima)
+            return True
+        except queue.Full:
+            return False
+
+    def _tirar(self, espera):
+        try:
+            return self._fila.get(timeout=espera)
+        except queue.Empty:
+            return None
+
+    def _iniciar(self):
+        if self._em_execucao():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                # Iniciada no primeiro uso, o que também funciona depois de um fork
+                self._thread = threading.Thread(target=self._executar, name='auditoria-writer', daemon=True)
+                self._thread.start()
+
+    def _em_execucao(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _esperar(self, timeout):
+        self._thread.join(timeout)
+
+    def fechar(self, timeout=10):
+        # Clínica ociosa fecha e reabre o Database: sem isso os writers fechados se acumulam no atexit
+        atexit.unregister(self.fechar)
+        super().fechar(timeout)
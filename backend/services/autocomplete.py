@@ -0,0 +1,385 @@
+"""
+services/autocomplete.py
+
+Índice em memória para o /api/pacientes/autocomplete (seleção de
+paciente na tela de consultas), sem ir ao banco a cada tecla.
+
+Os nomes ficam num único bytearray (_texto), um registro por paciente:
+o nome sem acentos, um zero, o nome para exibir em UTF-8 e outro zero.
+Ao lado, arrays ordenados por id com o início do registro e o CPF como
+inteiro. As chaves de busca não são strings, são posições no _texto:
+  - o início do registro ("maria da silva"), para quem digita o começo do nome;
+  - o início de cada palavra seguinte ("silva"), para quem digita o sobrenome;
+e o CPF vai num array('Q') ordenado, para busca por prefixo de dígitos.
+As posições ficam ordenadas pelo texto a partir delas (até o zero); uma
+busca é um bisect e uma varredura curta, e os N primeiros saem em ordem
+alfabética, começos de nome antes de sobrenomes. Sem um objeto Python
+por nome, o que pesa é o próprio texto: cerca de 100 bytes por paciente.
+
+O índice é de cada processo. As escritas deste processo entram na hora
+(Database chama inserir/atualizar/remover depois do COMMIT). As dos
+outros workers chegam na atualização incremental: a cada `intervalo`
+segundos o Database lê do primário só os pacientes com atualizado_em
+depois da marca d'água e os ids de pacientes_excluidos, e aplica com
+concluir_atualizacao. A carga completa só acontece na primeira busca do
+processo (não na subida: jobs como a retenção também criam um Database),
+depois de uma importação em lote (expirar) ou se o processo ficou mais
+tempo sem atualizar do que as exclusões ficam guardadas.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from services.busca import normalizar_texto, parece_cpf
+from services.cpf import digitos as digitos_cpf
+
+INTERVALO = 10.0
+LIMITE_PADRAO = 10
+RETENTATIVA = 10.0   # segundos entre tentativas depois de uma carga que falhou
+PALAVRA_MINIMA = 3   # "da", "de" e "e" não viram chave de sobrenome
+
+# atualizado_em é o horário do UPDATE, não o do COMMIT: a atualização relê
+# esta folga antes da marca para não perder uma transação que demorou
+FOLGA = 5.0
+# Tempo que pacientes_excluidos guarda um id; parado mais que isso, o processo recarrega tudo
+RETENCAO_EXCLUSOES = 86400
+# Registros mortos no _texto antes de compactar (e só se forem metade dele)
+COMPACTAR_ACIMA = 64 * 1024
+
+
+def chaves_do_nome(nome_busca):
+    """Nome inteiro e o nome a partir de cada palavra seguinte (já sem acentos)."""
+    palavras = nome_busca.split()
+    if not palavras:
+        return '', []
+    return ' '.join(palavras), [' '.join(palavras[i:]) for i in range(1, len(palavras))
+                                if len(palavras[i]) >= PALAVRA_MINIMA]
+
+
+def _deslocamentos(busca):
+    """Posições, dentro do nome sem acentos em bytes, onde começam as chaves de chaves_do_nome."""
+    deslocamentos, posicao = [0], 0
+    palavras = busca.split(b' ')
+    for anterior, palavra in zip(palavras, palavras[1:]):
+        posicao += len(anterior) + 1
+        if len(palavra) >= PALAVRA_MINIMA:
+            deslocamentos.append(posicao)
+    return deslocamentos
+
+
+def _busca_em_bytes(nome_busca, nome):
+    # normalizar_texto só deixa [0-9a-z] separados por um espaço
+    return ' '.join((nome_busca or normalizar_texto(nome)).split()).encode('ascii')
+
+
+def cpf_como_inteiro(cpf):
+    numero = digitos_cpf(cpf)
+    return int(numero) if len(numero) == 11 else None
+
+
+def formatar_cpf(numero):
+    if not numero:
+        return None
+    texto = f'{numero:011d}'
+    return f'{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}'
+
+
+class IndiceAutocomplete:
+    __slots__ = ('intervalo', '_lock', '_texto', '_lixo', '_ids', '_registros', '_cpfs',
+                 '_inicio', '_ids_inicio', '_palavras', '_ids_palavras', '_cpfs_ordenados', '_ids_cpf',
+                 '_pendentes', '_tentar_apos', 'marca', 'carregado_em', 'atualizado_em', 'expirado',
+                 'buscas', 'atualizacoes')
+
+    def __init__(self, intervalo=INTERVALO):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._texto, self._lixo = bytearray(), 0
+        # Por paciente, em ordem de id: início do registro no _texto e CPF (0 = sem CPF)
+        self._ids, self._registros, self._cpfs = array('I'), array('I'), array('Q')
+        self._inicio, self._ids_inicio = array('I'), array('I')
+        self._palavras, self._ids_palavras = array('I'), array('I')
+        self._cpfs_ordenados, self._ids_cpf = array('Q'), array('I')
+        self._pendentes = None          # escritas que chegam durante uma carga ou atualização
+        self._tentar_apos = 0.0
+        self.marca = None               # NOW(6) do banco antes da última leitura
+        self.carregado_em = None
+        self.atualizado_em = None
+        self.expirado = False
+        self.buscas = 0
+        self.atualizacoes = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def pronto(self):
+        return self.carregado_em is not None
+
+    # ======================================================
+    # CARGA E ATUALIZAÇÃO
+    # ======================================================
+    def precisa_atualizar(self):
+        agora = time.monotonic()
+        if agora < self._tentar_apos:
+            return False
+        return not self.pronto or self.expirado or agora - self.atualizado_em > self.intervalo
+
+    def precisa_carga_completa(self):
+        # Sem marca, depois de importação em lote, ou parado tanto tempo que as exclusões já foram expurgadas
+        return (not self.pronto or self.expirado or self.marca is None
+                or time.monotonic() - self.atualizado_em > RETENCAO_EXCLUSOES / 2)
+
+    def desde(self):
+        """Horário a partir do qual a atualização incremental relê o banco."""
+        return self.marca - timedelta(seconds=FOLGA)
+
+    def iniciar_carga(self):
+        """True para quem deve carregar agora; False se outra carga já está em andamento."""
+        with self._lock:
+            if self._pendentes is not None:
+                return False
+            self._pendentes = []
+            return True
+
+    def cancelar_carga(self):
+        # Banco fora do ar: não tenta de novo a cada tecla
+        with self._lock:
+            self._pendentes = None
+            self._tentar_apos = time.monotonic() + RETENTATIVA
+
+    def concluir_carga(self, linhas, marca=None):
+        """Monta o índice com linhas {id, nome, nome_busca, cpf_digitos} e troca o atual de uma vez."""
+        registros = sorted(
+            (linha['id'], _busca_em_bytes(linha['nome_busca'], linha['nome']),
+             (linha['nome'] or '').encode('utf-8'), cpf_como_inteiro(linha['cpf_digitos']) or 0)
+            for linha in linhas
+        )
+        texto, ids, posicoes_registro, cpfs = bytearray(), array('I'), array('I'), array('Q')
+        inicio, palavras, por_cpf = [], [], []
+        for paciente_id, busca, nome, cpf in registros:
+            registro = len(texto)
+            texto += busca + b'\0' + nome + b'\0'
+            ids.append(paciente_id)
+            posicoes_registro.append(registro)
+            cpfs.append(cpf)
+            for deslocamento in _deslocamentos(busca):
+                chaves = palavras if deslocamento else inicio
+                chaves.append((busca[deslocamento:], paciente_id, registro + deslocamento))
+            if cpf:
+                por_cpf.append((cpf, paciente_id))
+        inicio.sort()
+        palavras.sort()
+        por_cpf.sort()
+
+        with self._lock:
+            self._texto, self._lixo = texto, 0
+            self._ids, self._registros, self._cpfs = ids, posicoes_registro, cpfs
+            self._inicio, self._ids_inicio = array('I', (p for _, _, p in inicio)), array('I', (i for _, i, _ in inicio))
+            self._palavras, self._ids_palavras = (array('I', (p for _, _, p in palavras)),
+                                                  array('I', (i for _, i, _ in palavras)))
+            self._cpfs_ordenados, self._ids_cpf = array('Q', (c for c, _ in por_cpf)), array('I', (i for _, i in por_cpf))
+            self._reaplicar_pendentes()
+            self.marca = marca
+            self.carregado_em = self.atualizado_em = time.monotonic()
+            self.expirado = False
+
+    def concluir_atualizacao(self, linhas, excluidos, marca):
+        """Aplica os pacientes alterados e os ids excluídos desde a marca anterior."""
+        with self._lock:
+            for linha in linhas:
+                self._inserir(linha['id'], linha['nome'], linha['cpf_digitos'], linha['nome_busca'])
+            for paciente_id in excluidos:
+                self._remover(paciente_id)
+            self._reaplicar_pendentes()
+            self.marca = marca
+            self.atualizado_em = time.monotonic()
+            self.atualizacoes += 1
+
+    def _reaplicar_pendentes(self):
+        # O que foi escrito enquanto se lia o banco pode não estar na leitura
+        for operacao, argumentos in self._pendentes or ():
+            operacao(*argumentos)
+        self._pendentes = None
+
+    def expirar(self):
+        # Muitas linhas de uma vez (importação): mais barato recarregar do que inserir uma a uma
+        self.expirado = True
+
+    # ======================================================
+    # ESCRITAS (depois do COMMIT)
+    # ======================================================
+    def inserir(self, paciente_id, nome, cpf):
+        self._escrever(self._inserir, paciente_id, nome, cpf)
+
+    def atualizar(self, paciente_id, nome, cpf):
+        self._escrever(self._inserir, paciente_id, nome, cpf)
+
+    def remover(self, paciente_id):
+        self._escrever(self._remover, paciente_id)
+
+    def _escrever(self, operacao, *argumentos):
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.append((operacao, argumentos))
+            operacao(*argumentos)
+
+    def _slot(self, paciente_id):
+        slot = bisect_left(self._ids, paciente_id)
+        return slot if slot < len(self._ids) and self._ids[slot] == paciente_id else None
+
+    def _inserir(self, paciente_id, nome, cpf, nome_busca=None):
+        # Chamado com o lock; também serve de atualização
+        nome, cpf = nome or '', cpf_como_inteiro(cpf) or 0
+        slot = self._slot(paciente_id)
+        if slot is not None:
+            if self._cpfs[slot] == cpf and self._nome(slot) == nome:
+                return  # a atualização incremental relê o que este processo já aplicou
+            self._remover(paciente_id)
+        busca = _busca_em_bytes(nome_busca, nome)
+        registro = len(self._texto)
+        self._texto += busca + b'\0' + nome.encode('utf-8') + b'\0'
+        slot = bisect_left(self._ids, paciente_id)
+        self._ids.insert(slot, paciente_id)
+        self._registros.insert(slot, registro)
+        self._cpfs.insert(slot, cpf)
+        for deslocamento in _deslocamentos(busca):
+            posicoes, ids = self._chaves(deslocamento)
+            posicao = self._posicao(posicoes, ids, busca[deslocamento:], paciente_id)
+            posicoes.insert(posicao, registro + deslocamento)
+            ids.insert(posicao, paciente_id)
+        if cpf:
+            posicao = _posicao_cpf(self._cpfs_ordenados, self._ids_cpf, cpf, paciente_id)
+            self._cpfs_ordenados.insert(posicao, cpf)
+            self._ids_cpf.insert(posicao, paciente_id)
+
+    def _remover(self, paciente_id):
+        slot = self._slot(paciente_id)
+        if slot is None:
+            return
+        registro = self._registros[slot]
+        fim_busca = self._texto.index(0, registro)
+        busca = bytes(self._texto[registro:fim_busca])
+        for deslocamento in _deslocamentos(busca):
+            posicoes, ids = self._chaves(deslocamento)
+            posicao = self._posicao(posicoes, ids, busca[deslocamento:], paciente_id)
+            if posicao < len(ids) and ids[posicao] == paciente_id:
+                del posicoes[posicao]
+                del ids[posicao]
+        cpf = self._cpfs[slot]
+        if cpf:
+            posicao = _posicao_cpf(self._cpfs_ordenados, self._ids_cpf, cpf, paciente_id)
+            if posicao < len(self._ids_cpf) and self._ids_cpf[posicao] == paciente_id:
+                del self._cpfs_ordenados[posicao]
+                del self._ids_cpf[posicao]
+        del self._ids[slot]
+        del self._registros[slot]
+        del self._cpfs[slot]
+        # O registro fica no _texto até a próxima compactação
+        self._lixo += self._texto.index(0, fim_busca + 1) + 1 - registro
+        if self._lixo > COMPACTAR_ACIMA and self._lixo * 2 > len(self._texto):
+            self._compactar()
+
+    def _compactar(self):
+        texto, registros = bytearray(), array('I')
+        for registro in self._registros:
+            fim = self._texto.index(0, self._texto.index(0, registro) + 1) + 1
+            registros.append(len(texto))
+            texto += self._texto[registro:fim]
+        # Cada chave anda o mesmo tanto que o registro do paciente dela
+        for posicoes, ids in ((self._inicio, self._ids_inicio), (self._palavras, self._ids_palavras)):
+            for i, paciente_id in enumerate(ids):
+                slot = bisect_left(self._ids, paciente_id)
+                posicoes[i] = posicoes[i] - self._registros[slot] + registros[slot]
+        self._texto, self._registros, self._lixo = texto, registros, 0
+
+    # ======================================================
+    # POSIÇÕES NO TEXTO
+    # ======================================================
+    def _chaves(self, deslocamento):
+        return (self._palavras, self._ids_palavras) if deslocamento else (self._inicio, self._ids_inicio)
+
+    def _chave(self, posicao):
+        return self._texto[posicao:self._texto.index(0, posicao)]
+
+    def _posicao(self, posicoes, ids, chave, paciente_id):
+        # Chaves iguais ("silva" aparece milhares de vezes) ficam em ordem de id, como na carga
+        inicio = bisect_left(posicoes, chave, key=self._chave)
+        return bisect_left(ids, paciente_id, inicio, bisect_right(posicoes, chave, inicio, key=self._chave))
+
+    def _nome(self, slot):
+        inicio = self._texto.index(0, self._registros[slot]) + 1
+        return self._texto[inicio:self._texto.index(0, inicio)].decode('utf-8')
+
+    # ======================================================
+    # BUSCA
+    # ======================================================
+    def buscar(self, termo, limite=LIMITE_PADRAO):
+        """Até `limite` pacientes {id, nome, cpf} cujo nome, sobrenome ou CPF começa com o termo."""
+        termo = (termo or '').strip()
+        with self._lock:
+            self.buscas += 1
+            if parece_cpf(termo):
+                ids = self._por_cpf(digitos_cpf(termo)[:11], limite)
+            else:
+                prefixo = normalizar_texto(termo).encode('ascii')
+                if not prefixo:
+                    return []
+                ids = self._por_prefixo(self._inicio, self._ids_inicio, prefixo, limite, [])
+                if len(ids) < limite:
+                    ids = self._por_prefixo(self._palavras, self._ids_palavras, prefixo, limite, ids)
+            return [self._paciente(i) for i in ids]
+
+    def _paciente(self, paciente_id):
+        slot = self._slot(paciente_id)
+        return {'id': paciente_id, 'nome': self._nome(slot), 'cpf': formatar_cpf(self._cpfs[slot])}
+
+    def _por_prefixo(self, posicoes, ids, prefixo, limite, encontrados):
+        vistos = set(encontrados)
+        posicao = bisect_left(posicoes, prefixo, key=self._chave)
+        # O prefixo não tem zero: startswith no _texto não passa do fim da chave
+        while len(encontrados) < limite and posicao < len(posicoes) and self._texto.startswith(prefixo, posicoes[posicao]):
+            paciente_id = ids[posicao]
+            if paciente_id not in vistos:
+                vistos.add(paciente_id)
+                encontrados.append(paciente_id)
+            posicao += 1
+        return encontrados
+
+    def _por_cpf(self, numero, limite):
+        if not numero:
+            return []
+        # Prefixo de k dígitos = intervalo [prefixo × 10^(11-k), (prefixo + 1) × 10^(11-k))
+        escala = 10 ** (11 - len(numero))
+        inicio = bisect_left(self._cpfs_ordenados, int(numero) * escala)
+        fim = bisect_left(self._cpfs_ordenados, (int(numero) + 1) * escala, inicio)
+        return list(self._ids_cpf[inicio:min(fim, inicio + limite)])
+
+    def pacientes(self):
+        """(id, nome, CPF como inteiro ou None) de todos os pacientes, em ordem de id."""
+        with self._lock:
+            return [(paciente_id, self._nome(slot), self._cpfs[slot] or None)
+                    for slot, paciente_id in enumerate(self._ids)]
+
+    def estatisticas(self):
+        with self._lock:
+            vetores = (self._ids, self._registros, self._cpfs, self._inicio, self._ids_inicio,
+                       self._palavras, self._ids_palavras, self._cpfs_ordenados, self._ids_cpf)
+            return {
+                'pronto': self.pronto,
+                'pacientes': len(self._ids),
+                'chaves': len(self._inicio) + len(self._palavras),
+                'bytes': len(self._texto) + sum(v.itemsize * len(v) for v in vetores),
+                'bytes_descartados': self._lixo,
+                'idade_s': round(time.monotonic() - self.atualizado_em, 1) if self.pronto else None,
+                'recarregando': self._pendentes is not None,
+                'atualizacoes': self.atualizacoes,
+                'buscas': self.buscas,
+            }
+
+
+def _posicao_cpf(cpfs, ids, cpf, paciente_id):
+    inicio = bisect_left(cpfs, cpf)
+    return bisect_left(ids, paciente_id, inicio, bisect_right(cpfs, cpf, inicio))
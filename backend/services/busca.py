@@ -0,0 +1,84 @@
+"""
+services/busca.py
+
+Normalização de nomes/CPFs e montagem dos filtros de busca indexados.
+
+Os nomes são gravados também em uma coluna "nome_busca" (minúsculas,
+sem acentos) coberta por um índice FULLTEXT, e o CPF em "cpf_digitos"
+(só números) com índice B-tree, para que a busca por prefixo use índice
+em vez de LIKE '%termo%'.
+"""
+
+import re
+import unicodedata
+
+from services.cpf import digitos as digitos_cpf
+
+# innodb_ft_min_token_size padrão: termos menores não entram no índice FULLTEXT
+TAMANHO_MINIMO_TOKEN = 3
+
+_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+_FORMATO_CPF = re.compile(r'[0-9.\-\s]+')
+
+
+def sem_acentos(texto):
+    """Minúsculas e sem acentos: compara como a collation padrão do MySQL (utf8mb4_0900_ai_ci)."""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def normalizar_texto(texto):
+    return _NAO_ALFANUMERICO.sub(' ', sem_acentos(texto)).strip()
+
+
+def parece_cpf(termo):
+    # Só dígitos e pontuação de CPF: a busca vai pela coluna de dígitos
+    return bool(termo) and bool(_FORMATO_CPF.fullmatch(termo.strip())) and bool(digitos_cpf(termo))
+
+
+def _escapar_like(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def filtro_nome(coluna, termo):
+    """Monta (condições, parâmetros, expressão de relevância) para um termo de nome."""
+    tokens = normalizar_texto(termo).split()
+    longos = [t for t in tokens if len(t) >= TAMANHO_MINIMO_TOKEN]
+    curtos = [t for t in tokens if len(t) < TAMANHO_MINIMO_TOKEN]
+
+    condicoes = []
+    params = []
+    relevancia = None
+
+    if longos:
+        # Modo booleano: todos os termos obrigatórios, cada um como prefixo
+        expressao = ' '.join(f'+{t}*' for t in longos)
+        condicoes.append(f"MATCH({coluna}) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(expressao)
+        relevancia = (f"MATCH({coluna}) AGAINST (%s IN BOOLEAN MODE)", [expressao])
+    elif curtos:
+        # Só termos curtos: o primeiro vira prefixo do nome (usa o índice B-tree)
+        condicoes.append(f"{coluna} LIKE %s")
+        params.append(f"{_escapar_like(curtos[0])}%")
+        curtos = curtos[1:]
+
+    for t in curtos:
+        # Termos curtos restantes filtram as linhas já selecionadas
+        condicoes.append(f"({coluna} LIKE %s OR {coluna} LIKE %s)")
+        params.extend([f"{_escapar_like(t)}%", f"% {_escapar_like(t)}%"])
+
+    return condicoes, params, relevancia
+
+
+def filtro_prefixo(coluna, termo):
+    # Começo do valor, sem diferença de maiúsculas/acentos (collation): usa o índice B-tree da coluna
+    return [f"{coluna} LIKE %s"], [f"{_escapar_like(termo)}%"]
+
+
+def filtro_cpf(coluna, termo):
+    digitos = digitos_cpf(termo)
+    if not digitos:
+        return [], []
+    return [f"{coluna} LIKE %s"], [f"{digitos}%"]
@@ -0,0 +1,198 @@
+"""
+services/cache.py
+
+Cache de leitura para entidades por ID e tabelas de referência.
+
+Dois backends com a mesma interface: LRU em memória com TTL (padrão) e
+Redis (ou compatível, ex.: KeyDB/Valkey) quando CACHE_BACKEND=redis.
+A invalidação é feita pelos métodos de escrita do Database, depois do
+COMMIT; o TTL só limita o tempo de vida de entradas esquecidas.
+
+Quem não achou a chave pega uma geração (reservar) antes de ir ao
+banco e só guarda o que leu se nenhuma invalidação aconteceu desde
+então: sem isso, uma leitura que começou antes de um COMMIT gravaria a
+linha velha por cima da invalidação e ela ficaria no cache até o TTL.
+
+O LRU é de cada processo, e a invalidação também: com vários workers,
+os outros só veem a mudança quando a entrada expira (TTL_MEMORIA). No
+Redis a geração é uma chave compartilhada, e a invalidação vale para
+todos os workers na hora.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+AUSENTE = object()
+
+TTL_MEMORIA = 30    # limita o tempo que os outros workers servem uma entrada já invalidada
+TTL_REDIS = 300
+
+
+class CacheLRU:
+    def __init__(self, max_itens=10000, ttl=300):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._geracao = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expiracoes = 0
+        self.invalidacoes = 0
+        self.descartes = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return AUSENTE
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.expiracoes += 1
+                self.misses += 1
+                return AUSENTE
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def reservar(self, chave):
+        return self._geracao
+
+    def guardar(self, chave, valor, ttl=None, geracao=None):
+        expira_em = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                # Houve invalidação enquanto o valor era lido: pode ser a linha de antes do COMMIT
+                self.descartes += 1
+                return
+            self._itens[chave] = (expira_em, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._geracao += 1
+            if self._itens.pop(chave, None) is not None:
+                self.invalidacoes += 1
+
+    def invalidar_prefixo(self, prefixo):
+        with self._lock:
+            self._geracao += 1
+            for chave in [c for c in self._itens if c.startswith(prefixo)]:
+                del self._itens[chave]
+                self.invalidacoes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': 'memoria',
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'expiracoes': self.expiracoes,
+                'invalidacoes': self.invalidacoes,
+                'descartes': self.descartes,
+            }
+
+
+# Grava só se a geração ainda é a lida no reservar (KEYS: chave, geração; ARGV: geração, valor, ttl)
+_GUARDAR_SE_GERACAO = """
+if (redis.call('get', KEYS[2]) or '0') ~= ARGV[1] then return 0 end
+redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class CacheRedis:
+    def __init__(self, url, namespace='medcore:', ttl=300):
+        import redis  # dependência opcional, só quando o backend é escolhido
+
+        self._redis = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+        self.descartes = 0
+        self.erros = 0
+        self._chave_geracao = namespace + '_geracao'
+        self._guardar_se = self._redis.register_script(_GUARDAR_SE_GERACAO)
+
+    def obter(self, chave):
+        try:
+            bruto = self._redis.get(self.namespace + chave)
+        except Exception:
+            # Cache fora do ar não derruba a leitura: vai direto ao banco
+            self.erros += 1
+            return AUSENTE
+        if bruto is None:
+            self.misses += 1
+            return AUSENTE
+        self.hits += 1
+        return pickle.loads(bruto)
+
+    def reservar(self, chave):
+        try:
+            return (self._redis.get(self._chave_geracao) or b'0').decode()
+        except Exception:
+            self.erros += 1
+            return None
+
+    def guardar(self, chave, valor, ttl=None, geracao=None):
+        try:
+            if geracao is None:
+                self._redis.set(self.namespace + chave, pickle.dumps(valor), ex=int(ttl or self.ttl))
+            elif not self._guardar_se(keys=[self.namespace + chave, self._chave_geracao],
+                                      args=[geracao, pickle.dumps(valor), int(ttl or self.ttl)]):
+                self.descartes += 1
+        except Exception:
+            self.erros += 1
+
+    def invalidar(self, chave):
+        try:
+            # A geração sobe antes de apagar: quem está lendo do banco agora não grava por cima
+            self._redis.incr(self._chave_geracao)
+            self.invalidacoes += self._redis.delete(self.namespace + chave)
+        except Exception:
+            self.erros += 1
+
+    def invalidar_prefixo(self, prefixo):
+        try:
+            self._redis.incr(self._chave_geracao)
+            chaves = list(self._redis.scan_iter(match=f'{self.namespace}{prefixo}*', count=500))
+            if chaves:
+                self.invalidacoes += self._redis.delete(*chaves)
+        except Exception:
+            self.erros += 1
+
+    def estatisticas(self):
+        total = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'invalidacoes': self.invalidacoes,
+            'descartes': self.descartes,
+            'erros': self.erros,
+        }
+
+
+def criar_cache(backend='memoria', max_itens=10000, ttl=None, redis_url=None, namespace='medcore:'):
+    if backend == 'redis':
+        return CacheRedis(redis_url or 'redis://localhost:6379/0', namespace=namespace, ttl=ttl or TTL_REDIS)
+    if backend != 'memoria':
+        raise ValueError(f"Backend de cache inválido: {backend}")
+    return CacheLRU(max_itens=max_itens, ttl=ttl or TTL_MEMORIA)
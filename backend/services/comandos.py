@@ -0,0 +1,513 @@
+"""
+services/comandos.py
+
+SQL das operações de negócio e as regras puras em volta dele (validação,
+parâmetros, paginação, agrupamento da agenda).
+
+É compartilhado pelo Database (pymysql, WSGI) e pelo DatabaseAsync
+(aiomysql, ASGI): os dois executam exatamente os mesmos comandos com os
+mesmos parâmetros, só muda o driver.
+"""
+
+from datetime import datetime, timedelta
+
+from services.busca import filtro_cpf, filtro_nome, filtro_prefixo, normalizar_texto, parece_cpf
+from services.cpf import digitos as digitos_cpf
+from services.cpf import validar_lote as validar_cpf_lote
+from services.paginacao import codificar_cursor, decodificar_cursor
+from services.serializacao import Resultado
+
+
+# ======================================================
+# PAGINAÇÃO
+# ======================================================
+def pagina(registros, limite, *colunas):
+    """Corta a linha extra (LIMIT limite + 1) e monta o cursor da próxima página."""
+    if len(registros) <= limite:
+        return registros, None
+    registros = Resultado(registros[:limite], registros.descricao)
+    ultimo = registros[-1]
+    return registros, codificar_cursor(*(ultimo[c] for c in colunas))
+
+
+# ======================================================
+# AUDITORIA
+# ======================================================
+def sql_auditoria(limite=None, apos=None, modulo=None, acao=None, usuario=None, data_inicio=None, data_fim=None):
+    filtros = []
+    params = []
+    if modulo:
+        filtros.append("modulo = %s")
+        params.append(modulo)
+    if acao:
+        filtros.append("acao = %s")
+        params.append(acao)
+    if usuario:
+        # Campo livre na tela: "ana" acha "Ana Paula" (prefixo, pelo idx_auditoria_usuario)
+        condicoes, valores = filtro_prefixo('usuario', usuario)
+        filtros += condicoes
+        params += valores
+    if data_inicio:
+        filtros.append("data_hora >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        # data_fim é inclusiva: tudo antes do dia seguinte
+        filtros.append("data_hora < %s")
+        params.append(data_fim + timedelta(days=1))
+    if apos:
+        data_hora, ultimo_id = decodificar_cursor(apos, 2)
+        filtros.append("(data_hora < %s OR (data_hora = %s AND id < %s))")
+        params.extend([data_hora, data_hora, ultimo_id])
+
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    sql = f"""
+        SELECT id, data_hora, usuario, modulo, acao, detalhes
+        FROM auditoria
+        {where}
+        ORDER BY data_hora DESC, id DESC
+    """
+    if limite is not None:
+        sql += " LIMIT %s"
+        params.append(limite)
+    return sql, params
+
+
+# Exclusão em blocos: cada bloco é uma transação curta, e o lock em auditoria
+# nunca passa de TAMANHO_BLOCO_EXCLUSAO linhas
+TAMANHO_BLOCO_EXCLUSAO = 500
+
+
+def sql_excluir_auditoria(ids):
+    ids = [int(i) for i in ids if str(i).isdigit()]
+    placeholders = ','.join(['%s'] * len(ids))
+    return f"DELETE FROM auditoria WHERE id IN ({placeholders})", ids
+
+
+def blocos_exclusao_auditoria(ids, tamanho=TAMANHO_BLOCO_EXCLUSAO):
+    """(sql, ids) por bloco; ids sem repetição e em ordem, para as transações travarem sempre na mesma ordem."""
+    ids = sorted({int(i) for i in ids if str(i).isdigit()})
+    for inicio in range(0, len(ids), tamanho):
+        yield sql_excluir_auditoria(ids[inicio:inicio + tamanho])
+
+
+# Retenção: anda pelo idx_auditoria_data_hora (data_hora, id) do mais antigo para o mais novo
+SQL_AUDITORIA_EXPIRADA = """
+    SELECT id, data_hora, usuario, modulo, acao, detalhes FROM auditoria
+    WHERE data_hora < %s ORDER BY data_hora, id LIMIT %s
+"""
+
+
+# ======================================================
+# CARGOS
+# ======================================================
+COLUNAS_CARGO = "id, nome, salario, descricao"
+
+
+def sql_cargos(nome=''):
+    # Mesma busca de pacientes e funcionários: prefixo de palavra no FULLTEXT de nome_busca
+    condicoes, params, _ = filtro_nome('nome_busca', nome)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return f"SELECT {COLUNAS_CARGO} FROM cargos {where} ORDER BY id DESC", params
+
+
+SQL_INSERIR_CARGO = "INSERT INTO cargos (nome, salario, descricao, nome_busca) VALUES (%s,%s,%s,%s)"
+SQL_ATUALIZAR_CARGO = "UPDATE cargos SET nome=%s, salario=%s, descricao=%s, nome_busca=%s WHERE id=%s"
+SQL_DELETAR_CARGO = "DELETE FROM cargos WHERE id=%s"
+
+
+def valores_cargo(nome, salario, descricao):
+    return (nome, salario, descricao, normalizar_texto(nome))
+
+
+# ======================================================
+# FUNCIONÁRIOS
+# ======================================================
+def sql_funcionarios(nome='', cpf=''):
+    condicoes_nome, params, _ = filtro_nome('f.nome_busca', nome)
+    condicoes_cpf, params_cpf = filtro_cpf('f.cpf_digitos', cpf)
+    filtros = condicoes_nome + condicoes_cpf
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    return f"""
+        SELECT f.id, f.nome, f.data_nascimento, f.endereco, f.cpf, f.email, f.telefone, f.cargo_id,
+               c.nome AS cargo_nome
+        FROM funcionarios f
+        JOIN cargos c ON f.cargo_id = c.id
+        {where}
+        ORDER BY f.id DESC
+    """, params + params_cpf
+
+
+SQL_INSERIR_FUNCIONARIO = """
+    INSERT INTO funcionarios (nome, data_nascimento, endereco, cpf, email, telefone, cargo_id, nome_busca, cpf_digitos)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+SQL_ATUALIZAR_FUNCIONARIO = """
+    UPDATE funcionarios SET nome=%s, data_nascimento=%s, endereco=%s, cpf=%s, email=%s, telefone=%s, cargo_id=%s,
+        nome_busca=%s, cpf_digitos=%s
+    WHERE id=%s
+"""
+
+SQL_DELETAR_FUNCIONARIO = "DELETE FROM funcionarios WHERE id=%s"
+
+
+def valores_funcionario(nome, data_nascimento, endereco, cpf, email, telefone, cargo_id):
+    return (nome, data_nascimento, endereco, cpf, email, telefone, cargo_id, normalizar_texto(nome), digitos_cpf(cpf))
+
+
+def valores_atualizar_funcionario(id, data):
+    return valores_funcionario(data.get('nome'), data.get('data_nascimento'), data.get('endereco'), data.get('cpf'),
+                               data.get('email'), data.get('telefone'), data.get('cargo_id')) + (id,)
+
+
+# ======================================================
+# RELATÓRIOS
+# ======================================================
+# Invalidado por qualquer escrita em cargos ou funcionários
+PREFIXO_RELATORIO_FUNCIONARIOS = 'relatorio:funcionarios:'
+
+
+def sql_relatorio_funcionarios(cargo_id=None, nome=''):
+    # Um GROUP BY só: quadro e folha por cargo (o salário é do cargo). O filtro de nome entra
+    # no JOIN para o cargo continuar na lista com zero funcionários.
+    condicoes_nome, params, _ = filtro_nome('f.nome_busca', nome)
+    juncao = ''.join(f" AND {c}" for c in condicoes_nome)
+    where = "WHERE c.id = %s" if cargo_id else ""
+    return f"""
+        SELECT c.id AS cargo_id, c.nome AS cargo, c.salario,
+               COUNT(f.id) AS funcionarios,
+               COALESCE(SUM(IF(f.id IS NULL, NULL, c.salario)), 0) AS folha,
+               ROUND(AVG(IF(f.id IS NULL, NULL, c.salario)), 2) AS media_salario
+        FROM cargos c
+        LEFT JOIN funcionarios f ON f.cargo_id = c.id{juncao}
+        {where}
+        GROUP BY c.id, c.nome, c.salario
+        ORDER BY c.nome, c.id
+    """, params + ([cargo_id] if cargo_id else [])
+
+
+# ======================================================
+# PACIENTES
+# ======================================================
+def sql_pacientes(nome='', cpf=''):
+    condicoes_nome, params, _ = filtro_nome('nome_busca', nome)
+    condicoes_cpf, params_cpf = filtro_cpf('cpf_digitos', cpf)
+    filtros = condicoes_nome + condicoes_cpf
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    return f"SELECT id, nome, cpf, data_nascimento, telefone, email FROM pacientes {where} ORDER BY id DESC", params + params_cpf
+
+
+SQL_PACIENTE_POR_ID = "SELECT id, nome, cpf, data_nascimento, telefone, email FROM pacientes WHERE id=%s"
+
+SQL_INSERIR_PACIENTE = """
+    INSERT INTO pacientes (nome, cpf, data_nascimento, telefone, email, nome_busca, cpf_digitos)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+SQL_ATUALIZAR_PACIENTE = """
+    UPDATE pacientes SET nome=%s, cpf=%s, data_nascimento=%s, telefone=%s, email=%s, nome_busca=%s, cpf_digitos=%s
+    WHERE id=%s
+"""
+
+# As consultas do paciente caem junto (ON DELETE CASCADE): os status saem dos contadores
+SQL_STATUS_CONSULTAS_DO_PACIENTE = "SELECT status FROM consultas WHERE paciente_id=%s FOR UPDATE"
+SQL_DELETAR_PACIENTE = "DELETE FROM pacientes WHERE id=%s"
+
+# Exclusões ficam registradas para a atualização incremental do autocomplete dos outros workers
+SQL_REGISTRAR_EXCLUSAO_PACIENTE = """
+    INSERT INTO pacientes_excluidos (paciente_id) VALUES (%s)
+    ON DUPLICATE KEY UPDATE excluido_em = CURRENT_TIMESTAMP(6)
+"""
+# Aproveita a exclusão para apagar as marcas velhas, poucas de cada vez
+SQL_EXPURGAR_EXCLUSOES_PACIENTES = """
+    DELETE FROM pacientes_excluidos WHERE excluido_em < NOW(6) - INTERVAL %s SECOND LIMIT 100
+"""
+
+# Índice em memória do autocomplete (services/autocomplete.py): carga completa e atualização incremental
+COLUNA_ATUALIZADO_EM = "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+SQL_AGORA = "SELECT NOW(6) AS agora"
+SQL_AUTOCOMPLETE_PACIENTES = "SELECT id, nome, nome_busca, cpf_digitos FROM pacientes"
+SQL_AUTOCOMPLETE_ALTERADOS = """
+    SELECT id, nome, nome_busca, cpf_digitos FROM pacientes WHERE atualizado_em >= %s
+"""
+SQL_AUTOCOMPLETE_EXCLUIDOS = "SELECT paciente_id FROM pacientes_excluidos WHERE excluido_em >= %s"
+
+
+def valores_paciente(nome, cpf, data_nascimento, telefone, email):
+    return (nome, cpf, data_nascimento, telefone, email, normalizar_texto(nome), digitos_cpf(cpf))
+
+
+def valores_atualizar_paciente(id, data):
+    return valores_paciente(data.get('nome'), data.get('cpf'), data.get('data_nascimento'),
+                            data.get('telefone'), data.get('email')) + (id,)
+
+
+def ler_data_nascimento(valor):
+    # Aceita AAAA-MM-DD (JSON) e DD/MM/AAAA (planilhas)
+    if not valor:
+        return None
+    valor = str(valor).strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data de nascimento inválida: {valor}")
+
+
+# ======================================================
+# IMPORTAÇÃO EM LOTE
+# ======================================================
+def _texto_importado(linha, campo):
+    # JSON pode mandar número (cpf: 52998224725) onde a planilha manda texto
+    valor = linha.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def validar_importacao(linhas):
+    """Devolve ([(número da linha, valores do INSERT)], erros) sem tocar no banco."""
+    erros = []
+    validos = []
+    vistos = set()
+    linhas = [linha if isinstance(linha, dict) else None for linha in linhas]
+    # Todos os CPFs do arquivo validados de uma vez (vetorizado com NumPy, ver services/cpf.py)
+    cpfs_validos = validar_cpf_lote([_texto_importado(linha, 'cpf') if linha else '' for linha in linhas])
+    for numero, linha in enumerate(linhas, start=1):
+        if linha is None:
+            erros.append({'linha': numero, 'cpf': '', 'erro': 'Linha inválida: esperado um objeto'})
+            continue
+        nome = _texto_importado(linha, 'nome')
+        cpf = _texto_importado(linha, 'cpf')
+        if not nome or not cpf:
+            erros.append({'linha': numero, 'cpf': cpf, 'erro': 'Nome e CPF são obrigatórios'})
+            continue
+        if not cpfs_validos[numero - 1]:
+            erros.append({'linha': numero, 'cpf': cpf, 'erro': 'CPF inválido'})
+            continue
+        try:
+            nascimento = ler_data_nascimento(linha.get('data_nascimento'))
+        except ValueError as e:
+            erros.append({'linha': numero, 'cpf': cpf, 'erro': str(e)})
+            continue
+        digitos = digitos_cpf(cpf)
+        if digitos in vistos:
+            erros.append({'linha': numero, 'cpf': cpf, 'erro': 'CPF repetido no arquivo'})
+            continue
+        vistos.add(digitos)
+        validos.append((numero, (nome, cpf, nascimento, _texto_importado(linha, 'telefone') or None,
+                                 _texto_importado(linha, 'email') or None, normalizar_texto(nome), digitos)))
+    return validos, erros
+
+
+def sql_cpfs_existentes(bloco):
+    digitos = [valores[6] for _, valores in bloco]
+    placeholders = ','.join(['%s'] * len(digitos))
+    return f"SELECT cpf_digitos FROM pacientes WHERE cpf_digitos IN ({placeholders})", digitos
+
+
+def separar_existentes(bloco, existentes, erros):
+    existentes = {r['cpf_digitos'] for r in existentes}
+    novos = []
+    for numero, valores in bloco:
+        if valores[6] in existentes:
+            erros.append({'linha': numero, 'cpf': valores[1], 'erro': 'CPF já cadastrado'})
+        else:
+            novos.append((numero, valores))
+    return novos
+
+
+def descricao_importacao(quantidade, primeira, ultima):
+    return f'Importação em lote de {quantidade} pacientes (linhas {primeira} a {ultima})'
+
+
+# ======================================================
+# BUSCA RANQUEADA
+# ======================================================
+def sql_busca_termo(tabela, termo, limite):
+    """SQL de /api/search para uma tabela, ou None se o termo não gera filtro."""
+    if parece_cpf(termo):
+        condicoes, params = filtro_cpf('cpf_digitos', termo)
+        relevancia, params_relevancia = "1", []
+    else:
+        condicoes, params, expr = filtro_nome('nome_busca', termo)
+        relevancia, params_relevancia = expr if expr else ("1", [])
+    if not condicoes:
+        return None
+    return f"""
+        SELECT id, nome, cpf, {relevancia} AS relevancia
+        FROM {tabela}
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY relevancia DESC, nome
+        LIMIT %s
+    """, params_relevancia + params + [limite]
+
+
+# ======================================================
+# CONSULTAS
+# ======================================================
+SQL_CONSULTAS = """
+    SELECT c.id, c.paciente_id, c.consulta, c.data, c.hora, c.status, p.nome AS paciente_nome, p.cpf AS paciente_cpf
+    FROM consultas c JOIN pacientes p ON c.paciente_id = p.id
+"""
+
+
+def filtros_consultas(data_inicio=None, data_fim=None, status=None, paciente_id=None, nome=None, consulta=None):
+    filtros = []
+    params = []
+    if paciente_id:
+        filtros.append("c.paciente_id = %s")
+        params.append(paciente_id)
+    if nome:
+        condicoes_nome, params_nome, _ = filtro_nome('p.nome_busca', nome)
+        filtros.extend(condicoes_nome)
+        params.extend(params_nome)
+    if consulta:
+        # Especialidade: prefixo no começo do uk_consultas_horario (consulta, data, hora, ...)
+        condicoes_consulta, params_consulta = filtro_prefixo('c.consulta', consulta)
+        filtros.extend(condicoes_consulta)
+        params.extend(params_consulta)
+    if data_inicio:
+        filtros.append("c.data >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        filtros.append("c.data <= %s")
+        params.append(data_fim)
+    if status:
+        placeholders = ','.join(['%s'] * len(status))
+        filtros.append(f"c.status IN ({placeholders})")
+        params.extend(status)
+    return filtros, params
+
+
+def sql_consultas(limite=None, apos=None, **filtros):
+    condicoes, params = filtros_consultas(**filtros)
+    if apos:
+        data, hora, ultimo_id = decodificar_cursor(apos, 3)
+        condicoes.append("(c.data < %s OR (c.data = %s AND (c.hora < %s OR (c.hora = %s AND c.id < %s))))")
+        params.extend([data, data, hora, hora, ultimo_id])
+
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    # idx_consultas_data (data, hora) já termina no id (chave primária do InnoDB)
+    sql = f"{SQL_CONSULTAS} {where} ORDER BY c.data DESC, c.hora DESC, c.id DESC"
+    if limite is not None:
+        sql += " LIMIT %s"
+        params.append(limite)
+    return sql, params
+
+
+def sql_agenda(data_inicio, data_fim, status=None):
+    condicoes, params = filtros_consultas(data_inicio, data_fim, status)
+    return f"{SQL_CONSULTAS} WHERE {' AND '.join(condicoes)} ORDER BY c.data, c.hora, c.id", params
+
+
+def montar_agenda(consultas, data_inicio, data_fim):
+    """Agrupa as consultas do período por dia; dias sem consulta também aparecem."""
+    dias = {}
+    dia = data_inicio
+    while dia <= data_fim:
+        dias[dia] = {'data': dia, 'total': 0, 'por_status': {}, 'consultas': Resultado(descricao=consultas.descricao)}
+        dia += timedelta(days=1)
+
+    for consulta in consultas:
+        dia = dias[consulta['data']]
+        dia['total'] += 1
+        status_consulta = consulta['status'] or ''
+        dia['por_status'][status_consulta] = dia['por_status'].get(status_consulta, 0) + 1
+        dia['consultas'].append(consulta)
+    return list(dias.values())
+
+
+# ======================================================
+# HORÁRIOS (SLOTS)
+# ======================================================
+# Uma consulta ativa por especialidade, dia e hora. slot_ativo é NULL nas
+# canceladas, e o índice único ignora NULL: cancelar libera o horário.
+INDICE_HORARIO = 'uk_consultas_horario'
+COLUNA_SLOT_ATIVO = "TINYINT AS (IF(status IN ('Cancelada'), NULL, 1)) STORED"
+
+SQL_HORARIOS_DUPLICADOS = """
+    SELECT consulta, data, hora, COUNT(*) AS total
+    FROM consultas WHERE slot_ativo IS NOT NULL
+    GROUP BY consulta, data, hora HAVING COUNT(*) > 1
+"""
+
+# Grade de atendimento padrão (sobrescrita por parâmetro na rota)
+EXPEDIENTE_INICIO = timedelta(hours=8)
+EXPEDIENTE_FIM = timedelta(hours=18)
+INTERVALO_MINUTOS = 30
+MAXIMO_DIAS_DISPONIBILIDADE = 31
+
+
+class HorarioOcupado(Exception):
+    """Já existe consulta ativa da mesma especialidade no mesmo dia e hora."""
+
+
+def horario_ocupado(erro):
+    # 1062 = chave duplicada; só conta se for no índice de horário (o CPF também é UNIQUE)
+    return bool(erro.args) and erro.args[0] == 1062 and INDICE_HORARIO in str(erro)
+
+
+def sql_disponibilidade(consulta, data_inicio, data_fim, inicio=EXPEDIENTE_INICIO, fim=EXPEDIENTE_FIM,
+                        intervalo=INTERVALO_MINUTOS, agora=None):
+    """Horários livres do período: a grade gerada no próprio MySQL menos as consultas ativas."""
+    if data_fim < data_inicio:
+        raise ValueError("data_fim anterior a data_inicio")
+    if (data_fim - data_inicio).days >= MAXIMO_DIAS_DISPONIBILIDADE:
+        raise ValueError(f"Período máximo de {MAXIMO_DIAS_DISPONIBILIDADE} dias")
+    if not 5 <= intervalo <= 240:
+        raise ValueError("Intervalo deve ficar entre 5 e 240 minutos")
+    if fim <= inicio:
+        raise ValueError("Fim do expediente anterior ao início")
+
+    # Sem "agora" nenhum horário é descartado por já ter passado
+    filtro_agora = "AND TIMESTAMP(d.dia, h.hora) > %s" if agora else ""
+
+    # O LEFT JOIN anda pelo uk_consultas_horario (consulta, data, hora, slot_ativo)
+    sql = f"""
+        WITH RECURSIVE
+            dias (dia) AS (
+                SELECT CAST(%s AS DATE)
+                UNION ALL SELECT dia + INTERVAL 1 DAY FROM dias WHERE dia < %s
+            ),
+            horarios (hora) AS (
+                SELECT CAST(%s AS TIME)
+                UNION ALL SELECT ADDTIME(hora, SEC_TO_TIME(%s)) FROM horarios
+                WHERE ADDTIME(hora, SEC_TO_TIME(%s)) < CAST(%s AS TIME)
+            )
+        SELECT d.dia AS data, h.hora
+        FROM dias d
+        CROSS JOIN horarios h
+        LEFT JOIN consultas c
+            ON c.consulta = %s AND c.data = d.dia AND c.hora = h.hora AND c.slot_ativo IS NOT NULL
+        WHERE c.id IS NULL {filtro_agora}
+        ORDER BY d.dia, h.hora
+    """
+    passo = intervalo * 60
+    params = [data_inicio, data_fim, str(inicio), passo, passo, str(fim), consulta]
+    if agora:
+        params.append(agora)
+    return sql, params
+
+
+def _hora_minuto(valor):
+    # TIME chega do driver como timedelta
+    segundos = int(valor.total_seconds())
+    return f'{segundos // 3600:02d}:{segundos % 3600 // 60:02d}'
+
+
+def montar_disponibilidade(linhas, data_inicio, data_fim):
+    """Agrupa os horários livres por dia; dias lotados aparecem com lista vazia."""
+    dias = {}
+    dia = data_inicio
+    while dia <= data_fim:
+        dias[dia] = []
+        dia += timedelta(days=1)
+    for linha in linhas:
+        dias[linha['data']].append(_hora_minuto(linha['hora']))
+    return [{'data': dia, 'horarios': horarios} for dia, horarios in dias.items()]
+
+
+SQL_INSERIR_CONSULTA = "INSERT INTO consultas (paciente_id, consulta, data, hora, status) VALUES (%s, %s, %s, %s, %s)"
+SQL_STATUS_CONSULTA = "SELECT status FROM consultas WHERE id=%s FOR UPDATE"
+SQL_ATUALIZAR_STATUS_CONSULTA = "UPDATE consultas SET status=%s WHERE id=%s"
+SQL_DELETAR_CONSULTA = "DELETE FROM consultas WHERE id=%s"
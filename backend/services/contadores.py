@@ -0,0 +1,94 @@
+"""
+services/contadores.py
+
+Contadores por entidade mantidos pelos próprios métodos de escrita.
+
+Cada contador é dividido em FATIAS linhas e cada incremento cai numa
+fatia aleatória, para que escritas concorrentes não disputem o lock da
+mesma linha. A leitura soma as fatias (a tabela tem poucas dezenas de
+linhas) e fica num cache em memória com TTL curto.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+FATIAS = 8
+
+SQL_INCREMENTAR = """
+    INSERT INTO contadores (chave, fatia, total) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+"""
+
+SQL_SEMEAR = """
+    INSERT IGNORE INTO contadores (chave, fatia, total)
+    SELECT 'cargos', 0, COUNT(*) FROM cargos
+    UNION ALL SELECT 'funcionarios', 0, COUNT(*) FROM funcionarios
+    UNION ALL SELECT 'pacientes', 0, COUNT(*) FROM pacientes
+    UNION ALL SELECT 'auditoria', 0, COUNT(*) FROM auditoria
+    UNION ALL SELECT CONCAT('consultas:', COALESCE(status, '')), 0, COUNT(*) FROM consultas GROUP BY status
+"""
+
+SQL_LER = "SELECT chave, SUM(total) AS total FROM contadores GROUP BY chave"
+
+
+def linhas_incremento(deltas):
+    # Ordenadas por (chave, fatia): duas transações que mexem nas mesmas chaves (status A→B e B→A)
+    # travam as linhas na mesma ordem e uma espera a outra em vez de cair em deadlock
+    return sorted((chave, random.randrange(FATIAS), delta) for chave, delta in deltas.items() if delta)
+
+
+def incrementar(cur, deltas):
+    linhas = linhas_incremento(deltas)
+    if linhas:
+        cur.executemany(SQL_INCREMENTAR, linhas)
+
+
+def montar_counts(linhas):
+    counts = {'cargos': 0, 'funcionarios': 0, 'pacientes': 0, 'consultas': {}, 'consultas_total': 0, 'auditoria': 0}
+    for linha in linhas:
+        chave, total = linha['chave'], int(linha['total'] or 0)
+        if chave.startswith('consultas:'):
+            status = chave.split(':', 1)[1]
+            counts['consultas'][status] = total
+            counts['consultas_total'] += total
+        else:
+            counts[chave] = total
+    return counts
+
+
+class CacheTTL:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._valor = None
+        self._expira_em = 0.0
+        self._lock = threading.Lock()
+        self._lock_async = None   # criado no event loop, no primeiro obter_async
+
+    def _valido(self):
+        return self._valor is not None and time.monotonic() < self._expira_em
+
+    def _guardar(self, valor):
+        self._valor = valor
+        self._expira_em = time.monotonic() + self.ttl
+        return valor
+
+    def obter(self, carregar):
+        if self._valido():
+            return self._valor
+        with self._lock:
+            # Só uma thread recarrega; as outras aproveitam o resultado
+            return self._valor if self._valido() else self._guardar(carregar())
+
+    async def obter_async(self, carregar):
+        """O mesmo para o DatabaseAsync: carregar() é corrotina e quem espera é a corrotina, não a thread."""
+        if self._valido():
+            return self._valor
+        if self._lock_async is None:
+            self._lock_async = asyncio.Lock()
+        async with self._lock_async:
+            return self._valor if self._valido() else self._guardar(await carregar())
+
+    def invalidar(self):
+        self._expira_em = 0.0
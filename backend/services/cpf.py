@@ -0,0 +1,95 @@
+"""
+services/cpf.py
+
+Normalização e validação de CPF, a mesma para cadastro, edição e
+importação em lote.
+
+validar() é o caminho de um CPF por vez: soma os pesos direto nos
+bytes ASCII dos dígitos, sem converter dígito a dígito. validar_lote()
+valida uma lista inteira; com NumPy (requirements-lote.txt) e a partir
+de LOTE_MINIMO itens, faz tudo em vetores: tira a pontuação, descarta
+sequências repetidas e calcula os dois dígitos verificadores de todos
+os CPFs de uma vez. Sem NumPy, cai no validar() item a item, com o
+mesmo resultado (conferido em benchmarks/bench_cpf.py).
+
+Só contam os dígitos ASCII 0-9. digitos() é também o que grava a coluna
+cpf_digitos (comandos, migrações e a busca por prefixo), para validação,
+importação e banco verem o mesmo número.
+"""
+
+import re
+from operator import mul
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+LOTE_MINIMO = 256   # abaixo disso montar os vetores custa mais que o laço
+
+_NAO_DIGITO = re.compile(r'[^0-9]')
+_PESOS_1 = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_2 = (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)
+# Os bytes de '0'..'9' valem 48..57: a soma dos pesos vezes 48 sai de uma vez só
+_DESCONTO_1 = 48 * sum(_PESOS_1)
+_DESCONTO_2 = 48 * sum(_PESOS_2)
+
+
+# ======================================================
+# UM CPF
+# ======================================================
+def digitos(cpf):
+    """Só os dígitos do CPF ('123.456.789-09' → '12345678909')."""
+    if not cpf:
+        return ''
+    texto = str(cpf)
+    if len(texto) == 11 and texto.isascii() and texto.isdigit():
+        return texto
+    return _NAO_DIGITO.sub('', texto)
+
+
+def validar(cpf):
+    numero = digitos(cpf)
+    if len(numero) != 11 or numero == numero[0] * 11:
+        return False
+    b = numero.encode('ascii')
+    dv1 = (sum(map(mul, b, _PESOS_1)) - _DESCONTO_1) * 10 % 11 % 10
+    if dv1 != b[9] - 48:
+        return False
+    dv2 = (sum(map(mul, b, _PESOS_2)) - _DESCONTO_2) * 10 % 11 % 10
+    return dv2 == b[10] - 48
+
+
+# ======================================================
+# LOTE
+# ======================================================
+def validar_lote(cpfs):
+    """Lista de booleanos, um por CPF, na mesma ordem."""
+    cpfs = list(cpfs)
+    if np is None or len(cpfs) < LOTE_MINIMO:
+        return [validar(c) for c in cpfs]
+    return _validar_vetorizado(cpfs).tolist()
+
+
+def _matriz_de_digitos(cpfs):
+    """(dígitos n×11 em int32, quantidade de dígitos de cada CPF)."""
+    textos = np.array(['' if not c else str(c) for c in cpfs], dtype=str)
+    if textos.dtype.itemsize == 0:
+        textos = textos.astype('U1')
+    # Cada caractere vira um código Unicode; os dígitos vão para a esquerda, na ordem
+    codigos = textos.view(np.uint32).reshape(len(textos), -1)
+    eh_digito = (codigos >= 48) & (codigos <= 57)
+    ordem = np.argsort(~eh_digito, axis=1, kind='stable')
+    compactados = np.take_along_axis(codigos, ordem, axis=1)
+    largura = compactados.shape[1]
+    if largura < 11:
+        compactados = np.pad(compactados, ((0, 0), (0, 11 - largura)), constant_values=48)
+    return compactados[:, :11].astype(np.int32) - 48, eh_digito.sum(axis=1)
+
+
+def _validar_vetorizado(cpfs):
+    matriz, quantidade = _matriz_de_digitos(cpfs)
+    repetido = (matriz == matriz[:, :1]).all(axis=1)
+    dv1 = matriz[:, :9] @ np.array(_PESOS_1, dtype=np.int32) * 10 % 11 % 10
+    dv2 = matriz[:, :10] @ np.array(_PESOS_2, dtype=np.int32) * 10 % 11 % 10
+    return (quantidade == 11) & ~repetido & (dv1 == matriz[:, 9]) & (dv2 == matriz[:, 10])
@@ -1,24 +1,87 @@
 import pymysql
+import threading
 import time
-from datetime import datetime, timedelta
-from pymysql.cursors import DictCursor
-from pymysql.err import IntegrityError
+from contextlib import contextmanager
+from pymysql.err import OperationalError
 
+from services.auditoria import AuditoriaWriter, evento_auditoria
+from services.autocomplete import IndiceAutocomplete
+from services import comandos, contadores, eventos, migracoes, replicas, roteiros
+from services.arquivo_auditoria import ArquivoAuditoria
+from services.cache import criar_cache
+from services.contadores import CacheTTL
+from services.metricas import METRICAS, CursorInstrumentado, SSCursorInstrumentado
+from services.operacoes import Operacoes
+from services.pool import ConnectionPool, PoolEsgotado
+from services.serializacao import Resultado
 
-class Database:
-    def __init__(self, host, port, user, password, database, retries=10, delay=3):
-        attempt = 0
-        while True:
-            try:
-                self.conn = pymysql.connect(
+
+class Transacao:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = None
+        self.eventos = []
+        self.contadores = {}
+        self.invalidacoes = []
+        self.mudancas = []
+        self.callbacks = []
+
+    def auditar(self, usuario, modulo, acao, detalhes):
+        self.eventos.append(evento_auditoria(usuario, modulo, acao, detalhes))
+
+    def contar(self, chave, delta):
+        self.contadores[chave] = self.contadores.get(chave, 0) + delta
+
+    def invalidar(self, chave, prefixo=False):
+        # Aplicado só depois do COMMIT, para o cache não ver dados que podem voltar atrás
+        self.invalidacoes.append((chave, prefixo))
+
+    def publicar(self, entidade, acao, registro_id=None, campos=None):
+        # Vai para o /api/events depois do COMMIT; `campos` deixa a tela aplicar a mudança sem reler
+        self.mudancas.append((entidade, acao, registro_id, campos))
+
+    def apos_commit(self, funcao, *args):
+        # Estado em memória do processo (índice do autocomplete): só muda se o COMMIT passar
+        self.callbacks.append((funcao, args))
+
+
+class Database(Operacoes):
+    def __init__(self, host, port, user, password, database, retries=10, delay=3,
+                 pool_min=1, pool_max=10, pool_timeout=10, pool_max_lifetime=3600,
+                 auditoria_modo='assincrono', auditoria_lote=200, auditoria_intervalo=1.0,
+                 contadores_ttl=2.0, cache_backend='memoria', cache_max_itens=10000, cache_ttl=None,
+                 cache_redis_url=None, slow_query_ms=500, arquivo_auditoria=None,
+                 replicas_leitura=(), replica_atraso_maximo=5.0, replica_intervalo=5.0, tenant=None,
+                 autocomplete_intervalo=10.0):
+        METRICAS.limite_lento_ms = slow_query_ms
+        # Clínica deste banco (services/tenants.py); None no deploy de uma clínica só
+        self.tenant = tenant
+
+        def fabrica_de(host, port, user, password, database):
+            def fabrica():
+                return pymysql.connect(
                     host=host,
                     port=int(port),
                     user=user,
                     password=password,
                     database=database,
-                    cursorclass=DictCursor,
+                    cursorclass=CursorInstrumentado,
                     autocommit=False  # 🔥 CONTROLE MANUAL
                 )
+            return fabrica
+
+        fabrica = fabrica_de(host, port, user, password, database)
+
+        attempt = 0
+        while True:
+            try:
+                self.pool = ConnectionPool(
+                    fabrica,
+                    min_size=pool_min,
+                    max_size=pool_max,
+                    timeout=pool_timeout,
+                    max_lifetime=pool_max_lifetime
+                )
                 break
             except Exception as e:
                 attempt += 1
@@ -27,328 +90,204 @@ class Database:
                 print(f"[DB] Falha ao conectar ({attempt}/{retries}): {e}")
                 time.sleep(delay)
 
-        self.criar_tabelas()
+        # Réplicas abrem conexão sob demanda: uma fora do ar não impede o app de subir
+        self.roteador = replicas.Roteador(
+            replicas.No('primario', self.pool, replica=False),
+            [
+                replicas.No(f"{r['host']}:{r['port']}", ConnectionPool(
+                    fabrica_de(**r),
+                    min_size=0,
+                    max_size=pool_max,
+                    timeout=min(pool_timeout, replicas.ESPERA_REPLICA),
+                    max_lifetime=pool_max_lifetime
+                ))
+                for r in replicas_leitura
+            ],
+            atraso_maximo=replica_atraso_maximo
+        )
+        self._parar_verificacao = None
+        if self.roteador.replicas:
+            self._parar_verificacao = replicas.iniciar_verificacao(self.roteador, replica_intervalo)
 
-    # ======================================================
-    # CRIAÇÃO DE TABELAS
-    # ======================================================
-    def criar_tabelas(self):
-        with self.conn.cursor() as cur:
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS cargos (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nome VARCHAR(100) NOT NULL,
-                    salario DECIMAL(10,2),
-                    descricao TEXT
-                )
-            """)
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS funcionarios (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nome VARCHAR(150),
-                    data_nascimento DATE,
-                    endereco VARCHAR(255),
-                    cpf VARCHAR(14) UNIQUE,
-                    email VARCHAR(150),
-                    telefone VARCHAR(20),
-                    cargo_id INT,
-                    FOREIGN KEY (cargo_id) REFERENCES cargos(id)
-                )
-            """)
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS pacientes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nome VARCHAR(150) NOT NULL,
-                    cpf VARCHAR(14) UNIQUE NOT NULL,
-                    data_nascimento DATE,
-                    telefone VARCHAR(20),
-                    email VARCHAR(150)
-                )
-            """)
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS consultas (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    paciente_id INT NOT NULL,
-                    consulta VARCHAR(100) NOT NULL,
-                    data DATE NOT NULL,
-                    hora TIME NOT NULL,
-                    status VARCHAR(30) DEFAULT 'Agendada',
-                    FOREIGN KEY (paciente_id)
-                        REFERENCES pacientes(id)
-                        ON DELETE CASCADE
-                )
-            """)
-
-            # ✅ REMOVIDO O DEFAULT CURRENT_TIMESTAMP PARA EVITAR CONFLITO DE FUSO DO SERVIDOR
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS auditoria (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    data_hora DATETIME,
-                    usuario VARCHAR(100),
-                    modulo VARCHAR(100),
-                    acao VARCHAR(20),
-                    detalhes TEXT
-                )
-            """)
+        self.auditoria = AuditoriaWriter(
+            self.pool,
+            modo=auditoria_modo,
+            lote=auditoria_lote,
+            intervalo=auditoria_intervalo
+        )
+        # Registros antigos que a retenção tirou da tabela (None: sem camada de arquivo)
+        self.arquivo_auditoria = ArquivoAuditoria(arquivo_auditoria) if arquivo_auditoria else None
+        self._cache_counts = CacheTTL(contadores_ttl)
+        self.cache = criar_cache(
+            cache_backend,
+            max_itens=cache_max_itens,
+            ttl=cache_ttl,
+            redis_url=cache_redis_url,
+            namespace=f'medcore:{tenant or database}:'
+        )
+        self.verificar_esquema()
+        # Índice do /api/pacientes/autocomplete: só carrega na primeira busca (buscar_autocomplete),
+        # para a retenção, os benchmarks e clínicas sem uso da tela não lerem a tabela inteira
+        self.autocomplete = IndiceAutocomplete(autocomplete_intervalo)
 
-        self.conn.commit()
+    def fechar(self):
+        """Grava a auditoria pendente e fecha os pools (clínica ociosa em services/tenants.py)."""
+        if self._parar_verificacao:
+            self._parar_verificacao.set()
+        self.auditoria.fechar()
+        for no in [self.roteador.primario] + self.roteador.replicas:
+            no.pool.fechar()
 
-    # ======================================================
-    # AUDITORIA
-    # ======================================================
-    def registrar_auditoria(self, usuario, modulo, acao, detalhes):
-        try:
-            # ✅ FORÇA O HORÁRIO DE BRASÍLIA (UTC-3)
-            # Pegamos a hora UTC e subtraímos 3 horas
-            agora_brasilia = datetime.utcnow() - timedelta(hours=3)
-            
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO auditoria (data_hora, usuario, modulo, acao, detalhes)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (agora_brasilia, usuario, modulo, acao, detalhes))
-            self.conn.commit()
-        except Exception as e:
-            print(f"[DB] Erro ao registrar auditoria: {e}")
-            self.conn.rollback()
-
-    def buscar_auditoria(self):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, data_hora, usuario, modulo, acao, detalhes
-                FROM auditoria
-                ORDER BY data_hora DESC
-            """)
-            return cur.fetchall()
-
-    def excluir_auditoria_em_lote(self, ids):
-        if not ids:
-            return 0
-        ids = [int(i) for i in ids if str(i).isdigit()]
-        if not ids:
-            return 0
-        placeholders = ','.join(['%s'] * len(ids))
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute(f"DELETE FROM auditoria WHERE id IN ({placeholders})", ids)
-                total = cur.rowcount
-            self.conn.commit()
-            return total
-        except Exception as e:
-            self.conn.rollback()
-            print('[DB] Erro ao excluir auditoria:', e)
-            return 0
+    def ping(self):
+        """Confere a conexão e relê a versão do esquema (usado pelo /api/ready)."""
+        with self._conexao() as conn, conn.cursor() as cur:
+            self.versao_esquema = migracoes.versao(cur)
+            conn.rollback()
+        return self.versao_esquema
 
-    # ======================================================
-    # CARGOS
-    # ======================================================
-    def buscar_cargos_por_nome(self, nome=''):
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT * FROM cargos WHERE nome LIKE %s ORDER BY id DESC", (f"%{nome}%",))
-            return cur.fetchall()
-
-    def inserir_cargo(self, nome, salario, descricao, usuario='Sistema'):
-        with self.conn.cursor() as cur:
-            cur.execute("INSERT INTO cargos (nome, salario, descricao) VALUES (%s,%s,%s)", (nome, salario, descricao))
-            cargo_id = cur.lastrowid
-        self.conn.commit()
-        self.registrar_auditoria(usuario, 'Cargos', 'INSERT', f'Cadastro do cargo "{nome}" (ID {cargo_id})')
-        return cargo_id
-
-    def atualizar_cargo(self, id, nome, salario, descricao, usuario='Sistema'):
-        with self.conn.cursor() as cur:
-            cur.execute("UPDATE cargos SET nome=%s, salario=%s, descricao=%s WHERE id=%s", (nome, salario, descricao, id))
-            sucesso = cur.rowcount > 0
-        self.conn.commit()
-        if sucesso:
-            self.registrar_auditoria(usuario, 'Cargos', 'UPDATE', f'Atualização do cargo ID {id}')
-        return sucesso
-
-    def deletar_cargo(self, id, usuario='Sistema'):
-        with self.conn.cursor() as cur:
-            cur.execute("DELETE FROM cargos WHERE id=%s", (id,))
-            sucesso = cur.rowcount > 0
-        self.conn.commit()
-        if sucesso:
-            self.registrar_auditoria(usuario, 'Cargos', 'DELETE', f'Exclusão do cargo ID {id}')
-        return sucesso
+    def verificar_esquema(self):
+        # Só lê a versão: o DDL é aplicado no deploy (python -m services.migracoes)
+        aviso = migracoes.aviso_de_versao(self.ping())
+        if aviso:
+            print(aviso)
 
-    # ======================================================
-    # FUNCIONÁRIOS
-    # ======================================================
-    def buscar_funcionarios(self, nome='', cpf=''):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                SELECT f.*, c.nome AS cargo_nome
-                FROM funcionarios f
-                JOIN cargos c ON f.cargo_id = c.id
-                WHERE f.nome LIKE %s AND f.cpf LIKE %s
-                ORDER BY f.id DESC
-            """, (f"%{nome}%", f"%{cpf}%"))
-            return cur.fetchall()
-
-    def inserir_funcionario(self, nome, data_nascimento, endereco, cpf, email, telefone, cargo_id, usuario='Sistema'):
-        if not self.validar_cpf(cpf):
-            raise ValueError("CPF inválido")
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO funcionarios (nome, data_nascimento, endereco, cpf, email, telefone, cargo_id)
-                VALUES (%s,%s,%s,%s,%s,%s,%s)
-            """, (nome, data_nascimento, endereco, cpf, email, telefone, cargo_id))
-            funcionario_id = cur.lastrowid
-        self.conn.commit()
-        self.registrar_auditoria(usuario, 'Funcionários', 'INSERT', f'Cadastro do funcionário "{nome}" (ID {funcionario_id})')
-        return funcionario_id
-
-    def atualizar_funcionario(self, id, data, usuario='Sistema'):
+    def _buscar(self, sql, params=None, primario=False):
+        # Devolve as linhas junto com a descrição das colunas (usada pelo serializador)
+        no = self.roteador.para_primario() if primario else self.roteador.para_leitura()
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE funcionarios SET nome=%s, data_nascimento=%s, endereco=%s, cpf=%s, email=%s, telefone=%s, cargo_id=%s
-                    WHERE id=%s
-                """, (data.get('nome'), data.get('data_nascimento'), data.get('endereco'), data.get('cpf'), data.get('email'), data.get('telefone'), data.get('cargo_id'), id))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Funcionários', 'UPDATE', f'Atualização do funcionário ID {id}')
-            return sucesso
-        except Exception as e:
-            self.conn.rollback()
-            return False
+            with no.pool.conexao() as conn, conn.cursor() as cur:
+                cur.execute(sql, params)
+                return Resultado(cur.fetchall(), cur.description)
+        except (OperationalError, PoolEsgotado) as e:
+            if not no.replica:
+                raise
+            # Réplica caiu entre dois checks (sai do rodízio) ou está sem conexão livre: lê do primário
+            self.roteador.desviar(no, e)
+            return self._buscar(sql, params, primario=True)
 
-    def deletar_funcionario(self, id, usuario='Sistema'):
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute("DELETE FROM funcionarios WHERE id=%s", (id,))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Funcionários', 'DELETE', f'Exclusão do funcionário ID {id}')
-            return sucesso
-        except Exception as e:
-            self.conn.rollback()
-            return False
+    def _conexao(self):
+        # Cada método pega uma conexão emprestada do pool e a devolve ao sair (sempre do primário)
+        return self.roteador.para_primario().pool.conexao()
 
-    # ======================================================
-    # CPF
-    # ======================================================
-    def validar_cpf(self, cpf):
-        if not cpf: return False
-        cpf = ''.join(filter(str.isdigit, str(cpf)))
-        if len(cpf) != 11 or cpf == cpf[0] * 11: return False
-        def calc(cpf, peso):
-            soma = sum(int(cpf[i]) * (peso - i) for i in range(peso - 1))
-            resto = (soma * 10) % 11
-            return resto if resto < 10 else 0
-        try:
-            return calc(cpf, 10) == int(cpf[9]) and calc(cpf, 11) == int(cpf[10])
-        except: return False
+    @contextmanager
+    def _transacao(self):
+        with self._conexao() as conn:
+            transacao = Transacao(conn)
+            try:
+                with conn.cursor() as cur:
+                    transacao.cur = cur
+                    yield transacao
+                    if transacao.eventos and self.auditoria.mesma_transacao:
+                        # A auditoria sai no mesmo COMMIT do negócio
+                        self.auditoria.inserir(cur, transacao.eventos)
+                    contadores.incrementar(cur, transacao.contadores)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        # Até o fim da requisição as leituras vão ao primário, que já tem esta escrita
+        replicas.marcar_escrita()
+        if transacao.contadores:
+            self._cache_counts.invalidar()
+        for chave, prefixo in transacao.invalidacoes:
+            if prefixo:
+                self.cache.invalidar_prefixo(chave)
+            else:
+                self.cache.invalidar(chave)
+        for funcao, args in transacao.callbacks:
+            funcao(*args)
+        if transacao.eventos and not self.auditoria.mesma_transacao:
+            self.auditoria.enfileirar(transacao.eventos)
+        if transacao.mudancas:
+            self._publicar_mudancas(transacao.mudancas, bool(transacao.contadores))
 
-    # ======================================================
-    # PACIENTES
-    # ======================================================
-    def buscar_pacientes(self, nome='', cpf=''):
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT id, nome, cpf, data_nascimento, telefone, email FROM pacientes WHERE nome LIKE %s AND cpf LIKE %s ORDER BY id DESC", (f"%{nome}%", f"%{cpf}%"))
-            return cur.fetchall()
-
-    def buscar_paciente_por_id(self, id):
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT id, nome, cpf, data_nascimento, telefone, email FROM pacientes WHERE id=%s", (id,))
-            return cur.fetchone()
-
-    def inserir_paciente(self, nome, cpf, data_nascimento, telefone, email, usuario='Sistema'):
-        if not self.validar_cpf(cpf): raise ValueError("CPF inválido")
+    def _publicar_mudancas(self, mudancas, contadores_mudaram):
+        counts = None
+        # Totais novos só se algum contador mudou e há alguém ouvindo
+        if contadores_mudaram and eventos.BARRAMENTO.clientes:
+            try:
+                counts = self.buscar_counts()
+            except Exception as e:
+                print(f"[DB] Totais fora do evento de mudança: {e}")
+        eventos.publicar_mudancas(mudancas, counts, self.tenant)
+
+    def _abrir_stream(self, no, sql, params):
+        conn = no.pool.obter()
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("INSERT INTO pacientes (nome, cpf, data_nascimento, telefone, email) VALUES (%s, %s, %s, %s, %s)", (nome, cpf, data_nascimento, telefone, email))
-                paciente_id = cur.lastrowid
-            self.conn.commit()
-            self.registrar_auditoria(usuario, 'Pacientes', 'INSERT', f'Cadastro do paciente "{nome}" (ID {paciente_id})')
-            return paciente_id
-        except IntegrityError:
-            self.conn.rollback()
-            raise IntegrityError("CPF já cadastrado")
-        except Exception as e:
-            self.conn.rollback()
+            cur = conn.cursor(SSCursorInstrumentado)
+            cur.execute(sql, params)
+        except Exception:
+            no.pool.devolver(conn, descartar=True)
             raise
+        return conn, cur
 
-    def atualizar_paciente(self, id, data, usuario='Sistema'):
+    def _iterar(self, sql, params=None, lote=500, primario=False):
+        # Cursor do lado do servidor: as linhas chegam em blocos, sem materializar o resultado
+        no = self.roteador.para_primario() if primario else self.roteador.para_leitura()
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("UPDATE pacientes SET nome=%s, cpf=%s, data_nascimento=%s, telefone=%s, email=%s WHERE id=%s", (data.get('nome'), data.get('cpf'), data.get('data_nascimento'), data.get('telefone'), data.get('email'), id))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Pacientes', 'UPDATE', f'Atualização do paciente ID {id}')
-            return sucesso
-        except Exception as e:
-            self.conn.rollback()
-            return False
-
-    def deletar_paciente(self, id, usuario='Sistema'):
+            conn, cur = self._abrir_stream(no, sql, params)
+        except (OperationalError, PoolEsgotado) as e:
+            if not no.replica:
+                raise
+            # Mesmo desvio do _buscar; depois do primeiro bloco já enviado não há como refazer
+            self.roteador.desviar(no, e)
+            no = self.roteador.para_primario()
+            conn, cur = self._abrir_stream(no, sql, params)
+        completo = False
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("DELETE FROM pacientes WHERE id=%s", (id,))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Pacientes', 'DELETE', f'Exclusão do paciente ID {id}')
-            return sucesso
-        except Exception as e:
-            self.conn.rollback()
-            return False
+            while True:
+                linhas = cur.fetchmany(lote)
+                if not linhas:
+                    break
+                yield Resultado(linhas, cur.description)
+            completo = True
+        finally:
+            if completo:
+                cur.close()
+            # Interrompido no meio: descarta a conexão em vez de drenar o resto do resultado
+            no.pool.devolver(conn, descartar=not completo)
 
     # ======================================================
-    # CONSULTAS
+    # PRIMITIVAS DAS OPERAÇÕES (services/operacoes.py)
     # ======================================================
-    def buscar_consultas(self):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                SELECT c.id, c.paciente_id, c.consulta, c.data, c.hora, c.status, p.nome AS paciente_nome, p.cpf AS paciente_cpf
-                FROM consultas c JOIN pacientes p ON c.paciente_id = p.id
-                ORDER BY c.data DESC, c.hora DESC
-            """)
-            return cur.fetchall()
-
-    def inserir_consulta(self, paciente_id, consulta, data, hora, status='Agendada', usuario='Sistema'):
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute("INSERT INTO consultas (paciente_id, consulta, data, hora, status) VALUES (%s, %s, %s, %s, %s)", (paciente_id, consulta, data, hora, status))
-                consulta_id = cur.lastrowid
-            self.conn.commit()
-            self.registrar_auditoria(usuario, 'Consultas', 'INSERT', f'Agendamento de consulta ID {consulta_id} para paciente ID {paciente_id}')
-            return consulta_id
-        except Exception as e:
-            self.conn.rollback()
-            raise
+    _rodar = staticmethod(roteiros.rodar)
 
-    def atualizar_status_consulta(self, id, status, usuario='Sistema'):
+    def _escrever(self, operacao, tratar=None, validar=None):
+        if validar:
+            validar()
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("UPDATE consultas SET status=%s WHERE id=%s", (status, id))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Consultas', 'UPDATE', f'Atualização de status da consulta ID {id} para "{status}"')
-            return sucesso
+            with self._transacao() as t:
+                return roteiros.rodar(operacao(t))
         except Exception as e:
-            self.conn.rollback()
-            return False
+            if tratar is None:
+                raise
+            return tratar(e)
 
-    def deletar_consulta(self, id, usuario='Sistema'):
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute("DELETE FROM consultas WHERE id=%s", (id,))
-                sucesso = cur.rowcount > 0
-            self.conn.commit()
-            if sucesso:
-                self.registrar_auditoria(usuario, 'Consultas', 'DELETE', f'Exclusão da consulta ID {id}')
-            return sucesso
-        except Exception as e:
-            self.conn.rollback()
-            return False
+    def _buscar_um(self, sql, params=None, primario=False):
+        linhas = self._buscar(sql, params, primario)
+        return linhas[0] if linhas else None
+
+    def _listar(self, sql, params=None, primario=False):
+        return [linha for bloco in self._iterar(sql, params, primario=primario) for linha in bloco]
+
+    def _bloqueante(self, funcao, *args):
+        return funcao(*args)
+
+    def _atualizar_autocomplete(self):
+        if self.autocomplete.iniciar_carga():
+            threading.Thread(target=self._carregar_autocomplete, name='autocomplete', daemon=True).start()
+
+    # ======================================================
+    # AUDITORIA
+    # ======================================================
+    def iterar_auditoria(self, **filtros):
+        sql, params = comandos.sql_auditoria(**filtros)
+        yield from self._iterar(sql, params)
+        if self.arquivo_auditoria:
+            yield from self.arquivo_auditoria.iterar(**filtros)
+
+    # ======================================================
+    # CONTADORES
+    # ======================================================
+    def buscar_counts(self):
+        return self._cache_counts.obter(self._ler_counts)
@@ -0,0 +1,354 @@
+"""
+services/db_async.py
+
+Contraparte assíncrona do Database, para servir a API em ASGI (asgi.py).
+
+Usa aiomysql com pool assíncrono: enquanto uma requisição espera o
+MySQL, o event loop atende as outras, então um processo segura centenas
+de requisições em voo sem uma thread por requisição. As operações
+(SQL, validação, cache, auditoria) são as do Database síncrono, em
+services/operacoes.py; aqui ficam só as primitivas com await: pool,
+transação, cursor do servidor, auditoria em task.
+
+aiomysql é dependência opcional (requirements-async.txt).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiomysql
+from pymysql.err import OperationalError, ProgrammingError
+
+from services import comandos, contadores, eventos, migracoes, replicas, roteiros
+from services.arquivo_auditoria import ArquivoAuditoria
+from services.auditoria import GravadorAuditoria
+from services.autocomplete import IndiceAutocomplete
+from services.cache import criar_cache
+from services.contadores import CacheTTL
+from services.metricas import METRICAS, CronometradoAsync
+from services.db import Transacao
+from services.operacoes import Operacoes
+from services.pool import PoolEsgotado
+from services.serializacao import Resultado
+
+
+class CursorInstrumentadoAsync(CronometradoAsync, aiomysql.DictCursor):
+    pass
+
+
+class SSCursorInstrumentadoAsync(CronometradoAsync, aiomysql.SSDictCursor):
+    # Sem buffer: o tempo medido é o do envio e da primeira resposta, não o do fetch
+    pass
+
+
+class AuditoriaAsync(GravadorAuditoria):
+    """O gravador do AuditoriaWriter, com uma task e uma asyncio.Queue no lugar da thread."""
+    _rodar = staticmethod(roteiros.rodar_async)
+
+    def __init__(self, pool, modo='assincrono', lote=200, intervalo=1.0, capacidade=10000, espera_maxima=2.0):
+        super().__init__(pool, asyncio.Queue(maxsize=capacidade), modo, lote, intervalo, espera_maxima)
+        self._task = None
+
+    async def _gravar_lote(self, eventos):
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await self.inserir(cur, eventos)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    async def _por(self, evento):
+        try:
+            await asyncio.wait_for(self._fila.put(evento), self.espera_maxima)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _tirar(self, espera):
+        try:
+            return await asyncio.wait_for(self._fila.get(), espera)
+        except asyncio.TimeoutError:
+            return None
+
+    def _iniciar(self):
+        if not self._em_execucao():
+            self._task = asyncio.get_running_loop().create_task(self._executar())
+
+    def _em_execucao(self):
+        return self._task is not None and not self._task.done()
+
+    def _esperar(self, timeout):
+        return asyncio.wait([self._task], timeout=timeout)
+
+
+class DatabaseAsync(Operacoes):
+    def __init__(self, pool, auditoria, cache, contadores_ttl=2.0, arquivo_auditoria=None,
+                 pools_replicas=(), replica_atraso_maximo=5.0, tenant=None, autocomplete_intervalo=10.0):
+        self.pool = pool
+        self.tenant = tenant
+        self.roteador = replicas.Roteador(
+            replicas.No('primario', pool, replica=False),
+            [replicas.No(nome, pool_replica) for nome, pool_replica in pools_replicas],
+            atraso_maximo=replica_atraso_maximo
+        )
+        self._verificacao = None
+        self.auditoria = auditoria
+        self.cache = cache
+        self.arquivo_auditoria = ArquivoAuditoria(arquivo_auditoria) if arquivo_auditoria else None
+        self._cache_counts = CacheTTL(contadores_ttl)
+        self.autocomplete = IndiceAutocomplete(autocomplete_intervalo)
+        self._carga_autocomplete = None
+
+    @classmethod
+    async def conectar(cls, host, port, user, password, database, pool_min=1, pool_max=50,
+                       pool_max_lifetime=3600, auditoria_modo='assincrono', auditoria_lote=200,
+                       auditoria_intervalo=1.0, contadores_ttl=2.0, cache_backend='memoria',
+                       cache_max_itens=10000, cache_ttl=None, cache_redis_url=None, arquivo_auditoria=None,
+                       replicas_leitura=(), replica_atraso_maximo=5.0, replica_intervalo=5.0, tenant=None,
+                       autocomplete_intervalo=10.0, slow_query_ms=500):
+        METRICAS.limite_lento_ms = slow_query_ms
+        async def criar_pool(host, port, user, password, database, minsize):
+            return await aiomysql.create_pool(
+                host=host,
+                port=int(port),
+                user=user,
+                password=password,
+                db=database,
+                minsize=minsize,
+                maxsize=pool_max,
+                pool_recycle=pool_max_lifetime,
+                cursorclass=CursorInstrumentadoAsync,
+                autocommit=False
+            )
+
+        pool = await criar_pool(host, port, user, password, database, pool_min)
+        # Réplicas abrem conexão sob demanda: uma fora do ar não impede o app de subir
+        pools_replicas = [(f"{r['host']}:{r['port']}", await criar_pool(**r, minsize=0)) for r in replicas_leitura]
+        auditoria = AuditoriaAsync(pool, modo=auditoria_modo, lote=auditoria_lote, intervalo=auditoria_intervalo)
+        cache = criar_cache(cache_backend, max_itens=cache_max_itens, ttl=cache_ttl,
+                            redis_url=cache_redis_url, namespace=f'medcore:{tenant or database}:')
+        db = cls(pool, auditoria, cache, contadores_ttl, arquivo_auditoria, pools_replicas, replica_atraso_maximo, tenant,
+                 autocomplete_intervalo)
+        await db.verificar_esquema()
+        if pools_replicas:
+            db._verificacao = asyncio.create_task(db._verificar_replicas(replica_intervalo))
+        return db
+
+    async def _verificar_replicas(self, intervalo):
+        while True:
+            for no in self.roteador.replicas:
+                try:
+                    async with no.pool.acquire() as conn:
+                        async with conn.cursor() as cur:
+                            atraso = await replicas.medir_atraso_async(cur)
+                        await conn.rollback()
+                    self.roteador.registrar_check(no, atraso)
+                except Exception as e:
+                    self.roteador.registrar_check(no, erro=e)
+            await asyncio.sleep(intervalo)
+
+    async def ping(self):
+        try:
+            linha = await self._buscar_um(migracoes.SQL_VERSAO, primario=True)
+            self.versao_esquema = linha['versao']
+        except ProgrammingError:
+            self.versao_esquema = 0
+        return self.versao_esquema
+
+    async def verificar_esquema(self):
+        aviso = migracoes.aviso_de_versao(await self.ping())
+        if aviso:
+            print(aviso)
+
+    async def fechar(self):
+        if self._verificacao:
+            self._verificacao.cancel()
+        if self._carga_autocomplete:
+            self._carga_autocomplete.cancel()
+        await self.auditoria.fechar()
+        for no in [self.roteador.primario] + self.roteador.replicas:
+            no.pool.close()
+            await no.pool.wait_closed()
+
+    def estatisticas_pool(self):
+        return {
+            'min': self.pool.minsize,
+            'max': self.pool.maxsize,
+            'total': self.pool.size,
+            'em_uso': self.pool.size - self.pool.freesize,
+            'livres': self.pool.freesize,
+        }
+
+    # ======================================================
+    # EXECUÇÃO
+    # ======================================================
+    async def _obter(self, no):
+        # O pool do aiomysql espera sem limite; numa réplica a espera é curta e vira PoolEsgotado
+        if not no.replica:
+            return await no.pool.acquire()
+        try:
+            return await asyncio.wait_for(no.pool.acquire(), replicas.ESPERA_REPLICA)
+        except asyncio.TimeoutError:
+            raise PoolEsgotado(f'Réplica {no.nome} sem conexão livre')
+
+    @asynccontextmanager
+    async def _emprestar(self, no):
+        conn = await self._obter(no)
+        try:
+            yield conn
+        finally:
+            no.pool.release(conn)
+
+    async def _buscar(self, sql, params=None, primario=False):
+        no = self.roteador.para_primario() if primario else self.roteador.para_leitura()
+        try:
+            async with self._emprestar(no) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(sql, params)
+                    linhas = await cur.fetchall()
+                    descricao = cur.description
+                # Leitura também abre transação (autocommit desligado): fecha para não segurar snapshot
+                await conn.rollback()
+        except (OperationalError, PoolEsgotado) as e:
+            if not no.replica:
+                raise
+            # Réplica caiu entre dois checks (sai do rodízio) ou está sem conexão livre: lê do primário
+            self.roteador.desviar(no, e)
+            return await self._buscar(sql, params, primario=True)
+        return Resultado(linhas, descricao)
+
+    async def _buscar_um(self, sql, params=None, primario=False):
+        linhas = await self._buscar(sql, params, primario)
+        return linhas[0] if linhas else None
+
+    @asynccontextmanager
+    async def _transacao(self):
+        async with self.roteador.para_primario().pool.acquire() as conn:
+            transacao = Transacao(conn)
+            try:
+                async with conn.cursor() as cur:
+                    transacao.cur = cur
+                    yield transacao
+                    if transacao.eventos and self.auditoria.mesma_transacao:
+                        await self.auditoria.inserir(cur, transacao.eventos)
+                    linhas = contadores.linhas_incremento(transacao.contadores)
+                    if linhas:
+                        await cur.executemany(contadores.SQL_INCREMENTAR, linhas)
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+        # Até o fim da requisição as leituras vão ao primário, que já tem esta escrita
+        replicas.marcar_escrita()
+        if transacao.contadores:
+            self._cache_counts.invalidar()
+        for chave, prefixo in transacao.invalidacoes:
+            if prefixo:
+                self.cache.invalidar_prefixo(chave)
+            else:
+                self.cache.invalidar(chave)
+        for funcao, args in transacao.callbacks:
+            funcao(*args)
+        if transacao.eventos and not self.auditoria.mesma_transacao:
+            await self.auditoria.enfileirar(transacao.eventos)
+        if transacao.mudancas:
+            await self._publicar_mudancas(transacao.mudancas, bool(transacao.contadores))
+
+    async def _publicar_mudancas(self, mudancas, contadores_mudaram):
+        counts = None
+        if contadores_mudaram and eventos.BARRAMENTO.clientes:
+            try:
+                counts = await self.buscar_counts()
+            except Exception as e:
+                print(f"[DB] Totais fora do evento de mudança: {e}")
+        eventos.publicar_mudancas(mudancas, counts, self.tenant)
+
+    async def _abrir_stream(self, no, sql, params):
+        conn = await self._obter(no)
+        try:
+            cur = await conn.cursor(SSCursorInstrumentadoAsync)
+            await cur.execute(sql, params)
+        except BaseException:
+            conn.close()
+            no.pool.release(conn)
+            raise
+        return conn, cur
+
+    async def _iterar(self, sql, params=None, lote=500, primario=False):
+        no = self.roteador.para_primario() if primario else self.roteador.para_leitura()
+        try:
+            conn, cur = await self._abrir_stream(no, sql, params)
+        except (OperationalError, PoolEsgotado) as e:
+            if not no.replica:
+                raise
+            # Mesmo desvio do _buscar; depois do primeiro bloco já enviado não há como refazer
+            self.roteador.desviar(no, e)
+            no = self.roteador.para_primario()
+            conn, cur = await self._abrir_stream(no, sql, params)
+        completo = False
+        try:
+            while True:
+                linhas = await cur.fetchmany(lote)
+                if not linhas:
+                    break
+                yield Resultado(linhas, cur.description)
+            completo = True
+        finally:
+            if completo:
+                await cur.close()
+                await conn.rollback()
+            else:
+                # Interrompido no meio: a conexão ainda tem resultado pendente, não volta ao pool
+                conn.close()
+            no.pool.release(conn)
+
+    # ======================================================
+    # PRIMITIVAS DAS OPERAÇÕES (services/operacoes.py)
+    # ======================================================
+    _rodar = staticmethod(roteiros.rodar_async)
+
+    async def _escrever(self, operacao, tratar=None, validar=None):
+        if validar:
+            validar()
+        try:
+            async with self._transacao() as t:
+                return await roteiros.rodar_async(operacao(t))
+        except Exception as e:
+            if tratar is None:
+                raise
+            return tratar(e)
+
+    async def _listar(self, sql, params=None, primario=False):
+        return [linha async for bloco in self._iterar(sql, params, primario=primario) for linha in bloco]
+
+    def _bloqueante(self, funcao, *args):
+        # Disco, gzip ou ordenação grande: numa thread, para não parar o event loop
+        return asyncio.to_thread(funcao, *args)
+
+    def _atualizar_autocomplete(self):
+        if self.autocomplete.iniciar_carga():
+            self._carga_autocomplete = asyncio.create_task(self._carregar_autocomplete())
+
+    # ======================================================
+    # AUDITORIA
+    # ======================================================
+    async def iterar_auditoria(self, **filtros):
+        sql, params = comandos.sql_auditoria(**filtros)
+        async for bloco in self._iterar(sql, params):
+            yield bloco
+        if self.arquivo_auditoria:
+            # O mesmo iterar() do Database, um bloco por vez numa thread (gzip e disco)
+            arquivo = self.arquivo_auditoria.iterar(**filtros)
+            while True:
+                bloco = await asyncio.to_thread(next, arquivo, None)
+                if bloco is None:
+                    break
+                yield bloco
+
+    # ======================================================
+    # CONTADORES
+    # ======================================================
+    async def buscar_counts(self):
+        return await self._cache_counts.obter_async(self._ler_counts)
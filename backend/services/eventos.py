@@ -0,0 +1,266 @@
+"""
+services/eventos.py
+
+Barramento de mudanças do processo, que alimenta o /api/events (SSE).
+
+Os métodos de escrita do Database registram a mudança na transação
+(t.publicar) e ela só é publicada depois do COMMIT, com os totais novos
+quando algum contador mudou. Cada cliente tem um buffer limitado: quem
+não consome a tempo recebe um 'reset' e é desconectado; ao reconectar,
+o navegador manda o Last-Event-ID e retoma pelo histórico recente.
+
+O barramento é um por processo (BARRAMENTO). Com vários workers, as
+mudanças feitas em outro worker não chegam como evento, mas os totais
+chegam: no heartbeat o fluxo relê os contadores, que ficam no banco.
+Com várias clínicas no processo (services/tenants.py), cada evento leva
+a clínica e só chega aos clientes dela.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+
+from services.serializacao import dumps_json
+
+HISTORICO = 1000            # eventos guardados para retomar pelo Last-Event-ID
+CAPACIDADE_CLIENTE = 100    # eventos pendentes por cliente antes de desconectá-lo
+HEARTBEAT = 15.0            # segundos sem evento até mandar um ping (ou os totais novos)
+DURACAO_MAXIMA = 300.0      # depois disso o fluxo fecha e o navegador reconecta
+RECONEXAO_MS = 3000
+
+
+class BarramentoCheio(Exception):
+    """Limite de clientes conectados neste processo."""
+
+
+class Assinatura:
+    def __init__(self, barramento, capacidade, loop=None, tenant=None):
+        self._barramento = barramento
+        self.tenant = tenant
+        self.capacidade = capacidade
+        self.fila = deque()
+        self.excedida = False
+        self._loop = loop
+        self._aviso = asyncio.Event() if loop else None
+
+    def _entregar(self, evento):
+        # Chamado com o lock do barramento
+        if len(self.fila) >= self.capacidade:
+            self.excedida = True
+        else:
+            self.fila.append(evento)
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._aviso.set)
+
+    def _retirar(self):
+        eventos = list(self.fila)
+        self.fila.clear()
+        return eventos
+
+    def aguardar(self, timeout):
+        """Eventos pendentes; lista vazia se o timeout passou sem nenhum."""
+        with self._barramento._condicao:
+            self._barramento._condicao.wait_for(lambda: self.fila or self.excedida, timeout)
+            return self._retirar()
+
+    async def aguardar_async(self, timeout):
+        with self._barramento._lock:
+            if self.fila or self.excedida:
+                return self._retirar()
+            self._aviso.clear()
+        try:
+            await asyncio.wait_for(self._aviso.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._barramento._lock:
+            return self._retirar()
+
+    def fechar(self):
+        self._barramento._remover(self)
+
+
+class Barramento:
+    def __init__(self, historico=HISTORICO, capacidade_cliente=CAPACIDADE_CLIENTE, maximo_clientes=None):
+        self._lock = threading.Lock()
+        self._condicao = threading.Condition(self._lock)
+        self._historico = deque(maxlen=historico)
+        self._assinaturas = set()
+        self._ultimo = 0
+        # Ids de outro processo (ou de antes de um restart) não valem aqui
+        self.epoca = uuid.uuid4().hex[:8]
+        self.capacidade_cliente = capacidade_cliente
+        self.maximo_clientes = maximo_clientes
+
+        self.publicados = 0
+        self.desconectados = 0
+
+    @property
+    def clientes(self):
+        return len(self._assinaturas)
+
+    def _id(self, numero):
+        return f'{self.epoca}-{numero}'
+
+    def publicar(self, tipo, dados, tenant=None):
+        with self._lock:
+            self._ultimo += 1
+            evento = (self._id(self._ultimo), tipo, dados)
+            self._historico.append((self._ultimo, evento, tenant))
+            for assinatura in self._assinaturas:
+                if assinatura.tenant == tenant:
+                    assinatura._entregar(evento)
+            self.publicados += 1
+            self._condicao.notify_all()
+        return evento[0]
+
+    def assinar(self, ultimo_id=None, loop=None, tenant=None):
+        """Nova assinatura; com o Last-Event-ID, já traz o que foi publicado depois dele."""
+        with self._lock:
+            if self.maximo_clientes is not None and len(self._assinaturas) >= self.maximo_clientes:
+                raise BarramentoCheio(f'{len(self._assinaturas)} clientes conectados neste processo')
+            assinatura = Assinatura(self, self.capacidade_cliente, loop, tenant)
+            if ultimo_id:
+                perdidos = self._perdidos_desde(ultimo_id, tenant)
+                if perdidos is None:
+                    # Não dá para saber o que ficou para trás: o cliente recarrega tudo
+                    assinatura._entregar((self._id(self._ultimo), 'reset', {}))
+                else:
+                    for evento in perdidos:
+                        assinatura._entregar(evento)
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def _perdidos_desde(self, ultimo_id, tenant=None):
+        epoca, _, numero = ultimo_id.partition('-')
+        if epoca != self.epoca or not numero.isdigit() or int(numero) > self._ultimo:
+            return None
+        numero = int(numero)
+        if numero < self._ultimo and (not self._historico or self._historico[0][0] > numero + 1):
+            return None  # já saiu do histórico
+        return [evento for n, evento, dono in self._historico if n > numero and dono == tenant]
+
+    def _remover(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+            if assinatura.excedida:
+                self.desconectados += 1
+
+    def estatisticas(self):
+        return {
+            'clientes': self.clientes,
+            'maximo_clientes': self.maximo_clientes,
+            'publicados': self.publicados,
+            'desconectados_por_atraso': self.desconectados,
+            'ultimo_id': self._id(self._ultimo),
+        }
+
+
+BARRAMENTO = Barramento()
+
+
+# ======================================================
+# MUDANÇAS (publicadas pelo Database depois do COMMIT)
+# ======================================================
+def publicar_mudancas(mudancas, counts=None, tenant=None):
+    # Os totais vão no último evento da transação, que já reflete todas as mudanças dela
+    for indice, (entidade, acao, registro_id, campos) in enumerate(mudancas):
+        dados = {'entidade': entidade, 'acao': acao, 'id': registro_id}
+        if campos:
+            dados['campos'] = campos
+        if counts is not None and indice == len(mudancas) - 1:
+            dados['counts'] = counts
+        BARRAMENTO.publicar('mudanca', dados, tenant)
+
+
+# ======================================================
+# FORMATO SSE
+# ======================================================
+def formatar_sse(tipo, dados, evento_id=None):
+    linhas = [f'id: {evento_id}'.encode()] if evento_id else []
+    linhas.append(f'event: {tipo}'.encode())
+    linhas.append(b'data: ' + dumps_json(dados))
+    return b'\n'.join(linhas) + b'\n\n'
+
+
+def _abertura(counts):
+    # Intervalo de reconexão do EventSource e os totais atuais, para o cliente não precisar do /api/counts
+    abertura = f'retry: {RECONEXAO_MS}\n\n'.encode()
+    return abertura + formatar_sse('counts', counts) if counts is not None else abertura
+
+
+def _saida(eventos, assinatura, ultimos_counts):
+    """Bytes dos eventos recebidos, e os totais mais recentes que eles trouxeram."""
+    partes = []
+    for evento_id, tipo, dados in eventos:
+        partes.append(formatar_sse(tipo, dados, evento_id))
+        if 'counts' in dados:
+            ultimos_counts = dados['counts']
+    if assinatura.excedida:
+        # Cliente lento: recarrega tudo e reconecta do zero
+        partes.append(formatar_sse('reset', {'motivo': 'atraso'}))
+    return b''.join(partes), ultimos_counts
+
+
+def fluxo_sse(assinatura, ler_counts, heartbeat=HEARTBEAT, duracao_maxima=DURACAO_MAXIMA):
+    """Gerador do /api/events no app WSGI."""
+    try:
+        ultimos_counts = _counts_ou_none(ler_counts)
+        yield _abertura(ultimos_counts)
+        fim = time.monotonic() + duracao_maxima
+        while time.monotonic() < fim:
+            eventos = assinatura.aguardar(heartbeat)
+            if eventos or assinatura.excedida:
+                saida, ultimos_counts = _saida(eventos, assinatura, ultimos_counts)
+                yield saida
+                if assinatura.excedida:
+                    return
+                continue
+            # Sem evento neste processo: os totais podem ter mudado em outro worker
+            counts = _counts_ou_none(ler_counts)
+            if counts is not None and counts != ultimos_counts:
+                ultimos_counts = counts
+                yield formatar_sse('counts', counts)
+            else:
+                yield b': ping\n\n'
+    finally:
+        assinatura.fechar()
+
+
+async def fluxo_sse_async(assinatura, ler_counts, heartbeat=HEARTBEAT, duracao_maxima=DURACAO_MAXIMA):
+    """Mesmo fluxo para o app ASGI (ler_counts é uma corrotina)."""
+    try:
+        try:
+            ultimos_counts = await ler_counts()
+        except Exception:
+            ultimos_counts = None
+        yield _abertura(ultimos_counts)
+        fim = time.monotonic() + duracao_maxima
+        while time.monotonic() < fim:
+            eventos = await assinatura.aguardar_async(heartbeat)
+            if eventos or assinatura.excedida:
+                saida, ultimos_counts = _saida(eventos, assinatura, ultimos_counts)
+                yield saida
+                if assinatura.excedida:
+                    return
+                continue
+            try:
+                counts = await ler_counts()
+            except Exception:
+                counts = None
+            if counts is not None and counts != ultimos_counts:
+                ultimos_counts = counts
+                yield formatar_sse('counts', counts)
+            else:
+                yield b': ping\n\n'
+    finally:
+        assinatura.fechar()
+
+
+def _counts_ou_none(ler_counts):
+    try:
+        return ler_counts()
+    except Exception:
+        # Banco fora no meio do fluxo: segue com ping, o cliente não precisa cair
+        return None
@@ -0,0 +1,296 @@
+"""
+services/metricas.py
+
+Instrumentação de requisições e queries, exposta em texto do Prometheus.
+
+- Histograma de latência por rota e status (hooks do Flask no app).
+- Tempo de cada requisição dividido em fases: banco, serialização e JSON.
+- Cursores do pymysql (e do aiomysql, no ASGI) que cronometram cada
+  execute com o SQL normalizado, número de linhas e log de queries lentas
+  (acima de limite_lento_ms).
+
+O registro é um só por processo (METRICAS), como o padrão do Prometheus.
+"""
+
+import contextvars
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from functools import wraps
+
+from pymysql.cursors import DictCursor, SSDictCursor
+
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Sem limite, SQL montado dinamicamente poderia criar séries sem fim
+MAXIMO_SQL_DISTINTOS = 500
+
+_ESPACOS = re.compile(r'\s+')
+_LISTA_PARAMETROS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITERAL_TEXTO = re.compile(r"'(?:[^'\\]|\\.)*'")
+_LITERAL_NUMERO = re.compile(r'\b\d+\b')
+
+# Acumulador das fases da requisição atual (uma por thread/contexto)
+_fases = contextvars.ContextVar('medcore_fases', default=None)
+
+
+def normalizar_sql(sql):
+    if isinstance(sql, (bytes, bytearray)):
+        # executemany do pymysql já chega aqui com os valores embutidos
+        sql = bytes(sql[:2000]).decode('utf-8', 'replace')
+    sql = _ESPACOS.sub(' ', sql).strip()
+    sql = _LISTA_PARAMETROS.sub('(...)', sql)
+    sql = _LITERAL_TEXTO.sub('?', sql)
+    sql = _LITERAL_NUMERO.sub('?', sql)
+    return sql[:300]
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_SEGUNDOS):
+        self.limites = limites
+        self.baldes = [0] * len(limites)
+        self.soma = 0.0
+        self.contagem = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.baldes[i] += 1
+                break
+        self.soma += valor
+        self.contagem += 1
+
+    def acumulados(self):
+        total = 0
+        for limite, quantidade in zip(self.limites, self.baldes):
+            total += quantidade
+            yield limite, total
+
+
+def _rotulos(rotulos):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+    return ','.join(f'{chave}="{escapar(valor)}"' for chave, valor in rotulos)
+
+
+class Metricas:
+    def __init__(self):
+        self.limite_lento_ms = 500
+        self._lock = threading.Lock()
+        self._rotas = {}       # (método, rota, status) -> Histograma
+        self._fases_rota = {}  # (método, rota, fase) -> Histograma
+        self._queries = {}     # sql -> Histograma
+        self._linhas = {}      # sql -> total de linhas
+        self._lentas = 0
+
+    # ======================================================
+    # REGISTRO
+    # ======================================================
+    def observar_rota(self, metodo, rota, status, segundos, fases=None):
+        with self._lock:
+            self._rotas.setdefault((metodo, rota, str(status)), Histograma()).observar(segundos)
+            for fase, duracao in (fases or {}).items():
+                self._fases_rota.setdefault((metodo, rota, fase), Histograma()).observar(duracao)
+
+    def observar_query(self, sql, segundos, linhas, binds):
+        normalizado = normalizar_sql(sql)
+        acumular_fase('db', segundos)
+        with self._lock:
+            if normalizado not in self._queries and len(self._queries) >= MAXIMO_SQL_DISTINTOS:
+                normalizado = 'outros'
+            self._queries.setdefault(normalizado, Histograma()).observar(segundos)
+            self._linhas[normalizado] = self._linhas.get(normalizado, 0) + max(linhas or 0, 0)
+            lenta = segundos * 1000 >= self.limite_lento_ms
+            if lenta:
+                self._lentas += 1
+        if lenta:
+            print(f"[DB] Query lenta: {segundos * 1000:.1f} ms, {binds} binds, {linhas} linhas: {normalizado}")
+
+    # ======================================================
+    # EXPOSIÇÃO (formato texto do Prometheus)
+    # ======================================================
+    def _histograma(self, linhas, nome, series):
+        for rotulos, histograma in series:
+            for limite, acumulado in histograma.acumulados():
+                linhas.append(f'{nome}_bucket{{{_rotulos(rotulos + [("le", limite)])}}} {acumulado}')
+            linhas.append(f'{nome}_bucket{{{_rotulos(rotulos + [("le", "+Inf")])}}} {histograma.contagem}')
+            linhas.append(f'{nome}_sum{{{_rotulos(rotulos)}}} {histograma.soma:.6f}')
+            linhas.append(f'{nome}_count{{{_rotulos(rotulos)}}} {histograma.contagem}')
+
+    def exportar(self, extras=()):
+        linhas = []
+        with self._lock:
+            linhas.append('# HELP medcore_http_request_segundos Latência das requisições por rota.')
+            linhas.append('# TYPE medcore_http_request_segundos histogram')
+            self._histograma(linhas, 'medcore_http_request_segundos', [
+                ([('metodo', m), ('rota', r), ('status', s)], h) for (m, r, s), h in sorted(self._rotas.items())
+            ])
+            linhas.append('# HELP medcore_http_fase_segundos Tempo da requisição gasto em banco, serialização e JSON.')
+            linhas.append('# TYPE medcore_http_fase_segundos histogram')
+            self._histograma(linhas, 'medcore_http_fase_segundos', [
+                ([('metodo', m), ('rota', r), ('fase', f)], h) for (m, r, f), h in sorted(self._fases_rota.items())
+            ])
+            linhas.append('# HELP medcore_db_query_segundos Duração de cada execute por SQL normalizado.')
+            linhas.append('# TYPE medcore_db_query_segundos histogram')
+            self._histograma(linhas, 'medcore_db_query_segundos', [
+                ([('sql', sql)], h) for sql, h in sorted(self._queries.items())
+            ])
+            linhas.append('# HELP medcore_db_query_linhas_total Linhas devolvidas ou afetadas por SQL normalizado.')
+            linhas.append('# TYPE medcore_db_query_linhas_total counter')
+            for sql, total in sorted(self._linhas.items()):
+                linhas.append(f'medcore_db_query_linhas_total{{{_rotulos([("sql", sql)])}}} {total}')
+            linhas.append('# HELP medcore_db_queries_lentas_total Queries acima do limite de query lenta.')
+            linhas.append('# TYPE medcore_db_queries_lentas_total counter')
+            linhas.append(f'medcore_db_queries_lentas_total {self._lentas}')
+
+        # Medidas pontuais de outros componentes (pool, cache, auditoria), com rótulos opcionais
+        declaradas = set()
+        for nome, valor, ajuda, *rotulos in extras:
+            if nome not in declaradas:
+                declaradas.add(nome)
+                linhas.append(f'# HELP {nome} {ajuda}')
+                linhas.append(f'# TYPE {nome} gauge')
+            linhas.append(f'{nome}{{{_rotulos(rotulos[0])}}} {valor}' if rotulos else f'{nome} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+METRICAS = Metricas()
+
+
+# ======================================================
+# FASES DA REQUISIÇÃO
+# ======================================================
+def iniciar_fases():
+    _fases.set({})
+
+
+def encerrar_fases():
+    fases = _fases.get()
+    _fases.set(None)
+    return fases or {}
+
+
+def acumular_fase(fase, segundos):
+    fases = _fases.get()
+    if fases is not None:
+        fases[fase] = fases.get(fase, 0.0) + segundos
+
+
+def cronometrar(fase):
+    """Decorator que soma a duração da função na fase da requisição atual."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                acumular_fase(fase, time.perf_counter() - inicio)
+        return envoltorio
+    return decorador
+
+
+# ======================================================
+# AMOSTRAGEM COM CPROFILE
+# ======================================================
+class AmostradorPerfil:
+    """Perfila uma fração das requisições de uma rota e grava .prof em diretorio."""
+
+    def __init__(self, rota, taxa=0.01, diretorio='perfis'):
+        self.rota = rota
+        self.taxa = taxa
+        self.diretorio = diretorio
+        # O cProfile não aceita dois perfis ativos ao mesmo tempo
+        self._lock = threading.Lock()
+
+    def iniciar(self, rota):
+        if rota != self.rota or random.random() >= self.taxa:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            self._lock.release()
+            return None
+        return perfil
+
+    def finalizar(self, perfil):
+        perfil.disable()
+        self._lock.release()
+        os.makedirs(self.diretorio, exist_ok=True)
+        nome = re.sub(r'[^0-9A-Za-z]+', '_', self.rota).strip('_')
+        caminho = os.path.join(self.diretorio, f'{nome}-{time.time_ns()}.prof')
+        perfil.dump_stats(caminho)
+        print(f"[PERFIL] {self.rota} -> {caminho}")
+
+
+# ======================================================
+# CURSORES INSTRUMENTADOS
+# ======================================================
+def _binds(args):
+    return len(args) if isinstance(args, (list, tuple, dict)) else 0
+
+
+def _binds_lote(args):
+    return sum(len(a) for a in args) if isinstance(args, (list, tuple)) else 0
+
+
+class _Cronometrado:
+    _em_lote = False
+
+    def execute(self, query, args=None):
+        if self._em_lote:
+            # Parte de um executemany: medido uma vez só, no total
+            return super().execute(query, args)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            METRICAS.observar_query(query, time.perf_counter() - inicio, self.rowcount, _binds(args))
+
+    def executemany(self, query, args):
+        inicio = time.perf_counter()
+        self._em_lote = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._em_lote = False
+            METRICAS.observar_query(query, time.perf_counter() - inicio, self.rowcount, _binds_lote(args))
+
+
+class CronometradoAsync:
+    """O _Cronometrado para os cursores do aiomysql (services/db_async.py), que também
+    fazem o executemany chamando o próprio execute."""
+    _em_lote = False
+
+    async def execute(self, query, args=None):
+        if self._em_lote:
+            return await super().execute(query, args)
+        inicio = time.perf_counter()
+        try:
+            return await super().execute(query, args)
+        finally:
+            METRICAS.observar_query(query, time.perf_counter() - inicio, self.rowcount, _binds(args))
+
+    async def executemany(self, query, args):
+        inicio = time.perf_counter()
+        self._em_lote = True
+        try:
+            return await super().executemany(query, args)
+        finally:
+            self._em_lote = False
+            METRICAS.observar_query(query, time.perf_counter() - inicio, self.rowcount, _binds_lote(args))
+
+
+class CursorInstrumentado(_Cronometrado, DictCursor):
+    pass
+
+
+class SSCursorInstrumentado(_Cronometrado, SSDictCursor):
+    # Sem buffer: o tempo medido é o do envio e da primeira resposta, não o do fetch
+    pass
@@ -0,0 +1,351 @@
+"""
+services/migracoes.py
+
+Esquema do banco em migrações numeradas, aplicadas uma vez no deploy:
+
+    python -m services.migracoes            # aplica as pendentes
+    python -m services.migracoes --status   # só mostra a versão
+
+A tabela schema_version guarda as versões já aplicadas. Cada migração é
+idempotente (IF NOT EXISTS, checagem no information_schema), então um
+banco criado pelo antigo criar_tabelas passa por todas sem erro e só
+ganha o que faltava. Os workers não rodam DDL: o Database só confere a
+versão ao subir.
+
+No MySQL cada DDL faz commit implícito; por isso a versão é gravada ao
+fim de cada migração, e uma migração interrompida roda de novo inteira.
+"""
+
+import argparse
+import os
+import time
+
+import pymysql
+
+from services import comandos, contadores
+from services.busca import normalizar_texto
+from services.cpf import digitos as digitos_cpf
+
+SQL_CRIAR_SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        versao INT PRIMARY KEY,
+        descricao VARCHAR(200) NOT NULL,
+        aplicada_em DATETIME NOT NULL
+    )
+"""
+SQL_VERSAO = "SELECT COALESCE(MAX(versao), 0) AS versao FROM schema_version"
+SQL_REGISTRAR = "INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (%s, %s, NOW())"
+
+# Dois deploys ao mesmo tempo não aplicam a mesma migração duas vezes
+NOME_LOCK = 'medcore_migracoes'
+
+
+# ======================================================
+# AUXILIARES DE DDL
+# ======================================================
+def criar_indice(cur, tabela, nome, colunas, tipo=''):
+    # MySQL não tem CREATE INDEX IF NOT EXISTS
+    cur.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (tabela, nome))
+    if not cur.fetchone():
+        cur.execute(f"CREATE {tipo} INDEX {nome} ON {tabela} ({colunas})")
+
+
+def criar_coluna(cur, tabela, coluna, definicao):
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (tabela, coluna))
+    if not cur.fetchone():
+        cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+# ======================================================
+# MIGRAÇÕES
+# ======================================================
+def m001_tabelas(conn, cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cargos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            salario DECIMAL(10,2),
+            descricao TEXT
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS funcionarios (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(150),
+            data_nascimento DATE,
+            endereco VARCHAR(255),
+            cpf VARCHAR(14) UNIQUE,
+            email VARCHAR(150),
+            telefone VARCHAR(20),
+            cargo_id INT,
+            FOREIGN KEY (cargo_id) REFERENCES cargos(id)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pacientes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(150) NOT NULL,
+            cpf VARCHAR(14) UNIQUE NOT NULL,
+            data_nascimento DATE,
+            telefone VARCHAR(20),
+            email VARCHAR(150)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS consultas (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            paciente_id INT NOT NULL,
+            consulta VARCHAR(100) NOT NULL,
+            data DATE NOT NULL,
+            hora TIME NOT NULL,
+            status VARCHAR(30) DEFAULT 'Agendada',
+            FOREIGN KEY (paciente_id)
+                REFERENCES pacientes(id)
+                ON DELETE CASCADE
+        )
+    """)
+
+    # ✅ SEM DEFAULT CURRENT_TIMESTAMP PARA EVITAR CONFLITO DE FUSO DO SERVIDOR
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS auditoria (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            data_hora DATETIME,
+            usuario VARCHAR(100),
+            modulo VARCHAR(100),
+            acao VARCHAR(20),
+            detalhes TEXT
+        )
+    """)
+
+
+def m002_indices_consultas_auditoria(conn, cur):
+    # Índices compostos da paginação por keyset da auditoria
+    criar_indice(cur, 'auditoria', 'idx_auditoria_data_hora', 'data_hora, id')
+    criar_indice(cur, 'auditoria', 'idx_auditoria_modulo', 'modulo, data_hora, id')
+    criar_indice(cur, 'auditoria', 'idx_auditoria_acao', 'acao, data_hora, id')
+    criar_indice(cur, 'auditoria', 'idx_auditoria_usuario', 'usuario, data_hora, id')
+
+    # Agenda por período e histórico por paciente
+    criar_indice(cur, 'consultas', 'idx_consultas_data', 'data, hora')
+    criar_indice(cur, 'consultas', 'idx_consultas_paciente_data', 'paciente_id, data')
+
+
+def m003_contadores(conn, cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS contadores (
+            chave VARCHAR(60) NOT NULL,
+            fatia TINYINT NOT NULL,
+            total BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (chave, fatia)
+        )
+    """)
+    cur.execute("SELECT 1 FROM contadores LIMIT 1")
+    if not cur.fetchone():
+        # Única contagem completa: a partir daqui os métodos de escrita mantêm os totais
+        cur.execute(contadores.SQL_SEMEAR)
+
+
+def m004_busca(conn, cur, lote=1000):
+    # Colunas normalizadas da busca (nome sem acentos, CPF só com dígitos)
+    for tabela in ('pacientes', 'funcionarios'):
+        criar_coluna(cur, tabela, 'nome_busca', 'VARCHAR(150)')
+        criar_coluna(cur, tabela, 'cpf_digitos', 'VARCHAR(14)')
+        criar_indice(cur, tabela, f'ft_{tabela}_nome_busca', 'nome_busca', tipo='FULLTEXT')
+        criar_indice(cur, tabela, f'idx_{tabela}_nome_busca', 'nome_busca')
+        criar_indice(cur, tabela, f'idx_{tabela}_cpf_digitos', 'cpf_digitos')
+
+        # Linhas antigas, em lotes curtos para não segurar locks
+        while True:
+            cur.execute(f"SELECT id, nome, cpf FROM {tabela} WHERE nome_busca IS NULL LIMIT %s", (lote,))
+            linhas = cur.fetchall()
+            if not linhas:
+                break
+            cur.executemany(
+                f"UPDATE {tabela} SET nome_busca=%s, cpf_digitos=%s WHERE id=%s",
+                [(normalizar_texto(l['nome']), digitos_cpf(l['cpf']), l['id']) for l in linhas]
+            )
+            conn.commit()
+
+
+def m005_horarios(conn, cur):
+    # Horário por especialidade: o índice único é o que impede agendamento duplo
+    criar_coluna(cur, 'consultas', 'slot_ativo', comandos.COLUNA_SLOT_ATIVO)
+    cur.execute(comandos.SQL_HORARIOS_DUPLICADOS)
+    duplicados = cur.fetchall()
+    if duplicados:
+        exemplos = ', '.join(f"{d['consulta']} {d['data']} {d['hora']}" for d in duplicados[:5])
+        raise RuntimeError(f"{len(duplicados)} horário(s) com mais de uma consulta ativa ({exemplos}); "
+                           f"cancele ou remarque as duplicadas e rode as migrações de novo")
+    criar_indice(cur, 'consultas', comandos.INDICE_HORARIO, 'consulta, data, hora, slot_ativo', tipo='UNIQUE')
+
+
+def m006_indice_funcionarios_cargo(conn, cur):
+    # Criava idx_funcionarios_cargo (cargo_id), repetindo o índice que o InnoDB já cria para a
+    # FK; o número fica para as versões gravadas continuarem valendo, e a m009 remove o índice
+    pass
+
+
+def m007_busca_cargos(conn, cur, lote=1000):
+    # Cargos entram na busca indexada (antes LIKE '%nome%' em buscar_cargos_por_nome)
+    criar_coluna(cur, 'cargos', 'nome_busca', 'VARCHAR(100)')
+    criar_indice(cur, 'cargos', 'ft_cargos_nome_busca', 'nome_busca', tipo='FULLTEXT')
+    criar_indice(cur, 'cargos', 'idx_cargos_nome_busca', 'nome_busca')
+    while True:
+        cur.execute("SELECT id, nome FROM cargos WHERE nome_busca IS NULL LIMIT %s", (lote,))
+        linhas = cur.fetchall()
+        if not linhas:
+            break
+        cur.executemany("UPDATE cargos SET nome_busca=%s WHERE id=%s",
+                        [(normalizar_texto(l['nome']), l['id']) for l in linhas])
+        conn.commit()
+
+
+def m008_autocomplete_incremental(conn, cur):
+    # Marca d'água da atualização incremental do autocomplete (antes uma recarga completa por minuto)
+    criar_coluna(cur, 'pacientes', 'atualizado_em', comandos.COLUNA_ATUALIZADO_EM)
+    criar_indice(cur, 'pacientes', 'idx_pacientes_atualizado_em', 'atualizado_em')
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pacientes_excluidos (
+            paciente_id INT PRIMARY KEY,
+            excluido_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_pacientes_excluidos_em (excluido_em)
+        )
+    """)
+
+
+def m009_remover_indice_cargo_duplicado(conn, cur):
+    # O índice da FK (cargo_id) já atende o JOIN e o COUNT do relatório por cargo. Se o MySQL
+    # descartou o índice implícito da FK quando a m006 criou o dela, este é o único e fica
+    cur.execute("""
+        SELECT DISTINCT index_name AS nome FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'funcionarios'
+          AND column_name = 'cargo_id' AND seq_in_index = 1
+    """)
+    indices = {linha['nome'] for linha in cur.fetchall()}
+    if 'idx_funcionarios_cargo' in indices and len(indices) > 1:
+        cur.execute("DROP INDEX idx_funcionarios_cargo ON funcionarios")
+
+
+MIGRACOES = [
+    (1, 'Tabelas base', m001_tabelas),
+    (2, 'Índices de consultas e auditoria', m002_indices_consultas_auditoria),
+    (3, 'Contadores fatiados', m003_contadores),
+    (4, 'Colunas e índices da busca', m004_busca),
+    (5, 'Índice único de horário das consultas', m005_horarios),
+    (6, 'Índice de funcionários por cargo (removido na 9)', m006_indice_funcionarios_cargo),
+    (7, 'Busca indexada de cargos', m007_busca_cargos),
+    (8, 'Atualização incremental do autocomplete', m008_autocomplete_incremental),
+    (9, 'Remove o índice duplicado de funcionarios.cargo_id', m009_remover_indice_cargo_duplicado),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+# ======================================================
+# EXECUÇÃO
+# ======================================================
+def versao(cur):
+    try:
+        cur.execute(SQL_VERSAO)
+    except pymysql.err.ProgrammingError:
+        # Tabela ainda não existe: banco nunca migrado
+        return 0
+    return cur.fetchone()['versao']
+
+
+def aviso_de_versao(atual):
+    """Mensagem para o log se o banco não está na versão do código (None se está)."""
+    if atual < VERSAO_ATUAL:
+        return (f"[DB] Esquema na versão {atual}, o código espera a {VERSAO_ATUAL}: "
+                f"rode 'python -m services.migracoes' antes de subir os workers")
+    if atual > VERSAO_ATUAL:
+        return f"[DB] Esquema na versão {atual}, mais nova que a deste código ({VERSAO_ATUAL})"
+    return None
+
+
+def aplicar(conn, ate=None):
+    """Aplica as migrações pendentes e devolve as versões aplicadas."""
+    aplicadas = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT GET_LOCK(%s, 600) AS ok", (NOME_LOCK,))
+        if not cur.fetchone()['ok']:
+            raise RuntimeError('Outra execução das migrações segura o lock há mais de 10 minutos')
+        try:
+            cur.execute(SQL_CRIAR_SCHEMA_VERSION)
+            atual = versao(cur)
+            for numero, descricao, migracao in MIGRACOES:
+                if numero <= atual or (ate is not None and numero > ate):
+                    continue
+                inicio = time.perf_counter()
+                migracao(conn, cur)
+                cur.execute(SQL_REGISTRAR, (numero, descricao))
+                conn.commit()
+                aplicadas.append(numero)
+                print(f"[DB] Migração {numero:03d} aplicada ({descricao}) em {time.perf_counter() - inicio:.2f}s")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (NOME_LOCK,))
+    return aplicadas
+
+
+def conectar(retries=10, delay=3):
+    attempt = 0
+    while True:
+        try:
+            return pymysql.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                port=int(os.getenv("DB_PORT", 3306)),
+                user=os.getenv("DB_USER", "appuser"),
+                password=os.getenv("DB_PASSWORD", "app_password_here"),
+                database=os.getenv("DB_NAME", "medcore"),
+                cursorclass=pymysql.cursors.DictCursor,
+                autocommit=False
+            )
+        except pymysql.err.OperationalError as e:
+            attempt += 1
+            if attempt >= retries:
+                raise
+            print(f"[DB] Falha ao conectar ({attempt}/{retries}): {e}")
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='só mostra a versão do banco e as pendentes')
+    parser.add_argument('--ate', type=int, help='para na versão indicada')
+    args = parser.parse_args()
+
+    conn = conectar()
+    try:
+        if args.status:
+            with conn.cursor() as cur:
+                atual = versao(cur)
+            conn.rollback()
+            print(f"Versão do banco: {atual} (código: {VERSAO_ATUAL})")
+            for numero, descricao, _ in MIGRACOES:
+                if numero > atual:
+                    print(f"  pendente: {numero:03d} {descricao}")
+            return
+
+        aplicadas = aplicar(conn, ate=args.ate)
+        if not aplicadas:
+            print(f"[DB] Esquema já na versão {VERSAO_ATUAL}, nada a aplicar")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
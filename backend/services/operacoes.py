@@ -0,0 +1,497 @@
+"""
+services/operacoes.py
+
+Operações do banco, as mesmas para o Database (services/db.py) e o
+DatabaseAsync (services/db_async.py).
+
+Cada operação é um roteiro (services/roteiros.py): monta o SQL com
+services/comandos.py, entrega as chamadas ao banco em passos e trata o
+resultado. A classe concreta só fornece as primitivas:
+
+    _rodar(roteiro)            executa o roteiro (direto ou corrotina)
+    _escrever(operacao, ...)   confere a entrada, abre a transação, roda
+                               operacao(t) e passa a exceção ao tratamento
+    _buscar / _buscar_um       SELECT materializado (réplica ou primário)
+    _listar                    SELECT longo por cursor do servidor
+    _iterar                    blocos para as respostas em stream
+    _bloqueante(funcao, *args) trabalho de CPU ou disco (thread no ASGI)
+    _atualizar_autocomplete    agenda a carga do índice em segundo plano
+
+Um método que só devolve o que a primitiva devolve (buscar_funcionarios,
+registrar_auditoria) funciona nos dois modos sem ser roteiro: no ASGI o
+chamador recebe a corrotina e espera.
+"""
+
+import functools
+import inspect
+import time
+
+from pymysql.err import IntegrityError
+
+from services import comandos, contadores
+from services.arquivo_auditoria import completar_com_arquivo
+from services.auditoria import agora_brasilia, evento_auditoria
+from services.autocomplete import RETENCAO_EXCLUSOES
+from services.cache import AUSENTE
+from services.cpf import validar as validar_cpf
+from services.roteiros import passo, roteiro
+
+
+# ======================================================
+# ESCRITAS
+# ======================================================
+def escrita(se_falhar=None, validar=None):
+    """Operação numa transação: o roteiro recebe a Transacao `t` e executa o SQL por t.cur.
+
+    validar(db, argumentos) roda antes de pegar a conexão e levanta ValueError
+    para entrada inválida. se_falhar(erro, argumentos) recebe a exceção já
+    depois do ROLLBACK e devolve o resultado ou levanta outra; sem ele, a
+    exceção sobe como veio. `argumentos` são os da chamada, por nome.
+    """
+    def decorar(metodo):
+        assinatura = inspect.signature(metodo)
+
+        @functools.wraps(metodo)
+        def executar(self, *args, **kwargs):
+            def argumentos():
+                return assinatura.bind(self, None, *args, **kwargs).arguments
+
+            def conferir():
+                validar(self, argumentos())
+
+            def tratar(erro):
+                return se_falhar(erro, argumentos())
+
+            return self._escrever(lambda t: metodo(self, t, *args, **kwargs),
+                                  tratar if se_falhar else None, conferir if validar else None)
+        return executar
+    return decorar
+
+
+def _cpf_valido(db, argumentos):
+    if not db.validar_cpf(argumentos['cpf']):
+        raise ValueError("CPF inválido")
+
+
+def _sem_sucesso(erro, argumentos):
+    # Falha vira "não encontrado": a rota responde 404
+    return False
+
+
+def _cpf_duplicado(erro, argumentos):
+    if isinstance(erro, IntegrityError):
+        raise IntegrityError("CPF já cadastrado") from erro
+    raise erro
+
+
+def _horario_ocupado(erro, argumentos):
+    if isinstance(erro, IntegrityError) and comandos.horario_ocupado(erro):
+        raise comandos.HorarioOcupado(
+            f"{argumentos['consulta']} já tem consulta em {argumentos['data']} às {argumentos['hora']}") from erro
+    raise erro
+
+
+def _horario_ou_cpf(erro, argumentos):
+    if isinstance(erro, IntegrityError) and not comandos.horario_ocupado(erro):
+        _cpf_duplicado(erro, argumentos)
+    _horario_ocupado(erro, argumentos)
+
+
+def _status_consulta(erro, argumentos):
+    # Reativar uma cancelada cujo horário já foi ocupado por outra
+    if isinstance(erro, IntegrityError) and comandos.horario_ocupado(erro):
+        raise comandos.HorarioOcupado('O horário desta consulta já foi ocupado') from erro
+    return False
+
+
+class Operacoes:
+    def _em_cache(self, chave, carregar):
+        # Sub-roteiro (yield from): `carregar` é o passo que lê do banco
+        valor = self.cache.obter(chave)
+        if valor is AUSENTE:
+            # Geração antes da leitura: se um COMMIT invalidar a chave no meio, o valor lido não fica no cache
+            geracao = self.cache.reservar(chave)
+            valor = yield carregar
+            # "Não encontrado" não vai para o cache
+            if valor is not None:
+                self.cache.guardar(chave, valor, geracao=geracao)
+        return valor
+
+    @roteiro
+    def _ler_counts(self):
+        # buscar_counts de cada modo guarda o resultado no CacheTTL (contadores.py)
+        return contadores.montar_counts((yield passo(self._buscar, contadores.SQL_LER)))
+
+    # ======================================================
+    # AUDITORIA
+    # ======================================================
+    def registrar_auditoria(self, usuario, modulo, acao, detalhes):
+        return self.auditoria.registrar([evento_auditoria(usuario, modulo, acao, detalhes)])
+
+    @roteiro
+    def buscar_auditoria(self, limite=100, apos=None, **filtros):
+        sql, params = comandos.sql_auditoria(limite + 1, apos, **filtros)
+        registros = yield passo(self._buscar, sql, params)
+        if self.arquivo_auditoria and len(registros) <= limite:
+            # A tabela não encheu a página: o resto vem do arquivo (disco e gzip)
+            registros = yield passo(self._bloqueante, completar_com_arquivo, self.arquivo_auditoria,
+                                    registros, limite, apos, filtros)
+        return comandos.pagina(registros, limite, 'data_hora', 'id')
+
+    @roteiro
+    def excluir_auditoria_em_lote(self, ids, bloco=comandos.TAMANHO_BLOCO_EXCLUSAO):
+        total = 0
+        try:
+            for sql, ids_bloco in comandos.blocos_exclusao_auditoria(ids or [], bloco):
+                total += yield passo(self._excluir_bloco_auditoria, sql, ids_bloco)
+        except Exception as e:
+            # Os blocos já confirmados continuam excluídos
+            print('[DB] Erro ao excluir auditoria:', e)
+        return total
+
+    @escrita()
+    def _excluir_bloco_auditoria(self, t, sql, ids):
+        yield passo(t.cur.execute, sql, ids)
+        excluidos = t.cur.rowcount
+        t.contar('auditoria', -excluidos)
+        t.publicar('auditoria', 'DELETE')
+        return excluidos
+
+    # ======================================================
+    # CARGOS
+    # ======================================================
+    @roteiro
+    def buscar_cargos_por_nome(self, nome=''):
+        # Tabela pequena e quase estática: a lista fica em cache até a próxima escrita em cargos.
+        # O que vai para o cache sai do primário: uma réplica atrasada deixaria o cache velho até o TTL
+        return (yield from self._em_cache(f'cargos:{nome}',
+                                          passo(self._buscar, *comandos.sql_cargos(nome), primario=True)))
+
+    @escrita()
+    def inserir_cargo(self, t, nome, salario, descricao, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_CARGO, comandos.valores_cargo(nome, salario, descricao))
+        cargo_id = t.cur.lastrowid
+        t.contar('cargos', 1)
+        t.invalidar('cargos:', prefixo=True)
+        t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+        t.publicar('cargos', 'INSERT', cargo_id)
+        t.auditar(usuario, 'Cargos', 'INSERT', f'Cadastro do cargo "{nome}" (ID {cargo_id})')
+        return cargo_id
+
+    @escrita()
+    def atualizar_cargo(self, t, id, nome, salario, descricao, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_ATUALIZAR_CARGO, comandos.valores_cargo(nome, salario, descricao) + (id,))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.invalidar('cargos:', prefixo=True)
+            t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+            t.publicar('cargos', 'UPDATE', id)
+            t.auditar(usuario, 'Cargos', 'UPDATE', f'Atualização do cargo ID {id}')
+        return sucesso
+
+    @escrita()
+    def deletar_cargo(self, t, id, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_DELETAR_CARGO, (id,))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.contar('cargos', -1)
+            t.invalidar('cargos:', prefixo=True)
+            t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+            t.publicar('cargos', 'DELETE', id)
+            t.auditar(usuario, 'Cargos', 'DELETE', f'Exclusão do cargo ID {id}')
+        return sucesso
+
+    # ======================================================
+    # FUNCIONÁRIOS
+    # ======================================================
+    def buscar_funcionarios(self, nome='', cpf=''):
+        return self._buscar(*comandos.sql_funcionarios(nome, cpf))
+
+    @escrita(validar=_cpf_valido)
+    def inserir_funcionario(self, t, nome, data_nascimento, endereco, cpf, email, telefone, cargo_id, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_FUNCIONARIO,
+                    comandos.valores_funcionario(nome, data_nascimento, endereco, cpf, email, telefone, cargo_id))
+        funcionario_id = t.cur.lastrowid
+        t.contar('funcionarios', 1)
+        t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+        t.publicar('funcionarios', 'INSERT', funcionario_id)
+        t.auditar(usuario, 'Funcionários', 'INSERT', f'Cadastro do funcionário "{nome}" (ID {funcionario_id})')
+        return funcionario_id
+
+    @escrita(se_falhar=_sem_sucesso)
+    def atualizar_funcionario(self, t, id, data, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_ATUALIZAR_FUNCIONARIO, comandos.valores_atualizar_funcionario(id, data))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+            t.publicar('funcionarios', 'UPDATE', id)
+            t.auditar(usuario, 'Funcionários', 'UPDATE', f'Atualização do funcionário ID {id}')
+        return sucesso
+
+    @escrita(se_falhar=_sem_sucesso)
+    def deletar_funcionario(self, t, id, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_DELETAR_FUNCIONARIO, (id,))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.contar('funcionarios', -1)
+            t.invalidar(comandos.PREFIXO_RELATORIO_FUNCIONARIOS, prefixo=True)
+            t.publicar('funcionarios', 'DELETE', id)
+            t.auditar(usuario, 'Funcionários', 'DELETE', f'Exclusão do funcionário ID {id}')
+        return sucesso
+
+    # ======================================================
+    # RELATÓRIOS
+    # ======================================================
+    @roteiro
+    def buscar_relatorio_funcionarios(self, cargo_id=None, nome=''):
+        # Agregado de cargos e funcionários: fica em cache até a próxima escrita em qualquer um dos dois
+        return (yield from self._em_cache(
+            f'{comandos.PREFIXO_RELATORIO_FUNCIONARIOS}{cargo_id or ""}:{nome}',
+            passo(self._buscar, *comandos.sql_relatorio_funcionarios(cargo_id, nome), primario=True)))
+
+    def iterar_relatorio_funcionarios(self, cargo_id=None, nome=''):
+        return self._iterar(*comandos.sql_relatorio_funcionarios(cargo_id, nome))
+
+    # ======================================================
+    # CPF
+    # ======================================================
+    def validar_cpf(self, cpf):
+        return validar_cpf(cpf)
+
+    # ======================================================
+    # PACIENTES
+    # ======================================================
+    def buscar_pacientes(self, nome='', cpf=''):
+        return self._buscar(*comandos.sql_pacientes(nome, cpf))
+
+    def iterar_pacientes(self, nome='', cpf=''):
+        return self._iterar(*comandos.sql_pacientes(nome, cpf))
+
+    @roteiro
+    def buscar_paciente_por_id(self, id):
+        return (yield from self._em_cache(f'paciente:{id}',
+                                          passo(self._buscar_um, comandos.SQL_PACIENTE_POR_ID, (id,), primario=True)))
+
+    @escrita(validar=_cpf_valido, se_falhar=_cpf_duplicado)
+    def inserir_paciente(self, t, nome, cpf, data_nascimento, telefone, email, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_PACIENTE,
+                    comandos.valores_paciente(nome, cpf, data_nascimento, telefone, email))
+        paciente_id = t.cur.lastrowid
+        t.contar('pacientes', 1)
+        t.publicar('pacientes', 'INSERT', paciente_id)
+        t.apos_commit(self.autocomplete.inserir, paciente_id, nome, cpf)
+        t.auditar(usuario, 'Pacientes', 'INSERT', f'Cadastro do paciente "{nome}" (ID {paciente_id})')
+        return paciente_id
+
+    @escrita(validar=_cpf_valido, se_falhar=_horario_ou_cpf)
+    def inserir_paciente_com_consulta(self, t, nome, cpf, data_nascimento, telefone, email,
+                                      consulta, data, hora, status='Agendada', usuario='Sistema'):
+        # Recepção: paciente novo e primeira consulta no mesmo COMMIT, com um lote só de auditoria.
+        # Se o horário já estiver ocupado, o paciente também não fica gravado.
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_PACIENTE,
+                    comandos.valores_paciente(nome, cpf, data_nascimento, telefone, email))
+        paciente_id = t.cur.lastrowid
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_CONSULTA, (paciente_id, consulta, data, hora, status))
+        consulta_id = t.cur.lastrowid
+        t.contar('pacientes', 1)
+        t.contar(f'consultas:{status}', 1)
+        t.publicar('pacientes', 'INSERT', paciente_id)
+        t.apos_commit(self.autocomplete.inserir, paciente_id, nome, cpf)
+        t.auditar(usuario, 'Pacientes', 'INSERT', f'Cadastro do paciente "{nome}" (ID {paciente_id})')
+        t.publicar('consultas', 'INSERT', consulta_id)
+        t.auditar(usuario, 'Consultas', 'INSERT', f'Agendamento de consulta ID {consulta_id} para paciente ID {paciente_id}')
+        return paciente_id, consulta_id
+
+    @escrita(se_falhar=_sem_sucesso)
+    def atualizar_paciente(self, t, id, data, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_ATUALIZAR_PACIENTE, comandos.valores_atualizar_paciente(id, data))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.invalidar(f'paciente:{id}')
+            t.publicar('pacientes', 'UPDATE', id)
+            t.apos_commit(self.autocomplete.atualizar, id, data.get('nome'), data.get('cpf'))
+            t.auditar(usuario, 'Pacientes', 'UPDATE', f'Atualização do paciente ID {id}')
+        return sucesso
+
+    @escrita(se_falhar=_sem_sucesso)
+    def deletar_paciente(self, t, id, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_STATUS_CONSULTAS_DO_PACIENTE, (id,))
+        consultas = yield t.cur.fetchall
+        yield passo(t.cur.execute, comandos.SQL_DELETAR_PACIENTE, (id,))
+        sucesso = t.cur.rowcount > 0
+        if sucesso:
+            t.contar('pacientes', -1)
+            t.invalidar(f'paciente:{id}')
+            for linha in consultas:
+                t.contar(f"consultas:{linha['status'] or ''}", -1)
+            # Os outros workers tiram o paciente do autocomplete na atualização incremental
+            yield passo(t.cur.execute, comandos.SQL_REGISTRAR_EXCLUSAO_PACIENTE, (id,))
+            yield passo(t.cur.execute, comandos.SQL_EXPURGAR_EXCLUSOES_PACIENTES, (RETENCAO_EXCLUSOES,))
+            t.publicar('pacientes', 'DELETE', id)
+            t.apos_commit(self.autocomplete.remover, id)
+            t.auditar(usuario, 'Pacientes', 'DELETE', f'Exclusão do paciente ID {id}')
+        return sucesso
+
+    # ======================================================
+    # IMPORTAÇÃO EM LOTE
+    # ======================================================
+    @roteiro
+    def importar_pacientes(self, linhas, usuario='Sistema', lote=500):
+        # 1) Validação local: campos obrigatórios, CPF e duplicados dentro do próprio arquivo
+        validos, erros = comandos.validar_importacao(linhas)
+
+        inseridos = 0
+        for inicio in range(0, len(validos), lote):
+            bloco = validos[inicio:inicio + lote]
+
+            # 2) CPFs já cadastrados: uma consulta por bloco no índice de cpf_digitos, no primário
+            existentes = yield passo(self._buscar, *comandos.sql_cpfs_existentes(bloco), primario=True)
+            novos = comandos.separar_existentes(bloco, existentes, erros)
+            if not novos:
+                continue
+
+            # 3) Um INSERT de várias linhas por bloco, numa transação curta
+            try:
+                inseridos += yield passo(self._inserir_bloco_pacientes, novos, usuario)
+            except IntegrityError:
+                # Alguém cadastrou um desses CPFs no meio do caminho: refaz linha a linha com savepoints
+                inseridos += yield passo(self._inserir_linha_a_linha, novos, erros, usuario)
+
+        erros.sort(key=lambda e: e['linha'])
+        return {'total': len(linhas), 'inseridos': inseridos, 'erros': erros}
+
+    @escrita()
+    def _inserir_bloco_pacientes(self, t, novos, usuario):
+        yield passo(t.cur.executemany, comandos.SQL_INSERIR_PACIENTE, [valores for _, valores in novos])
+        t.contar('pacientes', len(novos))
+        t.publicar('pacientes', 'INSERT')
+        t.apos_commit(self.autocomplete.expirar)
+        t.auditar(usuario, 'Pacientes', 'INSERT', comandos.descricao_importacao(len(novos), novos[0][0], novos[-1][0]))
+        return len(novos)
+
+    @escrita()
+    def _inserir_linha_a_linha(self, t, novos, erros, usuario):
+        inseridos = 0
+        for numero, valores in novos:
+            yield passo(t.cur.execute, "SAVEPOINT linha")
+            try:
+                yield passo(t.cur.execute, comandos.SQL_INSERIR_PACIENTE, valores)
+                inseridos += 1
+            except IntegrityError:
+                yield passo(t.cur.execute, "ROLLBACK TO SAVEPOINT linha")
+                erros.append({'linha': numero, 'cpf': valores[1], 'erro': 'CPF já cadastrado'})
+        if inseridos:
+            t.contar('pacientes', inseridos)
+            t.publicar('pacientes', 'INSERT')
+            t.apos_commit(self.autocomplete.expirar)
+            t.auditar(usuario, 'Pacientes', 'INSERT', comandos.descricao_importacao(inseridos, novos[0][0], novos[-1][0]))
+        return inseridos
+
+    # ======================================================
+    # BUSCA RANQUEADA
+    # ======================================================
+    @roteiro
+    def buscar_por_termo(self, termo, tipos=('pacientes', 'funcionarios'), limite=20):
+        resultados = {}
+        for tabela in tipos:
+            comando = comandos.sql_busca_termo(tabela, termo, limite)
+            resultados[tabela] = (yield passo(self._buscar, *comando)) if comando is not None else []
+        return resultados
+
+    # ======================================================
+    # AUTOCOMPLETE DE PACIENTES
+    # ======================================================
+    @roteiro
+    def buscar_autocomplete(self, termo, limite=10):
+        """Até `limite` pacientes {id, nome, cpf} para o seletor da tela de consultas."""
+        if self.autocomplete.precisa_atualizar():
+            self._atualizar_autocomplete()
+        if not self.autocomplete.pronto:
+            # Primeira carga ainda em andamento: a mesma resposta, direto do banco
+            resultado = (yield passo(self.buscar_por_termo, termo, ('pacientes',), limite))['pacientes']
+            return [{'id': p['id'], 'nome': p['nome'], 'cpf': p['cpf']} for p in resultado]
+        return self.autocomplete.buscar(termo, limite)
+
+    @roteiro
+    def _carregar_autocomplete(self):
+        # Sempre do primário: numa réplica atrasada a marca d'água passaria por cima de mudanças
+        indice = self.autocomplete
+        inicio = time.perf_counter()
+        try:
+            marca = (yield passo(self._buscar_um, comandos.SQL_AGORA, primario=True))['agora']
+            if indice.precisa_carga_completa():
+                linhas = yield passo(self._listar, comandos.SQL_AUTOCOMPLETE_PACIENTES, primario=True)
+                # Ordenar dezenas de milhares de nomes: fora do event loop no ASGI
+                yield passo(self._bloqueante, indice.concluir_carga, linhas, marca)
+                print(f"[DB] Autocomplete: {len(linhas)} pacientes em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+            else:
+                desde = indice.desde()
+                alterados = yield passo(self._buscar, comandos.SQL_AUTOCOMPLETE_ALTERADOS, (desde,), primario=True)
+                excluidos = yield passo(self._buscar, comandos.SQL_AUTOCOMPLETE_EXCLUIDOS, (desde,), primario=True)
+                indice.concluir_atualizacao(alterados, [linha['paciente_id'] for linha in excluidos], marca)
+        except BaseException as e:
+            indice.cancelar_carga()
+            # Task cancelada no fechar() do ASGI: o cancelamento segue adiante
+            if not isinstance(e, Exception):
+                raise
+            print(f"[DB] Autocomplete sem atualização (tenta de novo em instantes): {e}")
+
+    # ======================================================
+    # CONSULTAS
+    # ======================================================
+    @roteiro
+    def buscar_consultas(self, limite=100, apos=None, **filtros):
+        sql, params = comandos.sql_consultas(limite + 1, apos, **filtros)
+        return comandos.pagina((yield passo(self._buscar, sql, params)), limite, 'data', 'hora', 'id')
+
+    def iterar_consultas(self, **filtros):
+        return self._iterar(*comandos.sql_consultas(**filtros))
+
+    @roteiro
+    def buscar_agenda(self, data_inicio, data_fim, status=None):
+        """Consultas do período em ordem cronológica, agrupadas por dia."""
+        sql, params = comandos.sql_agenda(data_inicio, data_fim, status)
+        return comandos.montar_agenda((yield passo(self._buscar, sql, params)), data_inicio, data_fim)
+
+    @roteiro
+    def buscar_disponibilidade(self, consulta, data_inicio, data_fim, **grade):
+        """Horários livres da especialidade no período, agrupados por dia."""
+        sql, params = comandos.sql_disponibilidade(consulta, data_inicio, data_fim, agora=agora_brasilia(), **grade)
+        return comandos.montar_disponibilidade((yield passo(self._buscar, sql, params)), data_inicio, data_fim)
+
+    @escrita(se_falhar=_horario_ocupado)
+    def inserir_consulta(self, t, paciente_id, consulta, data, hora, status='Agendada', usuario='Sistema'):
+        # Sem SELECT prévio: o INSERT espera o lock da chave no índice único, então duas
+        # tentativas no mesmo horário entram em fila e a segunda recebe a chave duplicada
+        yield passo(t.cur.execute, comandos.SQL_INSERIR_CONSULTA, (paciente_id, consulta, data, hora, status))
+        consulta_id = t.cur.lastrowid
+        t.contar(f'consultas:{status}', 1)
+        t.publicar('consultas', 'INSERT', consulta_id)
+        t.auditar(usuario, 'Consultas', 'INSERT', f'Agendamento de consulta ID {consulta_id} para paciente ID {paciente_id}')
+        return consulta_id
+
+    @escrita(se_falhar=_status_consulta)
+    def atualizar_status_consulta(self, t, id, status, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_STATUS_CONSULTA, (id,))
+        anterior = yield t.cur.fetchone
+        yield passo(t.cur.execute, comandos.SQL_ATUALIZAR_STATUS_CONSULTA, (status, id))
+        sucesso = t.cur.rowcount > 0
+        if sucesso and anterior and anterior['status'] != status:
+            t.contar(f"consultas:{anterior['status'] or ''}", -1)
+            t.contar(f'consultas:{status}', 1)
+        if sucesso:
+            t.publicar('consultas', 'UPDATE', id, {'status': status})
+            t.auditar(usuario, 'Consultas', 'UPDATE', f'Atualização de status da consulta ID {id} para "{status}"')
+        return sucesso
+
+    @escrita(se_falhar=_sem_sucesso)
+    def deletar_consulta(self, t, id, usuario='Sistema'):
+        yield passo(t.cur.execute, comandos.SQL_STATUS_CONSULTA, (id,))
+        anterior = yield t.cur.fetchone
+        yield passo(t.cur.execute, comandos.SQL_DELETAR_CONSULTA, (id,))
+        sucesso = t.cur.rowcount > 0
+        if sucesso and anterior:
+            t.contar(f"consultas:{anterior['status'] or ''}", -1)
+            t.publicar('consultas', 'DELETE', id)
+            t.auditar(usuario, 'Consultas', 'DELETE', f'Exclusão da consulta ID {id}')
+        return sucesso
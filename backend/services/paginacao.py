@@ -0,0 +1,38 @@
+"""
+services/paginacao.py
+
+Cursores opacos para paginação por keyset (ex.: data_hora + id).
+"""
+
+import base64
+import json
+
+
+def codificar_cursor(*valores):
+    # Datas viram texto no formato aceito pelo MySQL ('YYYY-MM-DD HH:MM:SS')
+    bruto = json.dumps([v if isinstance(v, (int, float)) or v is None else str(v) for v in valores],
+                       separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, tamanho):
+    try:
+        preenchido = cursor + '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(preenchido.encode()).decode())
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise ValueError("Cursor inválido")
+    return valores
+
+
+def limite_da_requisicao(valor, padrao=100, maximo=1000):
+    if valor in (None, ''):
+        return padrao
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetro limit inválido")
+    if limite < 1:
+        raise ValueError("Parâmetro limit inválido")
+    return min(limite, maximo)
@@ -0,0 +1,200 @@
+"""
+services/parametros.py
+
+Leitura e validação dos parâmetros das requisições, e montagem das
+respostas que não dependem do framework. Usado pelo app WSGI (app.py)
+e pelo ASGI (asgi.py), para os dois aceitarem e devolverem o mesmo.
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from services.auditoria import agora_brasilia
+from services.serializacao import formatar_data, serializar_lista
+
+MIMETYPES_STREAM = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def formato_stream(args, accept_mimetypes):
+    # ?stream=1 → array JSON em streaming; Accept: application/x-ndjson ou ?stream=ndjson → NDJSON;
+    # Accept: text/csv ou ?stream=csv → CSV
+    if args.get('stream') in ('ndjson', 'csv'):
+        return args.get('stream')
+    melhor = accept_mimetypes.best_match(['application/json', 'application/x-ndjson', 'text/csv'])
+    if melhor == 'application/x-ndjson':
+        return 'ndjson'
+    if melhor == 'text/csv':
+        return 'csv'
+    if args.get('stream') == '1':
+        return 'json'
+    return None
+
+
+def ler_csv(conteudo):
+    # Planilhas brasileiras costumam exportar com ';'
+    texto = conteudo.decode('utf-8-sig', errors='replace')
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(io.StringIO(texto), dialect=dialeto)
+    return [{(k or '').strip().lower(): (v or '').strip() for k, v in linha.items()} for linha in leitor]
+
+
+def ler_data(valor):
+    # Datas de filtro chegam como AAAA-MM-DD (input type="date")
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Data inválida: {valor}")
+
+
+def ler_status(args):
+    # ?status=Agendada,Confirmada
+    return [s for s in (args.get('status') or '').split(',') if s] or None
+
+
+def filtros_auditoria(args):
+    return {
+        'modulo': args.get('modulo') or None,
+        'acao': args.get('acao') or None,
+        'usuario': args.get('usuario') or None,
+        'data_inicio': ler_data(args.get('data_inicio')),
+        'data_fim': ler_data(args.get('data_fim'))
+    }
+
+
+def filtros_consultas(args):
+    data_inicio = ler_data(args.get('data_inicio'))
+    data_fim = ler_data(args.get('data_fim'))
+    paciente_id = args.get('paciente_id')
+    if paciente_id and not paciente_id.isdigit():
+        raise ValueError(f"paciente_id inválido: {paciente_id}")
+    return {
+        'data_inicio': data_inicio.date() if data_inicio else None,
+        'data_fim': data_fim.date() if data_fim else None,
+        'status': ler_status(args),
+        'paciente_id': int(paciente_id) if paciente_id else None,
+        'nome': (args.get('nome') or '').strip() or None,
+        'consulta': (args.get('consulta') or '').strip() or None
+    }
+
+
+def filtros_relatorio_funcionarios(args):
+    cargo_id = args.get('cargo_id')
+    if cargo_id and not cargo_id.isdigit():
+        raise ValueError(f"cargo_id inválido: {cargo_id}")
+    return {
+        'cargo_id': int(cargo_id) if cargo_id else None,
+        'nome': args.get('nome', '')
+    }
+
+
+def periodo_agenda(args):
+    data = ler_data(args.get('data'))
+    dia = data.date() if data else agora_brasilia().date()
+    visao = args.get('visao', 'dia')
+    if visao == 'dia':
+        return visao, dia, dia
+    if visao == 'semana':
+        # Semana de segunda a domingo que contém o dia pedido
+        inicio = dia - timedelta(days=dia.weekday())
+        return visao, inicio, inicio + timedelta(days=6)
+    raise ValueError(f"Visão inválida: {visao}")
+
+
+def resposta_agenda(visao, data_inicio, data_fim, dias):
+    return {
+        'visao': visao,
+        'data_inicio': formatar_data(data_inicio),
+        'data_fim': formatar_data(data_fim),
+        'total': sum(d['total'] for d in dias),
+        'dias': [
+            {
+                'data': formatar_data(d['data']),
+                'total': d['total'],
+                'por_status': d['por_status'],
+                'consultas': serializar_lista(d['consultas'])
+            }
+            for d in dias
+        ]
+    }
+
+
+def ler_hora(valor):
+    # HH:MM (input type="time")
+    try:
+        hora = datetime.strptime(valor, '%H:%M')
+    except ValueError:
+        raise ValueError(f"Hora inválida: {valor}")
+    return timedelta(hours=hora.hour, minutes=hora.minute)
+
+
+def filtros_disponibilidade(args):
+    consulta = (args.get('consulta') or '').strip()
+    if not consulta:
+        raise ValueError('Informe a especialidade (consulta)')
+    data_inicio = ler_data(args.get('data_inicio'))
+    data_inicio = data_inicio.date() if data_inicio else agora_brasilia().date()
+    data_fim = ler_data(args.get('data_fim'))
+    data_fim = data_fim.date() if data_fim else data_inicio + timedelta(days=6)
+
+    grade = {}
+    if args.get('inicio'):
+        grade['inicio'] = ler_hora(args.get('inicio'))
+    if args.get('fim'):
+        grade['fim'] = ler_hora(args.get('fim'))
+    if args.get('intervalo'):
+        if not args.get('intervalo').isdigit():
+            raise ValueError(f"Intervalo inválido: {args.get('intervalo')}")
+        grade['intervalo'] = int(args.get('intervalo'))
+    return consulta, data_inicio, data_fim, grade
+
+
+def resposta_disponibilidade(consulta, dias):
+    return {
+        'consulta': consulta,
+        'total': sum(len(d['horarios']) for d in dias),
+        'dias': [{'data': formatar_data(d['data']), 'horarios': d['horarios']} for d in dias]
+    }
+
+
+def resposta_relatorio_funcionarios(linhas):
+    funcionarios = sum(l['funcionarios'] for l in linhas)
+    folha = sum((l['folha'] for l in linhas), Decimal(0))
+    return {
+        'cargos': serializar_lista(linhas),
+        'totais': {
+            'cargos': len(linhas),
+            'funcionarios': funcionarios,
+            'folha': folha,
+            'media_salario': round(folha / funcionarios, 2) if funcionarios else None
+        }
+    }
+
+
+def linhas_importacao(dados):
+    """Lista de pacientes de um corpo JSON ({'pacientes': [...]} ou [...]), ou None se inválido.
+
+    Itens que não são objetos voltam como erro da própria linha (comandos.validar_importacao).
+    """
+    linhas = dados.get('pacientes') if isinstance(dados, dict) else dados
+    return linhas if isinstance(linhas, list) else None
+
+
+def tamanho_lote(valor):
+    try:
+        lote = min(int(valor if valor is not None else 500), 5000)
+    except ValueError:
+        raise ValueError('Parâmetro lote inválido')
+    if lote < 1:
+        raise ValueError('Parâmetro lote inválido')
+    return lote
@@ -0,0 +1,205 @@
+"""
+services/pool.py
+
+Pool de conexões thread-safe usado pelo Database.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from pymysql.constants import SERVER_STATUS
+from pymysql.err import InterfaceError, OperationalError
+
+# Códigos do cliente MySQL que indicam socket perdido
+ERROS_CONEXAO = {2003, 2006, 2013, 2014, 2045, 2055}
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo limite de checkout."""
+
+
+class ConnectionPool:
+    def __init__(self, fabrica, min_size=1, max_size=10, timeout=10, max_lifetime=3600, ping_apos=1):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Tamanhos de pool inválidos")
+        self._fabrica = fabrica
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_apos = ping_apos
+
+        self._cond = threading.Condition()
+        self._livres = deque()   # (conexao, criada_em, devolvida_em)
+        self._criacao = {}       # id(conexao) -> criada_em, para as conexões em uso
+        self._total = 0
+        self._fechado = False
+
+        # Estatísticas
+        self._checkouts = 0
+        self._esperas = 0
+        self._tempo_espera_total = 0.0
+        self._tempo_espera_max = 0.0
+        self._timeouts = 0
+        self._descartadas = 0
+
+        for _ in range(min_size):
+            self._livres.append((self._nova_conexao(), time.monotonic(), time.monotonic()))
+
+    # ======================================================
+    # CICLO DE VIDA DAS CONEXÕES
+    # ======================================================
+    def _nova_conexao(self):
+        conexao = self._fabrica()
+        with self._cond:
+            self._total += 1
+        return conexao
+
+    def _descartar(self, conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._descartadas += 1
+            self._cond.notify()
+
+    def _valida(self, conexao, criada_em, devolvida_em):
+        agora = time.monotonic()
+        if self.max_lifetime and agora - criada_em > self.max_lifetime:
+            return False
+        if agora - devolvida_em >= self.ping_apos:
+            try:
+                conexao.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    # ======================================================
+    # CHECKOUT / DEVOLUÇÃO
+    # ======================================================
+    def obter(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        esperou = False
+
+        while True:
+            with self._cond:
+                if self._fechado:
+                    raise PoolEsgotado("Pool fechado")
+                while not self._livres and self._total >= self.max_size:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolEsgotado(f"Nenhuma conexão livre em {self.timeout}s")
+                    esperou = True
+                    self._cond.wait(restante)
+                item = self._livres.pop() if self._livres else None
+                if item is None:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._total += 1
+
+            if item is None:
+                try:
+                    conexao = self._fabrica()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                criada_em = time.monotonic()
+            else:
+                conexao, criada_em, devolvida_em = item
+                if not self._valida(conexao, criada_em, devolvida_em):
+                    self._descartar(conexao)
+                    continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._criacao[id(conexao)] = criada_em
+                self._checkouts += 1
+                if esperou:
+                    self._esperas += 1
+                self._tempo_espera_total += espera
+                self._tempo_espera_max = max(self._tempo_espera_max, espera)
+            return conexao
+
+    def devolver(self, conexao, descartar=False):
+        with self._cond:
+            criada_em = self._criacao.pop(id(conexao), None)
+        if criada_em is None:
+            return
+
+        if not descartar and _em_transacao(conexao):
+            try:
+                # Nunca devolve ao pool uma transação pela metade
+                conexao.rollback()
+            except Exception:
+                descartar = True
+
+        if descartar or self._fechado:
+            self._descartar(conexao)
+            return
+
+        with self._cond:
+            # LIFO: as conexões mais quentes são reutilizadas primeiro
+            self._livres.append((conexao, criada_em, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def conexao(self):
+        conexao = self.obter()
+        descartar = False
+        try:
+            yield conexao
+        except Exception as e:
+            # Erros de rede/protocolo deixam o socket em estado incerto
+            descartar = _conexao_perdida(e)
+            raise
+        finally:
+            self.devolver(conexao, descartar=descartar)
+
+    # ======================================================
+    # ESTATÍSTICAS / ENCERRAMENTO
+    # ======================================================
+    def estatisticas(self):
+        with self._cond:
+            livres = len(self._livres)
+            return {
+                'min': self.min_size,
+                'max': self.max_size,
+                'total': self._total,
+                'em_uso': len(self._criacao),
+                'livres': livres,
+                'checkouts': self._checkouts,
+                'esperas': self._esperas,
+                'timeouts': self._timeouts,
+                'descartadas': self._descartadas,
+                'espera_media_ms': round(self._tempo_espera_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'espera_max_ms': round(self._tempo_espera_max * 1000, 3),
+            }
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            livres = list(self._livres)
+            self._livres.clear()
+            self._cond.notify_all()
+        for conexao, _, _ in livres:
+            self._descartar(conexao)
+
+
+def _conexao_perdida(erro):
+    if isinstance(erro, InterfaceError):
+        return True
+    return isinstance(erro, OperationalError) and bool(erro.args) and erro.args[0] in ERROS_CONEXAO
+
+
+def _em_transacao(conexao):
+    status = getattr(conexao, 'server_status', None)
+    if status is None:
+        return True
+    return bool(status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
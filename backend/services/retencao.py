@@ -0,0 +1,102 @@
+"""
+services/retencao.py
+
+Política de retenção da auditoria: apaga (e opcionalmente arquiva) os
+registros com data_hora anterior a N dias, em lotes pequenos.
+
+    python -m services.retencao --dias 365
+    python -m services.retencao --dias 180 --arquivar arquivo/auditoria
+    python -m services.retencao --dias 180 --simular
+
+Cada lote é uma transação curta que apaga por id as linhas mais antigas
+(idx_auditoria_data_hora), com uma pausa entre lotes. As inserções do
+registrar_auditoria caem no fim da tabela e não disputam lock com o
+expurgo, que trabalha no começo dela.
+
+O formato do arquivo (NDJSON com gzip por mês, mais o manifesto) é o de
+services/arquivo_auditoria.py, que o /api/auditoria lê quando a tabela
+acaba. A linha é gravada antes do DELETE ser confirmado: se o processo
+cair entre os dois, o registro pode aparecer duas vezes no arquivo, mas
+nunca se perde. Sem --arquivar, vale o AUDITORIA_ARQUIVO da API.
+"""
+
+import argparse
+import os
+import time
+from datetime import timedelta
+
+from services import comandos
+from services.arquivo_auditoria import ArquivoAuditoria
+from services.auditoria import agora_brasilia
+
+
+# ======================================================
+# EXPURGO
+# ======================================================
+def contar_expirados(db, antes_de):
+    linha = db._buscar("SELECT COUNT(*) AS total FROM auditoria WHERE data_hora < %s", (antes_de,))
+    return linha[0]['total']
+
+
+def expurgar_auditoria(db, antes_de, lote=1000, pausa=0.05, diretorio=None):
+    """Apaga (e arquiva, com diretorio) os registros anteriores a antes_de; devolve o total."""
+    arquivo = ArquivoAuditoria(diretorio) if diretorio else None
+    total = 0
+    while True:
+        with db._transacao() as t:
+            t.cur.execute(comandos.SQL_AUDITORIA_EXPIRADA, (antes_de, lote))
+            registros = t.cur.fetchall()
+            if not registros:
+                break
+            if arquivo:
+                # O DELETE só é confirmado depois que o lote está no disco
+                arquivo.gravar(registros)
+            sql, ids = comandos.sql_excluir_auditoria([r['id'] for r in registros])
+            t.cur.execute(sql, ids)
+            excluidos = t.cur.rowcount
+            t.contar('auditoria', -excluidos)
+        total += excluidos
+        print(f"[RETENÇÃO] {total} registros expurgados (até {registros[-1]['data_hora']})")
+        if len(registros) < lote:
+            break
+        # Folga para as transações da aplicação entre um lote e outro
+        time.sleep(pausa)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, required=True, help='mantém os últimos N dias')
+    parser.add_argument('--lote', type=int, default=1000, help='linhas por transação')
+    parser.add_argument('--pausa', type=float, default=0.05, help='segundos entre lotes')
+    parser.add_argument('--arquivar', metavar='DIRETORIO', default=os.getenv('AUDITORIA_ARQUIVO') or None,
+                        help='grava os registros em NDJSON gzip antes de apagar (padrão: AUDITORIA_ARQUIVO)')
+    parser.add_argument('--simular', action='store_true', help='só conta o que seria expurgado')
+    args = parser.parse_args()
+    if args.dias < 1 or args.lote < 1:
+        parser.error('--dias e --lote precisam ser maiores que zero')
+
+    from app import criar_database
+    db = criar_database()
+    try:
+        antes_de = agora_brasilia() - timedelta(days=args.dias)
+
+        if args.simular:
+            print(f"[RETENÇÃO] {contar_expirados(db, antes_de)} registros anteriores a {antes_de:%d/%m/%Y %H:%M}")
+            return
+
+        inicio = time.perf_counter()
+        total = expurgar_auditoria(db, antes_de, args.lote, args.pausa, args.arquivar)
+        print(f"[RETENÇÃO] {total} registros anteriores a {antes_de:%d/%m/%Y %H:%M} "
+              f"{'arquivados e ' if args.arquivar else ''}excluídos em {time.perf_counter() - inicio:.1f}s")
+        if total:
+            db.registrar_auditoria('Sistema', 'Auditoria', 'DELETE',
+                                   f'Retenção de {args.dias} dias: {total} registros anteriores a '
+                                   f'{antes_de:%d/%m/%Y} {"arquivados e " if args.arquivar else ""}excluídos')
+    finally:
+        # Grava a auditoria pendente, fecha os pools e para a verificação das réplicas
+        db.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+"""
+services/rotas.py
+
+Rotas da API, as mesmas no modo WSGI (app.py) e no ASGI (asgi.py).
+
+Cada rota é um roteiro (services/roteiros.py) que recebe o get_db do
+app, o Pedido e os parâmetros da URL, e devolve:
+
+    (dados, status)          jsonify
+    Json(dados, status)      dumps_json (datas e Decimal como a tela espera)
+    Stream(blocos, formato)  resposta em blocos (json, ndjson ou csv)
+
+O app registra a tabela ROTAS no Flask ou no Quart e converte a resposta.
+Ficam nos apps só as rotas de infraestrutura (contadores com ETag, SSE,
+saúde, monitoramento) e os tratadores de erro.
+"""
+
+from collections import namedtuple
+
+from pymysql.err import IntegrityError
+
+from services import parametros
+from services.paginacao import limite_da_requisicao
+from services.roteiros import passo
+from services.serializacao import serializar_lista
+
+# json: corpo JSON ou None; aceita: Accept da requisição; csv: bytes do CSV (só nas rotas com csv=True)
+Pedido = namedtuple('Pedido', 'args json aceita csv')
+Rota = namedtuple('Rota', 'caminho metodo funcao csv')
+Json = namedtuple('Json', 'dados status', defaults=(200,))
+Stream = namedtuple('Stream', 'blocos formato')
+
+ROTAS = []
+
+
+def rota(caminho, metodo, csv=False):
+    def registrar(funcao):
+        ROTAS.append(Rota(caminho, metodo, funcao, csv))
+        return funcao
+    return registrar
+
+
+def quer_stream(pedido):
+    return parametros.formato_stream(pedido.args, pedido.aceita)
+
+
+# ======================================================
+# CARGOS
+# ======================================================
+@rota('/api/cargos', 'GET')
+def listar_cargos(get_db, pedido):
+    nome = pedido.args.get('nome', '')
+    return (yield passo(get_db().buscar_cargos_por_nome, nome)), 200
+
+
+@rota('/api/cargos', 'POST')
+def adicionar_cargo(get_db, pedido):
+    data = pedido.json or {}
+
+    if not data.get('nome') or data.get('salario') is None:
+        return {'erro': 'Nome e salário são obrigatórios'}, 400
+
+    novo_id = yield passo(
+        get_db().inserir_cargo,
+        data['nome'],
+        data['salario'],
+        data.get('descricao', '')
+    )
+    return {'id': novo_id}, 201
+
+
+@rota('/api/cargos/<int:id>', 'PUT')
+def editar_cargo(get_db, pedido, id):
+    data = pedido.json or {}
+    atualizado = yield passo(
+        get_db().atualizar_cargo,
+        id,
+        data.get('nome'),
+        data.get('salario'),
+        data.get('descricao')
+    )
+
+    if atualizado:
+        return {'mensagem': 'Cargo atualizado'}, 200
+
+    return {'erro': 'Cargo não encontrado'}, 404
+
+
+@rota('/api/cargos/<int:id>', 'DELETE')
+def remover_cargo(get_db, pedido, id):
+    try:
+        if (yield passo(get_db().deletar_cargo, id)):
+            return {'mensagem': 'Cargo excluído'}, 200
+        return {'erro': 'Cargo não encontrado'}, 404
+    except IntegrityError:
+        return {'erro': 'Existem funcionários vinculados a este cargo'}, 400
+
+
+# ======================================================
+# FUNCIONÁRIOS
+# ======================================================
+@rota('/api/funcionarios', 'GET')
+def listar_funcionarios(get_db, pedido):
+    return (yield passo(
+        get_db().buscar_funcionarios,
+        pedido.args.get('nome', ''),
+        pedido.args.get('cpf', '')
+    )), 200
+
+
+@rota('/api/funcionarios', 'POST')
+def adicionar_funcionario(get_db, pedido):
+    data = pedido.json or {}
+
+    try:
+        novo_id = yield passo(
+            get_db().inserir_funcionario,
+            data['nome'],
+            data.get('data_nascimento'),
+            data.get('endereco'),
+            data['cpf'],
+            data.get('email'),
+            data.get('telefone'),
+            data['cargo_id']
+        )
+        return {'id': novo_id}, 201
+
+    except IntegrityError:
+        return {'erro': 'CPF já cadastrado'}, 400
+
+
+@rota('/api/funcionarios/<int:id>', 'PUT')
+def editar_funcionario(get_db, pedido, id):
+    if (yield passo(get_db().atualizar_funcionario, id, pedido.json)):
+        return {'mensagem': 'Funcionário atualizado'}, 200
+
+    return {'erro': 'Funcionário não encontrado'}, 404
+
+
+@rota('/api/funcionarios/<int:id>', 'DELETE')
+def excluir_funcionario(get_db, pedido, id):
+    if (yield passo(get_db().deletar_funcionario, id)):
+        return {'mensagem': 'Funcionário excluído'}, 200
+
+    return {'erro': 'Funcionário não encontrado'}, 404
+
+
+# ======================================================
+# RELATÓRIOS
+# ======================================================
+@rota('/api/relatorios/funcionarios', 'GET')
+def relatorio_funcionarios(get_db, pedido):
+    # Quadro e folha por cargo; ?stream=csv (ou Accept: text/csv) exporta linha a linha
+    try:
+        filtros = parametros.filtros_relatorio_funcionarios(pedido.args)
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    formato = quer_stream(pedido)
+    if formato:
+        return Stream(get_db().iterar_relatorio_funcionarios(**filtros), formato)
+
+    linhas = yield passo(get_db().buscar_relatorio_funcionarios, **filtros)
+    return Json(parametros.resposta_relatorio_funcionarios(linhas))
+
+
+# ======================================================
+# PACIENTES
+# ======================================================
+@rota('/api/pacientes', 'GET')
+def listar_pacientes(get_db, pedido):
+    nome = pedido.args.get('nome', '')
+    cpf = pedido.args.get('cpf', '')
+
+    formato = quer_stream(pedido)
+    if formato:
+        return Stream(get_db().iterar_pacientes(nome, cpf), formato)
+
+    pacientes = yield passo(get_db().buscar_pacientes, nome, cpf)
+    return Json(serializar_lista(pacientes))
+
+
+@rota('/api/pacientes/autocomplete', 'GET')
+def autocomplete_pacientes(get_db, pedido):
+    # Seletor de paciente da tela de consultas: índice em memória, sem ir ao banco a cada tecla
+    termo = pedido.args.get('q', '').strip()
+    try:
+        limite = limite_da_requisicao(pedido.args.get('limit'), padrao=10, maximo=50)
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    if not termo:
+        return [], 200
+    return (yield passo(get_db().buscar_autocomplete, termo, limite)), 200
+
+
+@rota('/api/pacientes/<int:id>', 'GET')
+def buscar_paciente(get_db, pedido, id):
+    paciente = yield passo(get_db().buscar_paciente_por_id, id)
+
+    if paciente:
+        return serializar_lista([paciente])[0], 200
+
+    return {'erro': 'Paciente não encontrado'}, 404
+
+
+@rota('/api/pacientes', 'POST')
+def criar_paciente(get_db, pedido):
+    data = pedido.json or {}
+
+    if not data.get('nome') or not data.get('cpf'):
+        return {'erro': 'Nome e CPF são obrigatórios'}, 400
+
+    try:
+        paciente_id = yield passo(
+            get_db().inserir_paciente,
+            data['nome'],
+            data['cpf'],
+            data.get('data_nascimento'),
+            data.get('telefone'),
+            data.get('email')
+        )
+        return {'id': paciente_id}, 201
+
+    except IntegrityError:
+        return {'erro': 'CPF já cadastrado'}, 400
+
+
+@rota('/api/pacientes/com-consulta', 'POST')
+def criar_paciente_com_consulta(get_db, pedido):
+    data = pedido.json or {}
+
+    if not data.get('nome') or not data.get('cpf'):
+        return {'erro': 'Nome e CPF são obrigatórios'}, 400
+    if not data.get('consulta') or not data.get('data') or not data.get('hora'):
+        return {'erro': 'Consulta, data e hora são obrigatórios'}, 400
+
+    # Horário ocupado sobe como HorarioOcupado (409) e desfaz o cadastro junto
+    try:
+        paciente_id, consulta_id = yield passo(
+            get_db().inserir_paciente_com_consulta,
+            data['nome'],
+            data['cpf'],
+            data.get('data_nascimento'),
+            data.get('telefone'),
+            data.get('email'),
+            data['consulta'],
+            data['data'],
+            data['hora'],
+            data.get('status', 'Agendada')
+        )
+        return {'id': paciente_id, 'consulta_id': consulta_id}, 201
+
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+    except IntegrityError:
+        return {'erro': 'CPF já cadastrado'}, 400
+
+
+@rota('/api/pacientes/bulk', 'POST', csv=True)
+def importar_pacientes(get_db, pedido):
+    try:
+        lote = parametros.tamanho_lote(pedido.args.get('lote'))
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    if pedido.csv is not None:
+        linhas = parametros.ler_csv(pedido.csv)
+    else:
+        linhas = parametros.linhas_importacao(pedido.json)
+        if linhas is None:
+            return {'erro': 'Envie uma lista de pacientes em JSON ou um arquivo CSV'}, 400
+
+    if not linhas:
+        return {'erro': 'Nenhum paciente para importar'}, 400
+
+    relatorio = yield passo(get_db().importar_pacientes, linhas, lote=lote)
+    return relatorio, 201 if relatorio['inseridos'] else 400
+
+
+@rota('/api/pacientes/<int:id>', 'PUT')
+def atualizar_paciente(get_db, pedido, id):
+    if (yield passo(get_db().atualizar_paciente, id, pedido.json)):
+        return {'mensagem': 'Paciente atualizado'}, 200
+
+    return {'erro': 'Paciente não encontrado'}, 404
+
+
+@rota('/api/pacientes/<int:id>', 'DELETE')
+def deletar_paciente(get_db, pedido, id):
+    yield passo(get_db().deletar_paciente, id)
+    return {'mensagem': 'Paciente excluído'}, 200
+
+
+# ======================================================
+# BUSCA
+# ======================================================
+@rota('/api/search', 'GET')
+def buscar(get_db, pedido):
+    termo = pedido.args.get('q', '').strip()
+    tipos = [t for t in pedido.args.get('tipo', 'pacientes,funcionarios').split(',') if t]
+
+    if any(t not in ('pacientes', 'funcionarios') for t in tipos):
+        return {'erro': 'Tipo de busca inválido'}, 400
+    try:
+        limite = limite_da_requisicao(pedido.args.get('limit'), padrao=20, maximo=100)
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    if not termo:
+        return {t: [] for t in tipos}, 200
+    return (yield passo(get_db().buscar_por_termo, termo, tipos, limite)), 200
+
+
+# ======================================================
+# CONSULTAS
+# ======================================================
+@rota('/api/consultas', 'GET')
+def listar_consultas(get_db, pedido):
+    try:
+        filtros = parametros.filtros_consultas(pedido.args)
+        formato = quer_stream(pedido)
+        if formato:
+            return Stream(get_db().iterar_consultas(**filtros), formato)
+
+        registros, proximo = yield passo(
+            get_db().buscar_consultas,
+            limite=limite_da_requisicao(pedido.args.get('limit')),
+            apos=pedido.args.get('after') or None,
+            **filtros
+        )
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    return Json({'registros': serializar_lista(registros), 'proximo': proximo})
+
+
+@rota('/api/consultas/agenda', 'GET')
+def agenda_consultas(get_db, pedido):
+    try:
+        visao, data_inicio, data_fim = parametros.periodo_agenda(pedido.args)
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    dias = yield passo(get_db().buscar_agenda, data_inicio, data_fim, parametros.ler_status(pedido.args))
+    return Json(parametros.resposta_agenda(visao, data_inicio, data_fim, dias))
+
+
+@rota('/api/consultas/disponibilidade', 'GET')
+def disponibilidade_consultas(get_db, pedido):
+    try:
+        consulta, data_inicio, data_fim, grade = parametros.filtros_disponibilidade(pedido.args)
+        dias = yield passo(get_db().buscar_disponibilidade, consulta, data_inicio, data_fim, **grade)
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    return Json(parametros.resposta_disponibilidade(consulta, dias))
+
+
+@rota('/api/consultas', 'POST')
+def criar_consulta(get_db, pedido):
+    data = pedido.json or {}
+
+    consulta_id = yield passo(
+        get_db().inserir_consulta,
+        data['paciente_id'],
+        data['consulta'],
+        data['data'],
+        data['hora'],
+        data.get('status', 'Agendada')
+    )
+    return {'id': consulta_id}, 201
+
+
+@rota('/api/consultas/<int:id>', 'PATCH')
+def atualizar_status_consulta(get_db, pedido, id):
+    yield passo(get_db().atualizar_status_consulta, id, (pedido.json or {}).get('status'))
+    return {'mensagem': 'Status atualizado'}, 200
+
+
+@rota('/api/consultas/<int:id>', 'DELETE')
+def deletar_consulta(get_db, pedido, id):
+    yield passo(get_db().deletar_consulta, id)
+    return {'mensagem': 'Consulta excluída'}, 200
+
+
+# ======================================================
+# AUDITORIA
+# ======================================================
+@rota('/api/auditoria', 'GET')
+def listar_auditoria(get_db, pedido):
+    try:
+        filtros = parametros.filtros_auditoria(pedido.args)
+        formato = quer_stream(pedido)
+        if formato:
+            # Em streaming não há página: vai tudo que casar com os filtros
+            return Stream(get_db().iterar_auditoria(**filtros), formato)
+
+        registros, proximo = yield passo(
+            get_db().buscar_auditoria,
+            limite=limite_da_requisicao(pedido.args.get('limit')),
+            apos=pedido.args.get('after') or None,
+            **filtros
+        )
+    except ValueError as e:
+        return {'erro': str(e)}, 400
+
+    return Json({'registros': serializar_lista(registros), 'proximo': proximo})
+
+
+# 🔹 DELETE INDIVIDUAL (corrige o erro do frontend)
+@rota('/api/auditoria/<int:id>', 'DELETE')
+def excluir_auditoria(get_db, pedido, id):
+    try:
+        total = yield passo(get_db().excluir_auditoria_em_lote, [id])
+
+        if total == 0:
+            return {'erro': 'Registro não encontrado'}, 404
+
+        return {'mensagem': 'Registro de auditoria excluído'}, 200
+
+    except Exception as e:
+        print('Erro ao excluir auditoria:', e)
+        return {'erro': 'Erro ao excluir auditoria'}, 500
+
+
+# 🔹 DELETE EM LOTE
+@rota('/api/auditoria', 'DELETE')
+def excluir_auditoria_em_lote(get_db, pedido):
+    dados = pedido.json or {}
+    ids = dados.get('ids', [])
+
+    if not ids or not isinstance(ids, list):
+        return {'erro': 'Lista de IDs inválida'}, 400
+
+    total = yield passo(get_db().excluir_auditoria_em_lote, ids)
+
+    return {
+        'mensagem': 'Registros de auditoria excluídos com sucesso',
+        'total_excluidos': total
+    }, 200
@@ -0,0 +1,59 @@
+"""
+services/roteiros.py
+
+Execução do código que é o mesmo no modo WSGI e no ASGI.
+
+Um roteiro é um gerador que não faz I/O: cada `yield` entrega um passo
+(uma chamada sem argumentos, em geral um functools.partial ou um método
+como t.cur.fetchone) e recebe de volta o resultado dele. rodar chama os
+passos direto (Database, app.py); rodar_async espera os que devolvem
+corrotina (DatabaseAsync, asgi.py). Um erro no passo sobe dentro do
+roteiro, no ponto do yield, como numa chamada direta (inclusive o
+CancelledError de uma task cancelada).
+
+Assim as operações do Database (services/operacoes.py) e as rotas
+(services/rotas.py) são escritas uma vez, e cada modo só executa.
+"""
+
+import functools
+import inspect
+
+
+def rodar(roteiro):
+    resultado, erro = None, None
+    while True:
+        try:
+            passo = roteiro.send(resultado) if erro is None else roteiro.throw(erro)
+        except StopIteration as fim:
+            return fim.value
+        try:
+            resultado, erro = passo(), None
+        except BaseException as e:
+            resultado, erro = None, e
+
+
+async def rodar_async(roteiro):
+    resultado, erro = None, None
+    while True:
+        try:
+            passo = roteiro.send(resultado) if erro is None else roteiro.throw(erro)
+        except StopIteration as fim:
+            return fim.value
+        try:
+            resultado, erro = passo(), None
+            if inspect.isawaitable(resultado):
+                resultado = await resultado
+        except BaseException as e:
+            resultado, erro = None, e
+
+
+def roteiro(metodo):
+    """Método escrito como roteiro: roda pelo _rodar do objeto (resultado direto ou corrotina)."""
+    @functools.wraps(metodo)
+    def executar(self, *args, **kwargs):
+        return self._rodar(metodo(self, *args, **kwargs))
+    return executar
+
+
+def passo(funcao, *args, **kwargs):
+    return functools.partial(funcao, *args, **kwargs)
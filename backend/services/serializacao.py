@@ -0,0 +1,151 @@
+"""
+services/serializacao.py
+
+Serialização das linhas do banco para JSON (e CSV, nas exportações).
+
+Em vez de testar o tipo de cada valor de cada linha, o conversor de
+cada coluna é escolhido uma vez por consulta a partir de
+cursor.description (ou, na falta dela, do primeiro valor não nulo da
+coluna) e aplicado coluna a coluna. Datas e horas repetem muito (ex.:
+consultas.data/hora), então a formatação fica em cache.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from pymysql.constants import FIELD_TYPE
+
+from services.metricas import cronometrar
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+class Resultado(list):
+    """Lista de linhas que carrega a descrição das colunas do cursor."""
+
+    def __init__(self, linhas=(), descricao=None):
+        super().__init__(linhas)
+        self.descricao = descricao
+
+
+# ======================================================
+# FORMATADORES (mesmos formatos de sempre: dd/mm/aaaa)
+# ======================================================
+@lru_cache(maxsize=8192)
+def formatar_data(valor):
+    return f'{valor.day:02d}/{valor.month:02d}/{valor.year:04d}'
+
+
+def formatar_data_hora(valor):
+    return (f'{valor.day:02d}/{valor.month:02d}/{valor.year:04d} '
+            f'{valor.hour:02d}:{valor.minute:02d}:{valor.second:02d}')
+
+
+@lru_cache(maxsize=2048)
+def formatar_hora(valor):
+    return str(valor)
+
+
+def serializar(obj):
+    if isinstance(obj, timedelta):
+        return formatar_hora(obj)
+    if isinstance(obj, datetime):
+        return formatar_data_hora(obj)
+    if isinstance(obj, date):
+        return formatar_data(obj)
+    return obj
+
+
+_POR_TIPO_MYSQL = {
+    FIELD_TYPE.DATE: formatar_data,
+    FIELD_TYPE.NEWDATE: formatar_data,
+    FIELD_TYPE.DATETIME: formatar_data_hora,
+    FIELD_TYPE.TIMESTAMP: formatar_data_hora,
+    FIELD_TYPE.TIME: formatar_hora,
+}
+
+
+def _conversor_do_valor(valor):
+    if isinstance(valor, timedelta):
+        return formatar_hora
+    if isinstance(valor, datetime):
+        return formatar_data_hora
+    if isinstance(valor, date):
+        return formatar_data
+    return None
+
+
+# ======================================================
+# PLANO DE CONVERSÃO
+# ======================================================
+def conversores_da_descricao(descricao):
+    conversores = []
+    for coluna in descricao:
+        funcao = _POR_TIPO_MYSQL.get(coluna[1])
+        if funcao:
+            conversores.append((coluna[0], funcao))
+    return conversores
+
+
+def conversores_das_linhas(linhas):
+    # Sem descrição do cursor: decide pelo primeiro valor não nulo de cada coluna
+    pendentes = set(linhas[0])
+    conversores = []
+    for linha in linhas:
+        for chave in list(pendentes):
+            valor = linha[chave]
+            if valor is not None:
+                pendentes.discard(chave)
+                funcao = _conversor_do_valor(valor)
+                if funcao:
+                    conversores.append((chave, funcao))
+        if not pendentes:
+            break
+    return conversores
+
+
+@cronometrar('serializacao')
+def serializar_lista(lista, descricao=None):
+    if not lista:
+        return []
+    descricao = descricao or getattr(lista, 'descricao', None)
+    conversores = conversores_da_descricao(descricao) if descricao else conversores_das_linhas(lista)
+
+    # Cópias rasas: as linhas originais podem estar em cache
+    dados = [dict(item) for item in lista]
+    for chave, funcao in conversores:
+        for item in dados:
+            valor = item[chave]
+            if valor is not None:
+                item[chave] = funcao(valor)
+    return dados
+
+
+# ======================================================
+# CSV
+# ======================================================
+def csv_do_bloco(itens, cabecalho=False):
+    """Linhas já serializadas em CSV (bytes), com o cabeçalho das chaves se pedido."""
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    if cabecalho and itens:
+        escritor.writerow(itens[0].keys())
+    escritor.writerows(item.values() for item in itens)
+    return saida.getvalue().encode('utf-8')
+
+
+# ======================================================
+# JSON
+# ======================================================
+@cronometrar('json')
+def dumps_json(dados):
+    """Serializa para bytes com orjson quando disponível (chaves ordenadas, como o jsonify)."""
+    if orjson is not None:
+        return orjson.dumps(dados, default=str, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(dados, default=str, sort_keys=True, separators=(',', ':')).encode()
@@ -0,0 +1,96 @@
+"""
+tests/conftest.py
+
+Conexão falsa para testar pool, roteamento e migrações sem MySQL: só o
+que o ConnectionPool, o Database e services/migracoes.py usam (cursor,
+ping, commit, rollback, close).
+"""
+
+import pytest
+from pymysql.err import OperationalError
+
+
+class CursorFalso:
+    description = (('id', 3, None, 11, 11, 0, False),)
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self._pendentes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conexao.erro is not None:
+            raise self.conexao.erro
+        self.conexao.executadas.append(sql)
+        linhas = self.conexao.linhas
+        for trecho, resposta in self.conexao.respostas.items():
+            if trecho in sql:
+                if isinstance(resposta, Exception):
+                    raise resposta
+                linhas = resposta
+                break
+        self._pendentes = list(linhas)
+        return len(self._pendentes)
+
+    def fetchone(self):
+        return self._pendentes.pop(0) if self._pendentes else None
+
+    def fetchall(self):
+        linhas, self._pendentes = self._pendentes, []
+        return linhas
+
+    def fetchmany(self, tamanho):
+        linhas, self._pendentes = self._pendentes[:tamanho], self._pendentes[tamanho:]
+        return linhas
+
+    def close(self):
+        pass
+
+
+class ConexaoFalsa:
+    def __init__(self, nome='', linhas=(), erro=None, respostas=None):
+        self.nome = nome
+        self.linhas = list(linhas)
+        self.erro = erro
+        # Trecho do SQL → linhas (ou exceção) só daquele comando; o resto recebe `linhas`
+        self.respostas = dict(respostas or {})
+        self.server_status = 0   # fora de transação
+        self.executadas = []
+        self.fechada = False
+        self.pings = 0
+        self.commits = 0
+
+    def cursor(self, classe=None):
+        return CursorFalso(self)
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.fechada:
+            raise OperationalError(2006, 'MySQL server has gone away')
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def fabrica():
+    """fabrica(nome, linhas, erro, respostas) → função de conexão para o ConnectionPool; .criadas guarda as abertas."""
+    def criar(nome='', linhas=(), erro=None, respostas=None):
+        def abrir():
+            conexao = ConexaoFalsa(nome, linhas, erro, respostas)
+            abrir.criadas.append(conexao)
+            return conexao
+        abrir.criadas = []
+        return abrir
+    return criar
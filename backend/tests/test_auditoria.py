@@ -0,0 +1,280 @@
+import asyncio
+import sys
+import types
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+
+import pytest
+from pymysql.err import OperationalError
+
+from services import comandos, roteiros
+from services.arquivo_auditoria import ArquivoAuditoria
+from services.auditoria import AuditoriaWriter
+from services.db import Database, Transacao
+from services.operacoes import Operacoes
+from services import retencao
+from services.retencao import expurgar_auditoria
+
+
+def registro(id, usuario, data_hora=datetime(2024, 3, 10, 12, 0)):
+    return {'id': id, 'data_hora': data_hora, 'usuario': usuario, 'modulo': 'Pacientes',
+            'acao': 'INSERT', 'detalhes': f'registro {id}'}
+
+
+# ======================================================
+# FILTRO POR USUÁRIO
+# ======================================================
+def test_usuario_filtra_por_prefixo_no_indice():
+    sql, params = comandos.sql_auditoria(usuario='ana')
+    assert 'usuario LIKE %s' in sql
+    assert params == ['ana%']
+
+
+def test_usuario_escapa_curingas_do_like():
+    _, params = comandos.sql_auditoria(usuario='a_b%c')
+    assert params == ['a\\_b\\%c%']
+
+
+def test_arquivo_filtra_usuario_como_o_sql(tmp_path):
+    arquivo = ArquivoAuditoria(str(tmp_path))
+    arquivo.gravar([registro(1, 'Ana Paula'), registro(2, 'Sistema'), registro(3, 'ANDRÉ'),
+                    registro(4, 'Joana', datetime(2024, 4, 1))])
+
+    assert {r['id'] for r in arquivo.buscar(10, usuario='an')} == {1, 3}
+    assert [r['id'] for r in arquivo.buscar(10, usuario='andre')] == [3]
+    assert arquivo.buscar(10, usuario='paula') == []
+
+
+def test_arquivo_descarta_meses_sem_usuario_com_o_prefixo(tmp_path):
+    arquivo = ArquivoAuditoria(str(tmp_path))
+    arquivo.gravar([registro(1, 'Ana Paula'), registro(2, 'Joana', datetime(2024, 4, 1))])
+
+    assert arquivo.particoes(usuario='jo') == ['2024-04']
+    assert arquivo.particoes(usuario='ANA') == ['2024-03']
+    assert arquivo.particoes() == ['2024-04', '2024-03']
+
+
+def test_arquivo_pagina_sem_descompactar_o_mes_de_novo(tmp_path, monkeypatch):
+    from services import arquivo_auditoria
+    arquivo = ArquivoAuditoria(str(tmp_path))
+    arquivo.gravar([registro(i, 'Ana', datetime(2024, 3, 1 + i % 20, 8, 0)) for i in range(1, 41)])
+    aberturas = []
+    abrir = arquivo_auditoria.gzip.open
+    monkeypatch.setattr(arquivo_auditoria.gzip, 'open', lambda *a, **k: aberturas.append(a[0]) or abrir(*a, **k))
+
+    paginas, antes_de = [], None
+    while True:
+        pagina = arquivo.buscar(7, antes_de)
+        if not pagina:
+            break
+        paginas.extend(pagina)
+        antes_de = (pagina[-1]['data_hora'], pagina[-1]['id'])
+
+    chaves = [(r['data_hora'], r['id']) for r in paginas]
+    assert chaves == sorted(chaves, reverse=True) and len(chaves) == 40
+    assert len(aberturas) == 1
+    assert [r['id'] for r in arquivo.buscar(3, data_inicio=datetime(2024, 3, 20))] == [39, 19]
+
+    # Uma gravação nova no mês invalida o que estava em memória
+    arquivo.gravar([registro(41, 'Ana', datetime(2024, 3, 30))])
+    assert arquivo.buscar(1)[0]['id'] == 41
+    assert len(aberturas) == 2
+
+
+# ======================================================
+# EXCLUSÃO EM BLOCOS E RETENÇÃO
+# ======================================================
+class CursorAuditoria:
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.rowcount = 0
+        self._linhas = []
+
+    def execute(self, sql, params):
+        if sql.startswith('DELETE'):
+            if self.tabela.falhar_no_bloco == len(self.tabela.commits) + 1:
+                raise OperationalError(1205, 'Lock wait timeout exceeded')
+            antes = len(self.tabela.registros)
+            self.tabela.registros = [r for r in self.tabela.registros if r['id'] not in params]
+            self.rowcount = antes - len(self.tabela.registros)
+        else:
+            antes_de, limite = params
+            expirados = sorted((r for r in self.tabela.registros if r['data_hora'] < antes_de),
+                               key=lambda r: (r['data_hora'], r['id']))
+            self._linhas = expirados[:limite]
+
+    def fetchall(self):
+        return self._linhas
+
+
+class TabelaAuditoria(Operacoes):
+    """Tabela auditoria em memória; cada transação confirmada vai para `commits` com os contadores."""
+    _rodar = staticmethod(roteiros.rodar)
+    _escrever = Database._escrever
+
+    def __init__(self, registros, falhar_no_bloco=None):
+        self.registros = list(registros)
+        self.falhar_no_bloco = falhar_no_bloco
+        self.commits = []
+
+    @contextmanager
+    def _transacao(self):
+        t = Transacao(None)
+        t.cur = CursorAuditoria(self)
+        yield t
+        self.commits.append(t.contadores)
+
+
+def test_blocos_de_exclusao_sem_repeticao_e_em_ordem():
+    blocos = list(comandos.blocos_exclusao_auditoria(['5', 3, 'x', 1, 3, '-2', 4], tamanho=2))
+    assert blocos == [('DELETE FROM auditoria WHERE id IN (%s,%s)', [1, 3]),
+                      ('DELETE FROM auditoria WHERE id IN (%s,%s)', [4, 5])]
+    assert list(comandos.blocos_exclusao_auditoria([])) == []
+    _, ids = next(comandos.blocos_exclusao_auditoria(range(1200)))
+    assert len(ids) == comandos.TAMANHO_BLOCO_EXCLUSAO
+
+
+def test_exclusao_em_lote_confirma_um_bloco_por_transacao():
+    tabela = TabelaAuditoria(registro(i, 'Ana') for i in range(1, 8))
+    assert tabela.excluir_auditoria_em_lote([7, 1, 2, 3, 99], bloco=2) == 4
+    assert [r['id'] for r in tabela.registros] == [4, 5, 6]
+    assert tabela.commits == [{'auditoria': -2}, {'auditoria': -2}, {'auditoria': 0}]
+
+
+def test_exclusao_em_lote_mantem_os_blocos_ja_confirmados():
+    tabela = TabelaAuditoria((registro(i, 'Ana') for i in range(1, 6)), falhar_no_bloco=2)
+    assert tabela.excluir_auditoria_em_lote([1, 2, 3, 4, 5], bloco=2) == 2
+    assert [r['id'] for r in tabela.registros] == [3, 4, 5]
+
+
+def test_retencao_expurga_do_mais_antigo_em_lotes(tmp_path):
+    registros = [registro(i, 'Ana', datetime(2024, 1 + i % 3, 1 + i)) for i in range(1, 8)]
+    registros.append(registro(8, 'Ana', datetime(2024, 6, 1)))
+    tabela = TabelaAuditoria(registros)
+
+    assert expurgar_auditoria(tabela, datetime(2024, 5, 1), lote=3, pausa=0, diretorio=str(tmp_path)) == 7
+    assert [r['id'] for r in tabela.registros] == [8]
+    assert tabela.commits == [{'auditoria': -3}, {'auditoria': -3}, {'auditoria': -1}]
+    # O que saiu da tabela está no arquivo que o /api/auditoria lê
+    arquivados = ArquivoAuditoria(str(tmp_path)).buscar(10)
+    assert sorted(r['id'] for r in arquivados) == list(range(1, 8))
+
+
+def test_retencao_sem_expirados_nao_apaga_nada():
+    tabela = TabelaAuditoria([registro(1, 'Ana', datetime(2024, 6, 1))])
+    assert expurgar_auditoria(tabela, datetime(2024, 5, 1), pausa=0) == 0
+    # Uma única transação, só com o SELECT
+    assert len(tabela.registros) == 1 and tabela.commits == [{}]
+
+
+
+@pytest.mark.parametrize('argumentos', [['--simular'], [], ['--lote', '1']])
+def test_retencao_fecha_o_banco_em_todos_os_caminhos(monkeypatch, argumentos):
+    tabela = TabelaAuditoria([registro(1, 'Ana', datetime(2000, 1, 1))])
+    tabela._buscar = lambda sql, params: [{'total': 1}]
+    tabela.registrar_auditoria = lambda *evento: None
+    fechados = []
+    tabela.fechar = lambda: fechados.append(tabela)
+    monkeypatch.setitem(sys.modules, 'app', types.SimpleNamespace(criar_database=lambda: tabela))
+    monkeypatch.setattr('sys.argv', ['retencao', '--dias', '30', '--pausa', '0', *argumentos])
+    monkeypatch.delenv('AUDITORIA_ARQUIVO', raising=False)
+    retencao.main()
+    assert fechados == [tabela]
+    assert len(tabela.registros) == (1 if '--simular' in argumentos else 0)
+
+
+# ======================================================
+# GRAVADOR EM LOTE (thread no WSGI, task no ASGI)
+# ======================================================
+class ConexaoGravada:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def executemany(self, sql, linhas):
+        if 'INSERT INTO auditoria' in sql:
+            self.pool.lotes.append(list(linhas))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class PoolGravado:
+    def __init__(self):
+        self.lotes = []
+
+    @contextmanager
+    def conexao(self):
+        yield ConexaoGravada(self)
+
+
+class ConexaoGravadaAsync(ConexaoGravada):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *erro):
+        return False
+
+    async def executemany(self, sql, linhas):
+        ConexaoGravada.executemany(self, sql, linhas)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class PoolGravadoAsync(PoolGravado):
+    @asynccontextmanager
+    async def acquire(self):
+        yield ConexaoGravadaAsync(self)
+
+
+def test_gravador_junta_em_lotes_e_descarrega_ao_fechar():
+    pool = PoolGravado()
+    gravador = AuditoriaWriter(pool, lote=2, intervalo=5)
+    gravador.enfileirar(list(range(5)))
+    gravador.fechar()
+    assert sorted(i for lote in pool.lotes for i in lote) == [0, 1, 2, 3, 4]
+    assert all(len(lote) <= 2 for lote in pool.lotes)
+    assert gravador.estatisticas()['gravados'] == 5 and gravador.pendentes() == 0
+    # Depois de fechado, grava direto
+    gravador.registrar([5])
+    assert pool.lotes[-1] == [5]
+
+
+def test_gravador_async_tem_as_mesmas_regras():
+    db_async = pytest.importorskip('services.db_async')
+
+    async def cenario():
+        pool = PoolGravadoAsync()
+        gravador = db_async.AuditoriaAsync(pool, lote=2, intervalo=5)
+        await gravador.enfileirar(list(range(5)))
+        await gravador.fechar()
+        await gravador.registrar([5])
+
+        # Fila de um lugar e flush parado: o que não cabe a tempo vai direto
+        cheio = PoolGravadoAsync()
+        travado = db_async.AuditoriaAsync(cheio, capacidade=1, espera_maxima=0.01)
+        travado._iniciar = lambda: None
+        await travado.enfileirar([0, 1, 2])
+        return pool.lotes, gravador.estatisticas(), cheio.lotes, travado.estatisticas()
+
+    lotes, estatisticas, diretos, travado = asyncio.run(cenario())
+    assert sorted(i for lote in lotes[:-1] for i in lote) == [0, 1, 2, 3, 4] and lotes[-1] == [5]
+    assert all(len(lote) <= 2 for lote in lotes)
+    assert estatisticas['gravados'] == 6 and estatisticas['pendentes'] == 0
+    assert diretos == [[1, 2]]
+    assert (travado['pendentes'], travado['gravacoes_diretas']) == (1, 1)
@@ -0,0 +1,116 @@
+import random
+from datetime import datetime
+
+from benchmarks.bench_autocomplete import gerar_pacientes, referencia
+from services import autocomplete
+from services.autocomplete import IndiceAutocomplete
+from services.busca import normalizar_texto
+
+MARCA = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def linha(paciente_id, nome, cpf=None):
+    return {'id': paciente_id, 'nome': nome, 'nome_busca': normalizar_texto(nome), 'cpf_digitos': cpf}
+
+
+def carregado(*linhas):
+    indice = IndiceAutocomplete()
+    indice.iniciar_carga()
+    indice.concluir_carga(list(linhas), MARCA)
+    return indice
+
+
+def ids(indice, termo, limite=10):
+    return [p['id'] for p in indice.buscar(termo, limite)]
+
+
+def test_nome_sobrenome_e_cpf():
+    indice = carregado(linha(1, 'Maria da Silva', '52998224725'), linha(2, 'José Silveira'),
+                       linha(3, 'Márcio Souza', '11144477735'))
+    assert ids(indice, 'mar') == [3, 1]          # ordem alfabética: "marcio" antes de "maria"
+    assert ids(indice, 'Silv') == [1, 2]
+    assert ids(indice, 'da') == []               # palavra curta não vira chave de sobrenome
+    assert indice.buscar('529.982') == [{'id': 1, 'nome': 'Maria da Silva', 'cpf': '529.982.247-25'}]
+    assert indice.buscar('', 10) == []
+
+
+def test_comeco_do_nome_vem_antes_do_sobrenome():
+    indice = carregado(linha(1, 'Ana Souza'), linha(2, 'Souza Lima'))
+    assert ids(indice, 'souza') == [2, 1]
+    assert ids(indice, 'souza', limite=1) == [2]
+
+
+def test_escritas_depois_do_commit():
+    indice = carregado(linha(1, 'Maria Silva', '52998224725'))
+    indice.inserir(2, 'Mariana Costa', '111.444.777-35')
+    indice.atualizar(1, 'Beatriz Silva', None)
+    assert ids(indice, 'mari') == [2]
+    assert ids(indice, 'silva') == [1]
+    assert ids(indice, '529') == []
+    indice.remover(2)
+    assert ids(indice, 'mari') == [] and ids(indice, '111') == []
+    assert len(indice) == 1
+
+
+def test_escrita_durante_a_carga_entra_por_cima_da_leitura():
+    indice = IndiceAutocomplete()
+    indice.iniciar_carga()
+    indice.inserir(3, 'Paciente Novo', None)
+    indice.remover(1)
+    # A leitura do banco ainda via o paciente 1 e não via o 3
+    indice.concluir_carga([linha(1, 'Paciente Antigo'), linha(2, 'Outro Paciente')], MARCA)
+    assert [p for p, _, _ in indice.pacientes()] == [2, 3]
+
+
+def test_atualizacao_incremental():
+    indice = carregado(linha(1, 'Maria Silva'), linha(2, 'João Souza'))
+    indice.inserir(3, 'Pedro Lima', None)     # escrita deste processo, que a atualização também traz
+    assert not indice.precisa_carga_completa()
+    assert indice.iniciar_carga()
+    indice.concluir_atualizacao([linha(2, 'João Souza Neto'), linha(3, 'Pedro Lima'), linha(4, 'Ana Lima')],
+                                [1], datetime(2026, 1, 1, 12, 0, 10))
+    assert [p for p, _, _ in indice.pacientes()] == [2, 3, 4]
+    assert ids(indice, 'neto') == [2]
+    assert ids(indice, 'lima') == [3, 4]      # mesma chave: ordem de id
+    assert indice.desde() == datetime(2026, 1, 1, 12, 0, 5)
+    assert indice.estatisticas()['atualizacoes'] == 1
+
+
+def test_importacao_pede_carga_completa():
+    indice = carregado(linha(1, 'Maria Silva'))
+    indice.expirar()
+    assert indice.precisa_atualizar() and indice.precisa_carga_completa()
+
+
+def test_falha_na_carga_espera_antes_de_tentar_de_novo():
+    indice = IndiceAutocomplete()
+    assert indice.precisa_atualizar() and indice.iniciar_carga()
+    assert not indice.iniciar_carga()
+    indice.cancelar_carga()
+    assert not indice.precisa_atualizar() and not indice.pronto
+
+
+def test_compactacao_mantem_as_buscas(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'COMPACTAR_ACIMA', 0)
+    indice = carregado(*(linha(i, f'Paciente {i:03d} Silva') for i in range(1, 101)))
+    for i in range(1, 80):
+        indice.atualizar(i, f'Outro {i:03d} Souza', None)
+    indice.remover(100)
+    estatisticas = indice.estatisticas()
+    assert estatisticas['bytes_descartados'] * 2 <= estatisticas['bytes']
+    assert ids(indice, 'outro 07') == list(range(70, 80))
+    assert ids(indice, 'silva', limite=100) == list(range(80, 100))
+    assert ids(indice, 'souza', limite=100) == list(range(1, 80))
+
+
+def test_concorda_com_varredura_linear():
+    rnd = random.Random(7)
+    linhas = gerar_pacientes(rnd, 2000)
+    indice = carregado(*linhas)
+    for paciente_id in range(1, 2000, 3):
+        indice.remover(paciente_id)
+    for paciente_id in range(2, 600, 5):
+        indice.atualizar(paciente_id, linhas[rnd.randrange(2000)]['nome'], linhas[rnd.randrange(2000)]['cpf_digitos'])
+    pacientes = {i: (nome, cpf) for i, nome, cpf in indice.pacientes()}
+    for termo in ['m', 'Mar', 'jo', 'silva', 'Conceição', 'sa', 'dos', '1', '12', '123.4', 'xyz']:
+        assert ids(indice, termo) == referencia(pacientes, termo, 10), termo
@@ -0,0 +1,47 @@
+from services import comandos
+from services.busca import filtro_nome, normalizar_texto
+
+
+def test_normalizar_texto_tira_acentos_e_pontuacao():
+    assert normalizar_texto('  João, da SILVA ') == 'joao da silva'
+    assert normalizar_texto(None) == ''
+
+
+def test_termo_longo_vira_prefixo_no_fulltext():
+    condicoes, params, relevancia = filtro_nome('nome_busca', 'Médico Chefe')
+    assert condicoes == ['MATCH(nome_busca) AGAINST (%s IN BOOLEAN MODE)']
+    assert params == ['+medico* +chefe*']
+    assert relevancia is not None
+
+
+def test_termo_curto_vira_prefixo_no_indice_btree():
+    condicoes, params, _ = filtro_nome('nome_busca', 'ti')
+    assert condicoes == ['nome_busca LIKE %s']
+    assert params == ['ti%']
+
+
+# ======================================================
+# CARGOS
+# ======================================================
+def test_cargos_sem_like_com_curinga_no_inicio():
+    for nome in ('enfermeiro', 'ti'):
+        sql, params = comandos.sql_cargos(nome)
+        assert 'nome_busca' in sql
+        assert not any(str(p).startswith('%') for p in params)
+
+
+def test_cargos_termo_curto_entre_longos_so_refina_o_fulltext():
+    sql, params = comandos.sql_cargos('Auxiliar de enfermagem')
+    assert sql.index('MATCH(nome_busca)') < sql.index('LIKE')
+    assert params[0] == '+auxiliar* +enfermagem*'
+
+
+def test_cargos_sem_filtro_lista_tudo():
+    sql, params = comandos.sql_cargos('')
+    assert 'WHERE' not in sql
+    assert params == []
+
+
+def test_valores_cargo_grava_nome_normalizado():
+    assert comandos.valores_cargo('Técnico de Enfermagem', 3000, 'x') == (
+        'Técnico de Enfermagem', 3000, 'x', 'tecnico de enfermagem')
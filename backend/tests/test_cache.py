@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from services.cache import AUSENTE, TTL_MEMORIA, CacheLRU, criar_cache
+from services.contadores import CacheTTL
+
+
+def test_guarda_e_le():
+    cache = CacheLRU()
+    geracao = cache.reservar('paciente:1')
+    cache.guardar('paciente:1', {'nome': 'Ana'}, geracao=geracao)
+    assert cache.obter('paciente:1') == {'nome': 'Ana'}
+
+
+def test_leitura_anterior_a_invalidacao_nao_fica_no_cache():
+    cache = CacheLRU()
+    # Leitor: não achou no cache e foi ao banco (leu a linha antiga)
+    geracao = cache.reservar('paciente:1')
+    antigo = {'nome': 'Ana'}
+    # Escritor: COMMIT e invalidação enquanto o leitor ainda não guardou
+    cache.invalidar('paciente:1')
+    cache.guardar('paciente:1', antigo, geracao=geracao)
+
+    assert cache.obter('paciente:1') is AUSENTE
+    assert cache.estatisticas()['descartes'] == 1
+
+
+def test_invalidacao_por_prefixo_tambem_muda_a_geracao():
+    cache = CacheLRU()
+    geracao = cache.reservar('cargos:')
+    cache.invalidar_prefixo('cargos:')
+    cache.guardar('cargos:', ['velho'], geracao=geracao)
+    assert cache.obter('cargos:') is AUSENTE
+
+
+def test_leitura_depois_da_invalidacao_entra_no_cache():
+    cache = CacheLRU()
+    cache.invalidar('paciente:1')
+    geracao = cache.reservar('paciente:1')
+    cache.guardar('paciente:1', {'nome': 'Ana Paula'}, geracao=geracao)
+    assert cache.obter('paciente:1') == {'nome': 'Ana Paula'}
+
+
+def test_leitor_e_escritor_concorrentes_nunca_deixam_valor_velho():
+    cache = CacheLRU()
+    banco = {'valor': 0}
+    pronto_para_ler = threading.Event()
+    commit_feito = threading.Event()
+
+    def leitor():
+        geracao = cache.reservar('k')
+        lido = banco['valor']
+        pronto_para_ler.set()
+        commit_feito.wait()
+        cache.guardar('k', lido, geracao=geracao)
+
+    thread = threading.Thread(target=leitor)
+    thread.start()
+    pronto_para_ler.wait()
+    banco['valor'] = 1
+    cache.invalidar('k')
+    commit_feito.set()
+    thread.join()
+
+    assert cache.obter('k') in (AUSENTE, 1)
+
+
+def test_ttl_padrao_do_lru_e_curto():
+    assert criar_cache('memoria').ttl == TTL_MEMORIA
+    assert criar_cache('memoria', ttl=120).ttl == 120
+
+
+def test_lru_expulsa_o_menos_usado():
+    cache = CacheLRU(max_itens=2)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    cache.obter('a')
+    cache.guardar('c', 3)
+    assert cache.obter('b') is AUSENTE
+    assert cache.obter('a') == 1
+
+
+def test_totais_com_ttl_nos_dois_modos():
+    cache = CacheTTL(60)
+    leituras = []
+
+    def carregar():
+        leituras.append(1)
+        return {'pacientes': len(leituras)}
+
+    async def carregar_async():
+        return carregar()
+
+    assert cache.obter(carregar) == {'pacientes': 1}
+    # O obter_async vê o mesmo valor e a mesma invalidação do obter
+    assert asyncio.run(cache.obter_async(carregar_async)) == {'pacientes': 1}
+    cache.invalidar()
+    assert asyncio.run(cache.obter_async(carregar_async)) == {'pacientes': 2}
+    assert cache.obter(carregar) == {'pacientes': 2} and len(leituras) == 2
@@ -0,0 +1,79 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from pymysql.err import IntegrityError
+
+from services import comandos, parametros
+
+
+def test_filtro_de_nome_vai_pelo_fulltext_do_paciente():
+    sql, params = comandos.sql_consultas(limite=101, nome='Maria Conceição')
+    assert 'MATCH(p.nome_busca) AGAINST (%s IN BOOLEAN MODE)' in sql
+    assert params == ['+maria* +conceicao*', 101]
+
+
+def test_filtro_de_especialidade_e_prefixo_sem_curinga_no_inicio():
+    sql, params = comandos.sql_consultas(consulta='Cardio_')
+    assert 'c.consulta LIKE %s' in sql
+    assert params == ['Cardio\\_%']
+
+
+def test_parametros_de_consultas_leem_nome_e_consulta():
+    filtros = parametros.filtros_consultas({'nome': ' ana ', 'consulta': '', 'data_inicio': '2025-01-02'})
+    assert filtros['nome'] == 'ana'
+    assert filtros['consulta'] is None
+    assert filtros['data_inicio'] == date(2025, 1, 2)
+
+
+def test_horario_ocupado_so_no_indice_de_horario():
+    assert comandos.horario_ocupado(IntegrityError(1062, "Duplicate entry 'x' for key 'consultas.uk_consultas_horario'"))
+    assert not comandos.horario_ocupado(IntegrityError(1062, "Duplicate entry 'x' for key 'pacientes.cpf_digitos'"))
+    assert not comandos.horario_ocupado(IntegrityError(1452, 'Cannot add or update a child row: uk_consultas_horario'))
+    assert not comandos.horario_ocupado(IntegrityError())
+
+
+def test_disponibilidade_monta_a_grade_do_periodo():
+    agora = datetime(2026, 1, 5, 10, 0)
+    sql, params = comandos.sql_disponibilidade('Cardiologia', date(2026, 1, 5), date(2026, 1, 6),
+                                               inicio=timedelta(hours=9), fim=timedelta(hours=12), intervalo=20,
+                                               agora=agora)
+    assert 'c.slot_ativo IS NOT NULL' in sql and 'TIMESTAMP(d.dia, h.hora) > %s' in sql
+    assert params == [date(2026, 1, 5), date(2026, 1, 6), '9:00:00', 1200, 1200, '12:00:00', 'Cardiologia', agora]
+    # Sem "agora", nenhum horário do período é descartado por já ter passado
+    sql, params = comandos.sql_disponibilidade('Cardiologia', date(2026, 1, 5), date(2026, 1, 5))
+    assert 'TIMESTAMP(d.dia, h.hora)' not in sql
+    assert params[-1] == 'Cardiologia' and sql.count('%s') == len(params)
+
+
+@pytest.mark.parametrize('periodo, grade', [
+    ((date(2026, 1, 6), date(2026, 1, 5)), {}),
+    ((date(2026, 1, 1), date(2026, 2, 1)), {}),
+    ((date(2026, 1, 5), date(2026, 1, 5)), {'intervalo': 4}),
+    ((date(2026, 1, 5), date(2026, 1, 5)), {'intervalo': 241}),
+    ((date(2026, 1, 5), date(2026, 1, 5)), {'inicio': timedelta(hours=18), 'fim': timedelta(hours=8)}),
+])
+def test_disponibilidade_recusa_grade_invalida(periodo, grade):
+    with pytest.raises(ValueError):
+        comandos.sql_disponibilidade('Cardiologia', *periodo, **grade)
+
+
+def test_disponibilidade_agrupa_por_dia_com_dias_lotados():
+    linhas = [{'data': date(2026, 1, 5), 'hora': timedelta(hours=8)},
+              {'data': date(2026, 1, 5), 'hora': timedelta(hours=13, minutes=30)},
+              {'data': date(2026, 1, 7), 'hora': timedelta(hours=9)}]
+    dias = comandos.montar_disponibilidade(linhas, date(2026, 1, 5), date(2026, 1, 7))
+    assert dias == [{'data': date(2026, 1, 5), 'horarios': ['08:00', '13:30']},
+                    {'data': date(2026, 1, 6), 'horarios': []},
+                    {'data': date(2026, 1, 7), 'horarios': ['09:00']}]
+    resposta = parametros.resposta_disponibilidade('Cardiologia', dias)
+    assert resposta['total'] == 3 and resposta['dias'][1] == {'data': '06/01/2026', 'horarios': []}
+
+
+def test_parametros_de_disponibilidade():
+    consulta, inicio, fim, grade = parametros.filtros_disponibilidade(
+        {'consulta': ' Cardiologia ', 'data_inicio': '2026-01-05', 'inicio': '09:00', 'intervalo': '15'})
+    assert (consulta, inicio, fim) == ('Cardiologia', date(2026, 1, 5), date(2026, 1, 11))
+    assert grade == {'inicio': timedelta(hours=9), 'intervalo': 15}
+    for args in ({}, {'consulta': 'X', 'intervalo': '-5'}, {'consulta': 'X', 'fim': '25:00'}):
+        with pytest.raises(ValueError):
+            parametros.filtros_disponibilidade(args)
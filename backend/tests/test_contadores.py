@@ -0,0 +1,21 @@
+import random
+
+from services import contadores
+
+
+def test_incrementos_saem_em_ordem_de_chave_e_fatia():
+    random.seed(3)
+    for _ in range(50):
+        ida = contadores.linhas_incremento({'consultas:Agendada': -1, 'consultas:Cancelada': 1, 'auditoria': 0})
+        volta = contadores.linhas_incremento({'consultas:Cancelada': -1, 'consultas:Agendada': 1})
+        assert [linha[0] for linha in ida] == [linha[0] for linha in volta] == ['consultas:Agendada',
+                                                                                 'consultas:Cancelada']
+        assert ida == sorted(ida) and volta == sorted(volta)
+        assert all(0 <= fatia < contadores.FATIAS for _, fatia, _ in ida)
+
+
+def test_totais_somam_as_fatias_por_status():
+    counts = contadores.montar_counts([{'chave': 'pacientes', 'total': 3}, {'chave': 'consultas:Agendada', 'total': 2},
+                                       {'chave': 'consultas:Cancelada', 'total': None}])
+    assert counts['pacientes'] == 3 and counts['consultas'] == {'Agendada': 2, 'Cancelada': 0}
+    assert counts['consultas_total'] == 2
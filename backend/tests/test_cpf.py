@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from services import busca, comandos, cpf
+
+SEMENTES = range(5)
+# Abaixo, no limite e acima do LOTE_MINIMO: os dois caminhos do validar_lote
+TAMANHOS = (0, 1, cpf.LOTE_MINIMO - 1, cpf.LOTE_MINIMO, cpf.LOTE_MINIMO + 1, 3000)
+
+
+def cpf_valido(rnd):
+    base = [rnd.randrange(10) for _ in range(9)]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        base.append(sum(d * p for d, p in zip(base, pesos)) * 10 % 11 % 10)
+    return ''.join(map(str, base))
+
+
+def pontuado(numero, rnd):
+    separadores = rnd.choice([('.', '.', '-'), (' ', ' ', ' '), ('', '', '-'), ('/', '.', '')])
+    return (f'{numero[:3]}{separadores[0]}{numero[3:6]}{separadores[1]}{numero[6:9]}{separadores[2]}'
+            f'{numero[9:]}')
+
+
+def gerar(rnd):
+    numero = cpf_valido(rnd)
+    tipo = rnd.randrange(12)
+    if tipo == 0:
+        return pontuado(numero, rnd)
+    if tipo == 1:
+        # Um dígito trocado
+        i = rnd.randrange(11)
+        return numero[:i] + str((int(numero[i]) + rnd.randrange(1, 10)) % 10) + numero[i + 1:]
+    if tipo == 2:
+        # Sequência repetida: os dígitos verificadores batem, mas não é CPF
+        repetido = str(rnd.randrange(10)) * 11
+        return pontuado(repetido, rnd) if rnd.random() < 0.5 else repetido
+    if tipo == 3:
+        return numero[:rnd.randrange(11)]
+    if tipo == 4:
+        return numero + str(rnd.randrange(10)) * rnd.randrange(1, 4)
+    if tipo == 5:
+        return f'  {pontuado(numero, rnd)}\t'
+    if tipo == 6:
+        return ''.join(rnd.choice('0123456789.-/ abcxç') for _ in range(rnd.randrange(0, 24)))
+    if tipo == 7:
+        return rnd.choice(['', None, '   ', '...-', 0, 12345678909])
+    if tipo == 8:
+        # Dígitos que não são ASCII não contam, como no cpf_digitos do banco
+        return numero.translate(str.maketrans('0123456789', '０１２３４５６７８９'))
+    if tipo == 9:
+        return numero[:5] + '٣' + numero[5:]
+    return numero
+
+
+@pytest.mark.parametrize('semente', SEMENTES)
+@pytest.mark.parametrize('tamanho', TAMANHOS)
+def test_lote_concorda_com_um_por_vez(semente, tamanho):
+    rnd = random.Random(semente * 1000 + tamanho)
+    valores = [gerar(rnd) for _ in range(tamanho)]
+    assert cpf.validar_lote(valores) == [cpf.validar(v) for v in valores]
+
+
+@pytest.mark.parametrize('semente', SEMENTES)
+def test_vetorizado_concorda_com_um_por_vez(semente):
+    pytest.importorskip('numpy')
+    rnd = random.Random(semente)
+    valores = [gerar(rnd) for _ in range(500)]
+    assert cpf._validar_vetorizado(valores).tolist() == [cpf.validar(v) for v in valores]
+
+
+def test_casos_conhecidos():
+    rnd = random.Random(0)
+    numero = cpf_valido(rnd)
+    assert cpf.validar(numero) and cpf.validar(f'{numero[:3]}.{numero[3:6]}.{numero[6:9]}-{numero[9:]}')
+    for invalido in ('111.111.111-11', '00000000000', numero[:10], numero + '0', '', None,
+                     numero.replace(numero[0], 'x', 1)):
+        assert not cpf.validar(invalido)
+        assert cpf.validar_lote([invalido] * cpf.LOTE_MINIMO) == [False] * cpf.LOTE_MINIMO
+
+
+def test_lote_aceita_iteravel_e_mantem_a_ordem():
+    rnd = random.Random(1)
+    valores = [cpf_valido(rnd) if i % 3 else '123' for i in range(cpf.LOTE_MINIMO * 2)]
+    assert cpf.validar_lote(iter(valores)) == [bool(i % 3) for i in range(cpf.LOTE_MINIMO * 2)]
+
+
+def test_digitos():
+    assert cpf.digitos(' 123.456.789-09 ') == '12345678909'
+    assert cpf.digitos(None) == ''
+
+
+def test_digitos_nao_ascii_ficam_de_fora_em_todo_lugar():
+    # '٣' é o 3 arábico: \d aceitaria, cpf_digitos não
+    formatado = '529.982.247-25٣'
+    assert cpf.digitos(formatado) == '52998224725' and cpf.validar(formatado)
+    (_, valores), = comandos.validar_importacao([{'nome': 'Ana', 'cpf': formatado}])[0]
+    assert valores[6] == '52998224725'
+    assert comandos.valores_paciente('Ana', formatado, None, None, None)[6] == '52998224725'
+    assert comandos.valores_funcionario('Ana', None, None, formatado, None, None, 1)[8] == '52998224725'
+    assert busca.filtro_cpf('cpf_digitos', '529٣')[1] == ['529%']
+    assert not busca.parece_cpf('٣٣٣')
@@ -0,0 +1,61 @@
+import pytest
+
+from services import eventos
+from services.eventos import Barramento, BarramentoCheio
+
+
+def test_assinante_recebe_so_os_eventos_da_propria_clinica():
+    barramento = Barramento()
+    a, b = barramento.assinar(tenant='a'), barramento.assinar(tenant='b')
+    barramento.publicar('mudanca', {'entidade': 'pacientes'}, tenant='a')
+    assert [tipo for _, tipo, _ in a.aguardar(0)] == ['mudanca']
+    assert b.aguardar(0) == []
+
+
+def test_retoma_pelo_last_event_id():
+    barramento = Barramento()
+    ultimo = barramento.publicar('mudanca', {'n': 1})
+    barramento.publicar('mudanca', {'n': 2})
+    barramento.publicar('mudanca', {'n': 3})
+    assinatura = barramento.assinar(ultimo)
+    assert [dados['n'] for _, _, dados in assinatura.aguardar(0)] == [2, 3]
+
+
+def test_id_de_outra_epoca_ou_fora_do_historico_manda_reset():
+    barramento = Barramento(historico=2)
+    primeiro = barramento.publicar('mudanca', {'n': 1})
+    for n in range(2, 6):
+        barramento.publicar('mudanca', {'n': n})
+    for ultimo_id in (primeiro, 'outraepoca-1'):
+        assert [tipo for _, tipo, _ in barramento.assinar(ultimo_id).aguardar(0)] == ['reset']
+
+
+def test_cliente_lento_fica_marcado_como_excedido():
+    barramento = Barramento(capacidade_cliente=2)
+    assinatura = barramento.assinar()
+    for n in range(3):
+        barramento.publicar('mudanca', {'n': n})
+    assert len(assinatura.aguardar(0)) == 2
+    assert assinatura.excedida
+    assinatura.fechar()
+    assert barramento.desconectados == 1 and barramento.clientes == 0
+
+
+def test_limite_de_clientes():
+    barramento = Barramento(maximo_clientes=1)
+    assinatura = barramento.assinar()
+    with pytest.raises(BarramentoCheio):
+        barramento.assinar()
+    assinatura.fechar()
+    barramento.assinar()
+
+
+def test_mudancas_levam_campos_e_counts_no_ultimo_evento(monkeypatch):
+    barramento = Barramento()
+    monkeypatch.setattr(eventos, 'BARRAMENTO', barramento)
+    assinatura = barramento.assinar()
+    eventos.publicar_mudancas([('consultas', 'UPDATE', 7, {'status': 'Confirmada'}),
+                               ('pacientes', 'UPDATE', 3, None)], counts={'pacientes': 1})
+    primeiro, segundo = [dados for _, _, dados in assinatura.aguardar(0)]
+    assert primeiro == {'entidade': 'consultas', 'acao': 'UPDATE', 'id': 7, 'campos': {'status': 'Confirmada'}}
+    assert segundo == {'entidade': 'pacientes', 'acao': 'UPDATE', 'id': 3, 'counts': {'pacientes': 1}}
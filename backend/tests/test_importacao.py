@@ -0,0 +1,21 @@
+from services import comandos, parametros
+
+
+def test_valores_do_json_que_nao_sao_texto():
+    linhas = [{'nome': 'Ana', 'cpf': 52998224725, 'telefone': 11999990000},
+              {'nome': 123, 'cpf': '111.444.777-35'},
+              'Bruno;11144477735',
+              {'nome': None, 'cpf': None}]
+    validos, erros = comandos.validar_importacao(linhas)
+    assert [(numero, valores[0], valores[1], valores[3], valores[6]) for numero, valores in validos] == [
+        (1, 'Ana', '52998224725', '11999990000', '52998224725'),
+        (2, '123', '111.444.777-35', None, '11144477735')]
+    assert erros == [{'linha': 3, 'cpf': '', 'erro': 'Linha inválida: esperado um objeto'},
+                     {'linha': 4, 'cpf': '', 'erro': 'Nome e CPF são obrigatórios'}]
+
+
+def test_corpo_da_importacao():
+    assert parametros.linhas_importacao({'pacientes': [{'nome': 'Ana'}, 1]}) == [{'nome': 'Ana'}, 1]
+    assert parametros.linhas_importacao([]) == []
+    assert parametros.linhas_importacao({'pacientes': 'x'}) is None
+    assert parametros.linhas_importacao(None) is None
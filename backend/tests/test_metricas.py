@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from services import metricas
+from services.metricas import Metricas, normalizar_sql
+
+
+class CursorBase:
+    """Como o pymysql e o aiomysql: o executemany chama o execute a cada linha."""
+    rowcount = 0
+
+    def execute(self, query, args=None):
+        self.rowcount = 1
+        return 1
+
+    def executemany(self, query, args):
+        for linha in args:
+            self.execute(query, linha)
+        self.rowcount = len(args)
+        return self.rowcount
+
+
+class CursorBaseAsync:
+    rowcount = 0
+
+    async def execute(self, query, args=None):
+        self.rowcount = 1
+        return 1
+
+    async def executemany(self, query, args):
+        for linha in args:
+            await self.execute(query, linha)
+        self.rowcount = len(args)
+        return self.rowcount
+
+
+class Cursor(metricas._Cronometrado, CursorBase):
+    pass
+
+
+class CursorAsync(metricas.CronometradoAsync, CursorBaseAsync):
+    pass
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    novo = Metricas()
+    monkeypatch.setattr(metricas, 'METRICAS', novo)
+    return novo
+
+
+def test_sql_normalizado_agrupa_valores_e_listas():
+    assert normalizar_sql("SELECT * FROM t\n  WHERE id IN (%s, %s,%s) AND nome = 'Ana' LIMIT 10") == \
+        'SELECT * FROM t WHERE id IN (...) AND nome = ? LIMIT ?'
+    assert normalizar_sql(b"INSERT INTO t VALUES (1,'a')") == 'INSERT INTO t VALUES (?,?)'
+
+
+@pytest.mark.parametrize('classe', [Cursor, CursorAsync])
+def test_executemany_conta_uma_query_so(registro, classe):
+    cursor = classe()
+
+    def rodar(resultado):
+        return asyncio.run(resultado) if asyncio.iscoroutine(resultado) else resultado
+
+    rodar(cursor.execute('SELECT * FROM pacientes WHERE id = %s', (1,)))
+    rodar(cursor.executemany('INSERT INTO auditoria VALUES (%s, %s)', [(1, 'a'), (2, 'b'), (3, 'c')]))
+    texto = registro.exportar()
+    assert 'medcore_db_query_segundos_count{sql="INSERT INTO auditoria VALUES (...)"} 1' in texto
+    assert 'medcore_db_query_linhas_total{sql="INSERT INTO auditoria VALUES (...)"} 3' in texto
+    assert 'medcore_db_query_segundos_count{sql="SELECT * FROM pacientes WHERE id = %s"} 1' in texto
+
+
+def test_query_lenta_acima_do_limite(registro, capsys):
+    registro.limite_lento_ms = 100
+    registro.observar_query('SELECT 1', 0.05, 1, 0)
+    registro.observar_query('SELECT  2', 0.25, 7, 3)
+    assert 'medcore_db_queries_lentas_total 1' in registro.exportar()
+    assert capsys.readouterr().out.strip() == '[DB] Query lenta: 250.0 ms, 3 binds, 7 linhas: SELECT ?'
+
+
+def test_exportacao_no_formato_do_prometheus(registro):
+    for segundos in (0.004, 0.02, 30):
+        registro.observar_rota('GET', '/api/pacientes', 200, segundos, {'db': 0.003})
+    linhas = registro.exportar([('medcore_pool_em_uso', 2, 'Conexões em uso.', [('no', 'primario "1"')])]).splitlines()
+    rotulos = 'metodo="GET",rota="/api/pacientes",status="200"'
+    # Baldes acumulados; o que passa do maior limite só aparece no +Inf
+    assert f'medcore_http_request_segundos_bucket{{{rotulos},le="0.005"}} 1' in linhas
+    assert f'medcore_http_request_segundos_bucket{{{rotulos},le="0.025"}} 2' in linhas
+    assert f'medcore_http_request_segundos_bucket{{{rotulos},le="10.0"}} 2' in linhas
+    assert f'medcore_http_request_segundos_bucket{{{rotulos},le="+Inf"}} 3' in linhas
+    assert f'medcore_http_request_segundos_count{{{rotulos}}} 3' in linhas
+    assert 'medcore_http_fase_segundos_count{metodo="GET",rota="/api/pacientes",fase="db"} 3' in linhas
+    assert linhas[-3:] == ['# HELP medcore_pool_em_uso Conexões em uso.', '# TYPE medcore_pool_em_uso gauge',
+                           'medcore_pool_em_uso{no="primario \\"1\\""} 2']
@@ -0,0 +1,73 @@
+import pytest
+from pymysql.err import ProgrammingError
+
+from services import migracoes
+
+
+def conexao(fabrica, versao=0, lock=1, **respostas):
+    return fabrica(respostas={'GET_LOCK': [{'ok': lock}], migracoes.SQL_VERSAO: [{'versao': versao}], **respostas})()
+
+
+@pytest.fixture
+def passos(monkeypatch):
+    """Três migrações falsas no lugar das reais; a lista guarda as que rodaram."""
+    rodadas = []
+
+    def migracao(numero):
+        def aplicar(conn, cur):
+            cur.execute(f'-- migração {numero}')
+            rodadas.append(numero)
+        return aplicar
+
+    monkeypatch.setattr(migracoes, 'MIGRACOES', [(n, f'passo {n}', migracao(n)) for n in (1, 2, 3)])
+    return rodadas
+
+
+def test_versao_do_banco(fabrica):
+    with conexao(fabrica, versao=5).cursor() as cur:
+        assert migracoes.versao(cur) == 5
+    # schema_version ainda não existe: banco nunca migrado
+    nunca = fabrica(respostas={'schema_version': ProgrammingError(1146, "Table 'schema_version' doesn't exist")})()
+    with nunca.cursor() as cur:
+        assert migracoes.versao(cur) == 0
+
+
+def test_aviso_de_versao():
+    atual = migracoes.VERSAO_ATUAL
+    assert migracoes.aviso_de_versao(atual) is None
+    assert 'python -m services.migracoes' in migracoes.aviso_de_versao(atual - 1)
+    assert 'mais nova' in migracoes.aviso_de_versao(atual + 1)
+    assert [numero for numero, _, _ in migracoes.MIGRACOES] == list(range(1, atual + 1))
+
+
+def test_aplica_so_as_pendentes_dentro_do_lock(fabrica, passos):
+    conn = conexao(fabrica, versao=1)
+    assert migracoes.aplicar(conn) == [2, 3]
+    assert passos == [2, 3]
+    assert conn.commits == 2     # a versão é gravada ao fim de cada migração
+    executadas = [' '.join(sql.split()) for sql in conn.executadas]
+    assert executadas[0].startswith('SELECT GET_LOCK') and executadas[-1].startswith('SELECT RELEASE_LOCK')
+    assert executadas.index('-- migração 2') < executadas.index('-- migração 3')
+    assert sum(migracoes.SQL_REGISTRAR in sql for sql in conn.executadas) == 2
+
+
+def test_para_na_versao_pedida_e_nao_refaz_as_aplicadas(fabrica, passos):
+    assert migracoes.aplicar(conexao(fabrica, versao=0), ate=2) == [1, 2]
+    assert migracoes.aplicar(conexao(fabrica, versao=3)) == []
+    assert passos == [1, 2]
+
+
+def test_sem_o_lock_nao_aplica_nada(fabrica, passos):
+    conn = conexao(fabrica, lock=0)
+    with pytest.raises(RuntimeError):
+        migracoes.aplicar(conn)
+    assert passos == [] and conn.commits == 0
+
+
+def test_falha_desfaz_e_solta_o_lock(fabrica, passos):
+    conn = conexao(fabrica, versao=0, **{'-- migração 2': RuntimeError('DDL falhou')})
+    with pytest.raises(RuntimeError, match='DDL falhou'):
+        migracoes.aplicar(conn)
+    # A 1 ficou gravada; a 2 roda de novo inteira na próxima execução
+    assert passos == [1] and conn.commits == 1
+    assert 'RELEASE_LOCK' in conn.executadas[-1]
@@ -0,0 +1,225 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+import pytest
+from pymysql.err import IntegrityError
+
+from services import comandos, roteiros
+from services.rotas import Pedido, criar_paciente_com_consulta
+from services.autocomplete import IndiceAutocomplete
+from services.db import Database, Transacao
+from services.operacoes import Operacoes
+
+HORARIO = IntegrityError(1062, f"Duplicate entry '1' for key '{comandos.INDICE_HORARIO}'")
+CPF_DUPLICADO = IntegrityError(1062, "Duplicate entry '1' for key 'cpf_digitos'")
+
+
+class CursorRegistrado:
+    lastrowid = 7
+    rowcount = 1
+
+    def __init__(self, banco):
+        self.banco = banco
+
+    def _falha(self, sql):
+        self.banco.log.append(' '.join(sql.split()).split(' (')[0])
+        for trecho, erro in list(self.banco.falhas.items()):
+            if trecho in sql:
+                return erro
+
+    def execute(self, sql, params=None):
+        erro = self._falha(sql)
+        if erro:
+            raise erro
+
+    def executemany(self, sql, linhas):
+        erro = self._falha(sql + ' (lote)')
+        if erro:
+            raise erro
+
+    def fetchone(self):
+        return {'status': 'Agendada'}
+
+    def fetchall(self):
+        return []
+
+
+class CursorRegistradoAsync(CursorRegistrado):
+    async def execute(self, sql, params=None):
+        CursorRegistrado.execute(self, sql, params)
+
+    async def executemany(self, sql, linhas):
+        CursorRegistrado.executemany(self, sql, linhas)
+
+    async def fetchone(self):
+        return CursorRegistrado.fetchone(self)
+
+
+class BancoFalso(Operacoes):
+    """Primitivas mínimas; _escrever é o do Database, com a transação registrada em `log`."""
+    _rodar = staticmethod(roteiros.rodar)
+    _escrever = Database._escrever
+
+    def __init__(self, falhas=None):
+        self.falhas = falhas or {}
+        self.log = []
+        self.transacoes = []
+        self.autocomplete = IndiceAutocomplete()
+
+    def _buscar(self, sql, params=None, primario=False):
+        self.log.append(' '.join(sql.split()).split(' WHERE')[0])
+        return []
+
+    @contextmanager
+    def _transacao(self):
+        t = Transacao(None)
+        t.cur = CursorRegistrado(self)
+        self.transacoes.append(t)
+        try:
+            yield t
+            self.log.append('COMMIT')
+        except Exception:
+            self.log.append('ROLLBACK')
+            raise
+
+
+def banco_async(falhas=None):
+    db_async = pytest.importorskip('services.db_async')
+
+    class BancoFalsoAsync(BancoFalso):
+        _rodar = staticmethod(roteiros.rodar_async)
+        _escrever = db_async.DatabaseAsync._escrever
+
+        async def _buscar(self, sql, params=None, primario=False):
+            return BancoFalso._buscar(self, sql, params, primario)
+
+        @asynccontextmanager
+        async def _transacao(self):
+            with BancoFalso._transacao(self) as t:
+                t.cur = CursorRegistradoAsync(self)
+                yield t
+
+    return BancoFalsoAsync(falhas)
+
+
+def nos_dois_modos(falhas, operacao):
+    """Roda a operação no banco síncrono e no assíncrono: (resultado ou exceção, log) de cada um."""
+    saidas = []
+    for banco in (BancoFalso(dict(falhas)), banco_async(dict(falhas))):
+        try:
+            resultado = operacao(banco)
+            if asyncio.iscoroutine(resultado):
+                resultado = asyncio.run(resultado)
+        except Exception as e:
+            resultado = e
+        saidas.append((resultado, banco.log))
+    return saidas
+
+
+def test_roteiro_recebe_o_erro_do_passo_no_yield():
+    def roteiro():
+        try:
+            yield lambda: 1 / 0
+        except ZeroDivisionError:
+            return (yield lambda: 'tratado')
+
+    async def passo_async():
+        return 'tratado'
+
+    def roteiro_async():
+        try:
+            yield lambda: 1 / 0
+        except ZeroDivisionError:
+            return (yield passo_async)
+
+    assert roteiros.rodar(roteiro()) == 'tratado'
+    assert asyncio.run(roteiros.rodar_async(roteiro_async())) == 'tratado'
+
+
+def test_horario_ocupado_vira_conflito_nos_dois_modos():
+    saidas = nos_dois_modos({'INSERT INTO consultas': HORARIO},
+                            lambda db: db.inserir_consulta(1, 'Clínica', '2026-01-05', '09:00'))
+    for erro, log in saidas:
+        assert isinstance(erro, comandos.HorarioOcupado)
+        assert str(erro) == 'Clínica já tem consulta em 2026-01-05 às 09:00'
+        assert log == ['INSERT INTO consultas', 'ROLLBACK']
+
+
+def paciente_com_consulta(db):
+    return db.inserir_paciente_com_consulta('Ana', '529.982.247-25', None, None, None, 'Clínica', '2026-01-05', '09:00')
+
+
+def test_paciente_e_consulta_no_mesmo_commit():
+    for banco in (BancoFalso(), banco_async()):
+        resultado = paciente_com_consulta(banco)
+        if asyncio.iscoroutine(resultado):
+            resultado = asyncio.run(resultado)
+        assert resultado == (7, 7)
+        assert banco.log == ['INSERT INTO pacientes', 'INSERT INTO consultas', 'COMMIT']
+        t, = banco.transacoes
+        assert t.contadores == {'pacientes': 1, 'consultas:Agendada': 1}
+        assert [(e, a) for e, a, _, _ in t.mudancas] == [('pacientes', 'INSERT'), ('consultas', 'INSERT')]
+        assert [evento[2:4] for evento in t.eventos] == [('Pacientes', 'INSERT'), ('Consultas', 'INSERT')]
+        assert len(t.callbacks) == 1
+
+
+def test_horario_ocupado_desfaz_o_cadastro_do_paciente():
+    for erro, log in nos_dois_modos({'INSERT INTO consultas': HORARIO}, paciente_com_consulta):
+        assert isinstance(erro, comandos.HorarioOcupado)
+        assert log == ['INSERT INTO pacientes', 'INSERT INTO consultas', 'ROLLBACK']
+
+
+def test_rota_com_consulta():
+    def chamar(banco, dados):
+        return roteiros.rodar(criar_paciente_com_consulta(lambda: banco, Pedido({}, dados, None, None)))
+
+    dados = {'nome': 'Ana', 'cpf': '52998224725', 'consulta': 'Clínica', 'data': '2026-01-05', 'hora': '09:00'}
+    assert chamar(BancoFalso(), dados) == ({'id': 7, 'consulta_id': 7}, 201)
+    assert chamar(BancoFalso(), dict(dados, cpf='123'))[1] == 400
+    banco = BancoFalso()
+    assert chamar(banco, dict(dados, hora='')) == ({'erro': 'Consulta, data e hora são obrigatórios'}, 400)
+    assert banco.log == []
+    with pytest.raises(comandos.HorarioOcupado):
+        chamar(BancoFalso({'INSERT INTO consultas': HORARIO}), dados)
+
+
+def test_cpf_duplicado_no_cadastro_com_consulta():
+    for erro, log in nos_dois_modos({'INSERT INTO pacientes': CPF_DUPLICADO},
+                                    lambda db: db.inserir_paciente_com_consulta(
+                                        'Ana', '52998224725', None, None, None, 'Clínica', '2026-01-05', '09:00')):
+        assert isinstance(erro, IntegrityError) and erro.args == ('CPF já cadastrado',)
+        assert log == ['INSERT INTO pacientes', 'ROLLBACK']
+
+
+def test_cpf_invalido_nao_abre_transacao():
+    for erro, log in nos_dois_modos({}, lambda db: db.inserir_paciente('Ana', '123', None, None, None)):
+        assert isinstance(erro, ValueError)
+        assert log == []
+
+
+def test_falha_na_atualizacao_de_status_vira_nao_encontrado():
+    for resultado, log in nos_dois_modos({'UPDATE consultas': CPF_DUPLICADO},
+                                         lambda db: db.atualizar_status_consulta(3, 'Cancelada')):
+        assert resultado is False
+        assert log == ['SELECT status FROM consultas WHERE id=%s FOR UPDATE', 'UPDATE consultas SET status=%s WHERE id=%s',
+                       'ROLLBACK']
+
+
+def test_importacao_refaz_linha_a_linha_quando_o_lote_falha():
+    falhas = {'(lote)': CPF_DUPLICADO, 'INSERT INTO pacientes': CPF_DUPLICADO}
+    linhas = [{'nome': 'Ana', 'cpf': '52998224725'}]
+    for relatorio, log in nos_dois_modos(falhas, lambda db: db.importar_pacientes(linhas)):
+        assert relatorio == {'total': 1, 'inseridos': 0,
+                             'erros': [{'linha': 1, 'cpf': '52998224725', 'erro': 'CPF já cadastrado'}]}
+        assert log == ['SELECT cpf_digitos FROM pacientes', 'INSERT INTO pacientes', 'ROLLBACK',
+                       'SAVEPOINT linha', 'INSERT INTO pacientes', 'ROLLBACK TO SAVEPOINT linha', 'COMMIT']
+
+
+def test_autocomplete_so_carrega_na_primeira_busca():
+    banco = BancoFalso()
+    cargas = []
+    banco._atualizar_autocomplete = lambda: cargas.append(banco.autocomplete.iniciar_carga())
+    assert cargas == [] and not banco.autocomplete.pronto
+    # Enquanto a carga roda, a busca vai direto ao banco
+    assert banco.buscar_autocomplete('mar') == []
+    assert cargas == [True] and len(banco.log) == 1 and banco.log[0].endswith('FROM pacientes')
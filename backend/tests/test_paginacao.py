@@ -0,0 +1,54 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from services import comandos
+from services.paginacao import codificar_cursor, decodificar_cursor, limite_da_requisicao
+from services.serializacao import Resultado
+
+
+def test_cursor_ida_e_volta():
+    cursor = codificar_cursor(datetime(2026, 1, 5, 9, 30), 42)
+    assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+    assert decodificar_cursor(cursor, 2) == ['2026-01-05 09:30:00', 42]
+    assert decodificar_cursor(codificar_cursor(date(2026, 1, 5), timedelta(hours=9), 7), 3) == ['2026-01-05', '9:00:00', 7]
+
+
+@pytest.mark.parametrize('cursor', ['nao-e-base64!', codificar_cursor(1), 'e30', ''])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor, 2)
+
+
+def test_limite_da_requisicao():
+    assert limite_da_requisicao(None) == 100
+    assert limite_da_requisicao('', padrao=10) == 10
+    assert limite_da_requisicao('5000') == 1000
+    assert limite_da_requisicao('20', maximo=50) == 20
+    for valor in ('0', '-1', 'dez', '1.5'):
+        with pytest.raises(ValueError):
+            limite_da_requisicao(valor)
+
+
+def test_pagina_corta_a_linha_extra_e_aponta_para_a_ultima():
+    linhas = Resultado([{'id': i, 'data_hora': datetime(2026, 1, 1, 12, i)} for i in (5, 4, 3)], descricao='d')
+    registros, proximo = comandos.pagina(linhas, 2, 'data_hora', 'id')
+    assert [r['id'] for r in registros] == [5, 4] and registros.descricao == 'd'
+    assert decodificar_cursor(proximo, 2) == ['2026-01-01 12:04:00', 4]
+    assert comandos.pagina(linhas, 3, 'data_hora', 'id') == (linhas, None)
+
+
+def test_keyset_da_auditoria_continua_depois_do_cursor():
+    sql, params = comandos.sql_auditoria(101, codificar_cursor(datetime(2026, 1, 1, 12, 4), 4), modulo='Pacientes')
+    assert '(data_hora < %s OR (data_hora = %s AND id < %s))' in sql
+    assert 'ORDER BY data_hora DESC, id DESC' in sql
+    assert params == ['Pacientes', '2026-01-01 12:04:00', '2026-01-01 12:04:00', 4, 101]
+
+
+def test_keyset_das_consultas_usa_data_hora_e_id():
+    cursor = codificar_cursor(date(2026, 1, 5), timedelta(hours=9), 3)
+    sql, params = comandos.sql_consultas(51, cursor)
+    assert '(c.data < %s OR (c.data = %s AND (c.hora < %s OR (c.hora = %s AND c.id < %s))))' in sql
+    assert params == ['2026-01-05', '2026-01-05', '9:00:00', '9:00:00', 3, 51]
+    with pytest.raises(ValueError):
+        comandos.sql_consultas(51, codificar_cursor('2026-01-05', 3))
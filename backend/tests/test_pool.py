@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+from pymysql.constants import SERVER_STATUS
+from pymysql.err import IntegrityError, OperationalError
+
+from services.pool import ConnectionPool, PoolEsgotado
+
+
+def test_reusa_a_ultima_conexao_devolvida(fabrica):
+    abrir = fabrica()
+    pool = ConnectionPool(abrir, min_size=0, max_size=3)
+    primeira, segunda = pool.obter(), pool.obter()
+    pool.devolver(primeira)
+    pool.devolver(segunda)
+    assert pool.obter() is segunda
+    estatisticas = pool.estatisticas()
+    assert (estatisticas['total'], estatisticas['em_uso'], estatisticas['livres']) == (2, 1, 1)
+    assert estatisticas['checkouts'] == 3 and len(abrir.criadas) == 2
+
+
+def test_esgotado_dentro_do_tempo_limite(fabrica):
+    pool = ConnectionPool(fabrica(), min_size=0, max_size=1, timeout=0.05)
+    pool.obter()
+    with pytest.raises(PoolEsgotado):
+        pool.obter()
+    assert pool.estatisticas()['timeouts'] == 1
+
+
+def test_espera_a_devolucao_de_outra_thread(fabrica):
+    pool = ConnectionPool(fabrica(), min_size=0, max_size=1, timeout=2)
+    conexao = pool.obter()
+    threading.Timer(0.05, pool.devolver, (conexao,)).start()
+    assert pool.obter() is conexao
+    assert pool.estatisticas()['esperas'] == 1
+
+
+def test_erro_de_rede_descarta_e_erro_de_sql_devolve(fabrica):
+    pool = ConnectionPool(fabrica(), min_size=0, max_size=2)
+    with pytest.raises(IntegrityError):
+        with pool.conexao():
+            raise IntegrityError(1062, 'Duplicate entry')
+    assert pool.estatisticas()['livres'] == 1
+
+    with pytest.raises(OperationalError):
+        with pool.conexao() as conexao:
+            raise OperationalError(2013, 'Lost connection to MySQL server')
+    assert conexao.fechada
+    estatisticas = pool.estatisticas()
+    assert (estatisticas['total'], estatisticas['livres'], estatisticas['descartadas']) == (0, 0, 1)
+
+
+def test_transacao_pela_metade_volta_desfeita(fabrica):
+    pool = ConnectionPool(fabrica(), min_size=0, max_size=1)
+    conexao = pool.obter()
+    desfeitas = []
+    conexao.rollback = lambda: desfeitas.append(conexao)
+    conexao.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+    pool.devolver(conexao)
+    assert desfeitas == [conexao]
+    assert pool.obter() is conexao
+
+
+def test_conexao_que_nao_responde_ao_ping_e_trocada(fabrica):
+    abrir = fabrica()
+    pool = ConnectionPool(abrir, min_size=1, max_size=1, ping_apos=0)
+    morta = abrir.criadas[0]
+    morta.fechada = True   # o servidor derrubou o socket enquanto estava no pool
+    nova = pool.obter()
+    assert nova is not morta and nova.pings == 0
+    assert pool.estatisticas()['descartadas'] == 1
+
+
+def test_conexao_velha_e_trocada_sem_ping(fabrica):
+    abrir = fabrica()
+    pool = ConnectionPool(abrir, min_size=1, max_size=1, max_lifetime=0.01)
+    time.sleep(0.02)
+    assert pool.obter() is abrir.criadas[1]
+    assert abrir.criadas[0].fechada and abrir.criadas[0].pings == 0
+
+
+def test_falha_ao_abrir_libera_a_vaga(fabrica):
+    chamadas = []
+
+    def abrir():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            raise OperationalError(2003, "Can't connect to MySQL server")
+        return fabrica()()
+
+    pool = ConnectionPool(abrir, min_size=0, max_size=1, timeout=0.05)
+    with pytest.raises(OperationalError):
+        pool.obter()
+    assert pool.obter() is not None
+
+
+def test_fechar_descarta_as_livres_e_recusa_checkout(fabrica):
+    abrir = fabrica()
+    pool = ConnectionPool(abrir, min_size=2, max_size=2)
+    pool.fechar()
+    assert all(conexao.fechada for conexao in abrir.criadas)
+    with pytest.raises(PoolEsgotado):
+        pool.obter()
+
+
+def test_tamanhos_invalidos(fabrica):
+    with pytest.raises(ValueError):
+        ConnectionPool(fabrica(), min_size=3, max_size=2)
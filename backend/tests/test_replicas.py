@@ -0,0 +1,132 @@
+import contextvars
+
+import pytest
+from pymysql.err import OperationalError
+
+from services import replicas
+from services.db import Database
+from services.pool import ConnectionPool, PoolEsgotado
+from services.replicas import No, Roteador
+
+
+def em_requisicao(funcao):
+    # Cada requisição tem o próprio contexto (o contextvar do read-your-writes)
+    def executar():
+        replicas.nova_requisicao()
+        return funcao()
+    return contextvars.copy_context().run(executar)
+
+
+def roteador_com(fabrica, replica_linhas=(), replica_erro=None, replica_max=2):
+    primario = No('primario', ConnectionPool(fabrica('primario', [{'id': 1}]), min_size=0, max_size=2),
+                  replica=False)
+    replica = No('r1', ConnectionPool(fabrica('r1', replica_linhas, replica_erro), min_size=0,
+                                      max_size=replica_max, timeout=0))
+    return Roteador(primario, [replica])
+
+
+def database_com(roteador):
+    # Só o roteamento: _buscar e _iterar não usam mais nada do Database
+    db = Database.__new__(Database)
+    db.roteador = roteador
+    return db
+
+
+# ======================================================
+# CONFIGURAÇÃO
+# ======================================================
+def test_dsn_completa_ou_so_host():
+    padrao = {'port': 3306, 'user': 'root', 'password': 'x', 'database': 'medcore'}
+    assert replicas.ler_replicas('r1:3307, mysql://leitor:s%40nha@r2/outro', padrao) == [
+        {'host': 'r1', 'port': 3307, 'user': 'root', 'password': 'x', 'database': 'medcore'},
+        {'host': 'r2', 'port': 3306, 'user': 'leitor', 'password': 's@nha', 'database': 'outro'},
+    ]
+    # Lista "replicas" do registro de clínicas, e DB_REPLICAS vazio ou ausente
+    assert replicas.ler_replicas(['r1:3307', ' '], padrao) == [
+        {'host': 'r1', 'port': 3307, 'user': 'root', 'password': 'x', 'database': 'medcore'}]
+    assert replicas.ler_replicas('', padrao) == replicas.ler_replicas(None, padrao) == []
+
+
+def test_atraso_do_status():
+    assert replicas.atraso_do_status(None) == 0.0
+    assert replicas.atraso_do_status({'Seconds_Behind_Source': 4}) == 4.0
+    assert replicas.atraso_do_status({'Seconds_Behind_Master': None}) is None
+
+
+# ======================================================
+# ROTEAMENTO
+# ======================================================
+def test_rodizio_pula_replica_fora_do_ar_ou_atrasada(fabrica):
+    roteador = roteador_com(fabrica)
+    outra = No('r2', None)
+    roteador.replicas.append(outra)
+    nomes = em_requisicao(lambda: [roteador.para_leitura().nome for _ in range(4)])
+    assert nomes == ['r1', 'r2', 'r1', 'r2']
+
+    roteador.registrar_check(outra, atraso=roteador.atraso_maximo + 1)
+    roteador.registrar_check(roteador.replicas[0], erro=OSError('recusada'))
+    assert em_requisicao(lambda: roteador.para_leitura().nome) == 'primario'
+
+
+def test_leitura_depois_de_escrita_vai_ao_primario(fabrica):
+    roteador = roteador_com(fabrica)
+
+    def escreve_e_le():
+        antes = roteador.para_leitura().nome
+        replicas.marcar_escrita()
+        return antes, roteador.para_leitura().nome
+
+    assert em_requisicao(escreve_e_le) == ('r1', 'primario')
+    # A requisição seguinte volta para as réplicas
+    assert em_requisicao(lambda: roteador.para_leitura().nome) == 'r1'
+
+
+# ======================================================
+# DESVIO PARA O PRIMÁRIO
+# ======================================================
+def test_buscar_desvia_de_replica_fora_do_ar(fabrica):
+    roteador = roteador_com(fabrica, replica_erro=OperationalError(2013, 'Lost connection'))
+    linhas = em_requisicao(lambda: database_com(roteador)._buscar('SELECT 1'))
+    assert linhas == [{'id': 1}]
+    replica = roteador.replicas[0]
+    assert not replica.saudavel and replica.erros == 1
+
+
+def test_buscar_desvia_de_replica_sem_conexao_livre(fabrica):
+    roteador = roteador_com(fabrica, replica_max=1)
+    replica = roteador.replicas[0]
+    ocupada = replica.pool.obter()
+    linhas = em_requisicao(lambda: database_com(roteador)._buscar('SELECT 1'))
+    assert linhas == [{'id': 1}]
+    # Ocupada não é fora do ar: segue no rodízio
+    assert replica.saudavel and replica.erros == 1
+    replica.pool.devolver(ocupada)
+
+
+def test_iterar_desvia_antes_do_primeiro_bloco(fabrica):
+    roteador = roteador_com(fabrica, replica_max=1)
+    replica = roteador.replicas[0]
+    ocupada = replica.pool.obter()
+    blocos = em_requisicao(lambda: list(database_com(roteador)._iterar('SELECT 1')))
+    assert blocos == [[{'id': 1}]]
+    assert replica.erros == 1
+    replica.pool.devolver(ocupada)
+    assert roteador.primario.pool.estatisticas()['em_uso'] == 0
+
+
+def test_iterar_usa_a_replica_quando_ela_responde(fabrica):
+    roteador = roteador_com(fabrica, replica_linhas=[{'id': n} for n in range(5)])
+    blocos = em_requisicao(lambda: list(database_com(roteador)._iterar('SELECT 1', lote=2)))
+    assert [len(b) for b in blocos] == [2, 2, 1]
+    assert roteador.replicas[0].pool.estatisticas()['em_uso'] == 0
+
+
+def test_primario_nao_tem_para_onde_desviar(fabrica):
+    roteador = roteador_com(fabrica)
+    roteador.replicas.clear()
+    roteador.primario.pool = ConnectionPool(fabrica(erro=OperationalError(2013, 'Lost connection')), min_size=0)
+    with pytest.raises(OperationalError):
+        em_requisicao(lambda: database_com(roteador)._buscar('SELECT 1'))
+    with pytest.raises(PoolEsgotado):
+        roteador.primario.pool.fechar()
+        em_requisicao(lambda: list(database_com(roteador)._iterar('SELECT 1')))
@@ -0,0 +1,119 @@
+import pytest
+
+from services import tenants
+from services.tenants import TenantAusente, TenantDesconhecido, Tenants
+
+PADRAO = {'host': 'db', 'port': 3306, 'user': 'root', 'password': 'x', 'database': 'medcore'}
+PROXIES = tenants.ler_proxies('10.0.0.0/8, 127.0.0.1')
+
+
+class BancoFalso:
+    def __init__(self, nome):
+        self.nome = nome
+        self.fechado = False
+
+    def fechar(self):
+        self.fechado = True
+
+
+def criar_tenants(*nomes, **opcoes):
+    criados = []
+
+    def criar(nome, conexao):
+        criados.append(BancoFalso(nome))
+        return criados[-1]
+
+    registro = {nome: {**PADRAO, 'database': f'medcore_{nome}'} for nome in nomes}
+    return Tenants(registro, criar, **opcoes), criados
+
+
+# ======================================================
+# REGISTRO
+# ======================================================
+def test_registro_inline_com_nome_do_banco_ou_dsn():
+    registro = tenants.ler_registro('clinica-a=medcore_a, clinica-b=mysql://u:s@db2:3307/medcore_b', padrao=PADRAO)
+    assert registro['clinica-a'] == {**PADRAO, 'database': 'medcore_a'}
+    assert registro['clinica-b']['host'] == 'db2' and registro['clinica-b']['port'] == 3307
+
+
+@pytest.mark.parametrize('texto', ['clinica-a=', 'Clinica A=medcore_a'])
+def test_registro_invalido(texto):
+    with pytest.raises(ValueError):
+        tenants.ler_registro(texto, padrao=PADRAO)
+
+
+# ======================================================
+# RESOLUÇÃO
+# ======================================================
+def test_subdominio():
+    assert tenants.resolver(None, 'clinica-a.medcore.com.br:443', dominio='medcore.com.br') == 'clinica-a'
+
+
+def test_cabecalho_vale_so_vindo_de_proxy_confiavel():
+    assert tenants.resolver(' Clinica-B ', 'api', origem='10.1.2.3', proxies=PROXIES) == 'clinica-b'
+    assert tenants.resolver('clinica-b', 'api', padrao='clinica-a', origem='203.0.113.9',
+                            proxies=PROXIES) == 'clinica-a'
+    with pytest.raises(TenantAusente):
+        tenants.resolver('clinica-b', 'api', origem='203.0.113.9', proxies=PROXIES)
+
+
+def test_sem_proxies_configurados_o_cabecalho_e_ignorado():
+    with pytest.raises(TenantAusente):
+        tenants.resolver('clinica-b', 'api', origem='127.0.0.1')
+
+
+def test_subdominio_tem_prioridade_sobre_o_cabecalho():
+    assert tenants.resolver('clinica-b', 'clinica-a.medcore.com.br', dominio='medcore.com.br',
+                            origem='127.0.0.1', proxies=PROXIES) == 'clinica-a'
+
+
+def test_proxies_invalidos():
+    with pytest.raises(ValueError):
+        tenants.ler_proxies('10.0.0.0/33')
+
+
+# ======================================================
+# DATABASE POR CLÍNICA
+# ======================================================
+def test_um_database_por_clinica_criado_no_primeiro_uso():
+    registro, criados = criar_tenants('a', 'b')
+    assert registro.obter('a') is registro.obter('a')
+    registro.obter('b')
+    assert [db.nome for db in criados] == ['a', 'b']
+    with pytest.raises(TenantDesconhecido):
+        registro.obter('c')
+
+
+def test_ocioso_e_fechado_so_quando_devolvido():
+    registro, criados = criar_tenants('a', ocioso=60)
+    registro.obter('a')
+    registro._ativos['a'].ultimo_uso -= 120
+    registro.despejar_ociosos()
+    assert not criados[0].fechado  # ainda em uso por uma requisição
+
+    registro.devolver('a')
+    registro._ativos['a'].ultimo_uso -= 120
+    registro._proxima_limpeza = 0
+    registro.despejar_ociosos()
+    assert criados[0].fechado and registro.despejados == 1
+    assert registro.obter('a') is criados[1]
+
+
+def test_acima_do_maximo_fecha_o_menos_usado():
+    registro, criados = criar_tenants('a', 'b', 'c', maximo_ativos=2)
+    for nome in ('a', 'b'):
+        registro.obter(nome)
+        registro.devolver(nome)
+    registro.obter('a')
+    registro.devolver('a')
+    registro.obter('c')
+    assert sorted(registro.ativos()) == ['a', 'c']
+    assert [db.nome for db in criados if db.fechado] == ['b']
+
+
+def test_estatisticas_por_clinica():
+    registro, _ = criar_tenants('a')
+    registro.obter('a')
+    registro.observar('a', 500, 0.25)
+    clinica = registro.estatisticas()['clinicas']['a']
+    assert clinica['em_uso'] == 1 and clinica['erros'] == 1 and clinica['segundos'] == 0.25
@@ -40,6 +40,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     lista.forEach(c => {
       const tr = document.createElement("tr");
+      tr.dataset.id = c.id;
 
       tr.innerHTML = `
         <td>${c.id}</td>
@@ -80,6 +81,17 @@ document.addEventListener("DOMContentLoaded", () => {
     listarCargos();
   });
 
+  // Mudanças de outras estações (/api/events): exclusões saem da tabela, o resto recarrega
+  if (typeof ouvirMudancas === "function") {
+    ouvirMudancas(["cargos"], m => {
+      if (m.acao === "DELETE" && m.id) {
+        CARGOS_CACHE = CARGOS_CACHE.filter(c => c.id !== m.id);
+        return removerLinha(tabelaBody, m.id);
+      }
+      return false;
+    }, listarCargos);
+  }
+
   btnSearch.addEventListener("click", listarCargos);
   btnNew.addEventListener("click", limparForm);
   btnNewForm.addEventListener("click", limparForm);
@@ -7,11 +7,31 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Elementos de Busca
   const searchNome = document.getElementById("search_nome");
+  const sugestoesPacientes = document.getElementById("sugestoes_pacientes");
   const searchConsulta = document.getElementById("search_consulta");
   const btnSearch = document.getElementById("btn_search");
 
-  let pacientesPorId = {};
+  // Filtros aplicados no servidor
+  const filtroDataInicio = document.getElementById("filtro_data_inicio");
+  const filtroDataFim = document.getElementById("filtro_data_fim");
+  const filtroStatus = document.getElementById("filtro_status");
+  const btnCarregarMais = document.getElementById("btn_carregar_mais");
+
   let consultasAtuais = []; // Cache local para saber qual paciente excluir
+  let proximoCursor = null;
+
+  // Paciente escolhido no autocomplete: filtra no servidor por paciente_id
+  let pacienteSelecionado = null;
+  let sugestoesAtuais = new Map(); // texto da opção → id do paciente
+  let esperaSugestoes = null;
+  let ultimaBusca = 0;
+
+  // A recepção abre na agenda de hoje em vez de todo o histórico
+  if (filtroDataInicio && !filtroDataInicio.value) {
+    const hoje = new Date();
+    hoje.setMinutes(hoje.getMinutes() - hoje.getTimezoneOffset());
+    filtroDataInicio.value = hoje.toISOString().slice(0, 10);
+  }
 
   // ==============================
   // FORMATAR DATA (dd/mm/aaaa)
@@ -47,63 +67,95 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   // ==============================
-  // CARREGAR PACIENTES (MAPA)
+  // FILTROS DO SERVIDOR
+  // ==============================
+  function montarFiltros() {
+    const params = new URLSearchParams();
+    if (filtroDataInicio && filtroDataInicio.value) params.set("data_inicio", filtroDataInicio.value);
+    if (filtroDataFim && filtroDataFim.value) params.set("data_fim", filtroDataFim.value);
+    if (filtroStatus && filtroStatus.value) params.set("status", filtroStatus.value);
+    // Nome e tipo vão para o servidor: filtram todas as páginas, não só as já carregadas
+    if (pacienteSelecionado) params.set("paciente_id", pacienteSelecionado);
+    else if (searchNome && searchNome.value.trim()) params.set("nome", searchNome.value.trim());
+    if (searchConsulta && searchConsulta.value.trim()) params.set("consulta", searchConsulta.value.trim());
+    return params;
+  }
+
+  // ==============================
+  // AUTOCOMPLETE DE PACIENTES
   // ==============================
-  async function carregarPacientes() {
+  function textoSugestao(p) {
+    return p.cpf ? `${p.nome} — ${p.cpf}` : p.nome;
+  }
+
+  async function buscarSugestoes(termo) {
+    const busca = ++ultimaBusca;
     try {
-      const res = await fetch(API_PACIENTES);
+      const res = await fetch(`${API_PACIENTES}/autocomplete?q=${encodeURIComponent(termo)}&limit=10`);
       if (!res.ok) throw new Error("Erro ao buscar pacientes");
       const pacientes = await res.json();
-      pacientesPorId = {};
-      pacientes.forEach(p => {
-        if (p.id) pacientesPorId[p.id] = p.nome;
+      if (busca !== ultimaBusca) return; // Já digitaram outra coisa
+
+      sugestoesAtuais = new Map(pacientes.map(p => [textoSugestao(p), p.id]));
+      sugestoesPacientes.innerHTML = "";
+      sugestoesAtuais.forEach((_, texto) => {
+        const opcao = document.createElement("option");
+        opcao.value = texto;
+        sugestoesPacientes.appendChild(opcao);
       });
     } catch (err) {
-      console.error("Erro ao carregar pacientes:", err);
+      console.error("Erro no autocomplete de pacientes:", err);
+    }
+  }
+
+  function aoDigitarNome() {
+    const valor = searchNome.value.trim();
+
+    // Opção escolhida na lista: busca as consultas só daquele paciente
+    if (sugestoesAtuais.has(valor)) {
+      pacienteSelecionado = sugestoesAtuais.get(valor);
+      listar();
+      return;
     }
+
+    const tinhaPaciente = pacienteSelecionado !== null;
+    pacienteSelecionado = null;
+    if (tinhaPaciente) listar();
+
+    clearTimeout(esperaSugestoes);
+    if (valor.length < 2) {
+      sugestoesPacientes.innerHTML = "";
+      return;
+    }
+    esperaSugestoes = setTimeout(() => buscarSugestoes(valor), 150);
   }
 
   // ==============================
   // LISTAR CONSULTAS (COM FILTROS)
   // ==============================
-  async function listar() {
+  async function listar(acrescentar = false) {
     try {
-      await carregarPacientes();
+      const params = montarFiltros();
+      if (acrescentar && proximoCursor) params.set("after", proximoCursor);
 
-      const res = await fetch(API_CONSULTAS);
+      const res = await fetch(`${API_CONSULTAS}?${params.toString()}`);
       if (!res.ok) throw new Error("Erro ao listar consultas");
 
-      consultasAtuais = await res.json();
-      let consultasParaExibir = [...consultasAtuais];
-
-      // Aplicar filtros de pesquisa
-      const queryNome = searchNome ? searchNome.value.trim().toLowerCase() : "";
-      const queryConsulta = searchConsulta ? searchConsulta.value.trim().toLowerCase() : "";
-
-      if (queryNome || queryConsulta) {
-        consultasParaExibir = consultasParaExibir.filter(c => {
-          const nomePaciente = (
-            pacientesPorId[c.paciente_id] ||
-            c.paciente_nome ||
-            ""
-          ).toLowerCase();
-          const tipoConsulta = (c.consulta || "").toLowerCase();
-          const matchNome = queryNome ? nomePaciente.includes(queryNome) : true;
-          const matchConsulta = queryConsulta ? tipoConsulta.includes(queryConsulta) : true;
-          return matchNome && matchConsulta;
-        });
-      }
+      const dados = await res.json();
+      consultasAtuais = acrescentar ? consultasAtuais.concat(dados.registros) : dados.registros;
+      proximoCursor = dados.proximo;
+      if (btnCarregarMais) btnCarregarMais.style.display = proximoCursor ? "" : "none";
 
       lista.innerHTML = "";
-      if (consultasParaExibir.length === 0) {
+      if (consultasAtuais.length === 0) {
         lista.innerHTML = `<tr><td colspan="7" class="sem-dados" style="text-align:center;">Nenhuma consulta encontrada.</td></tr>`;
         return;
       }
 
-      consultasParaExibir.forEach(c => {
-        const nomePaciente = pacientesPorId[c.paciente_id] || c.paciente_nome || "Paciente não vinculado";
+      consultasAtuais.forEach(c => {
+        const nomePaciente = c.paciente_nome || "Paciente não vinculado";
         lista.innerHTML += `
-          <tr>
+          <tr data-id="${c.id}">
             <td>${c.id || "-"}</td>
             <td>${nomePaciente}</td>
             <td>${c.consulta || "-"}</td>
@@ -138,6 +190,12 @@ document.addEventListener("DOMContentLoaded", () => {
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ status })
       });
+      if (res.status === 409) {
+        const erro = await res.json();
+        alert(erro.erro || "O horário desta consulta já foi ocupado.");
+        listar();
+        return;
+      }
       if (!res.ok) throw new Error("Erro ao atualizar status");
       listar();
     } catch (err) {
@@ -176,10 +234,53 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   };
 
+  // ==============================
+  // MUDANÇAS DE OUTRAS ESTAÇÕES (/api/events)
+  // ==============================
+  function aplicarMudanca(m) {
+    if (m.entidade === "pacientes") {
+      // Paciente novo sem consulta não aparece aqui; com consulta, chega também um evento de consultas
+      if (m.acao === "INSERT") return true;
+      // Nome editado: recarrega. Excluir o paciente apaga as consultas dele (ON DELETE CASCADE)
+      if (m.acao !== "DELETE" || !m.id) return false;
+      consultasAtuais
+        .filter(c => c.paciente_id === m.id)
+        .forEach(c => removerLinha(lista, c.id));
+      consultasAtuais = consultasAtuais.filter(c => c.paciente_id !== m.id);
+      return true;
+    }
+
+    if (!m.id) return false;
+    if (m.acao === "DELETE") {
+      consultasAtuais = consultasAtuais.filter(c => c.id !== m.id);
+      return removerLinha(lista, m.id);
+    }
+    if (m.acao === "UPDATE" && m.campos && m.campos.status) {
+      const consulta = consultasAtuais.find(c => c.id === m.id);
+      if (!consulta) return true;  // fora da página carregada
+      const statusFiltrados = filtroStatus && filtroStatus.value ? filtroStatus.value.split(",") : null;
+      if (statusFiltrados && !statusFiltrados.includes(m.campos.status)) {
+        consultasAtuais = consultasAtuais.filter(c => c.id !== m.id);
+        return removerLinha(lista, m.id);
+      }
+      consulta.status = m.campos.status;
+      const select = lista.querySelector(`tr[data-id="${m.id}"] .status-select`);
+      if (select) select.value = m.campos.status;
+      return true;
+    }
+    // Consulta nova: a posição e os filtros dependem do servidor
+    return false;
+  }
+
+  if (typeof ouvirMudancas === "function") ouvirMudancas(["consultas", "pacientes"], aplicarMudanca, () => listar());
+
   // EVENTOS DE BUSCA
-  if (btnSearch) btnSearch.addEventListener("click", listar);
+  if (btnSearch) btnSearch.addEventListener("click", () => listar());
   if (searchNome) searchNome.addEventListener("keypress", (e) => { if (e.key === 'Enter') listar(); });
+  if (searchNome && sugestoesPacientes) searchNome.addEventListener("input", aoDigitarNome);
   if (searchConsulta) searchConsulta.addEventListener("keypress", (e) => { if (e.key === 'Enter') listar(); });
+  if (filtroStatus) filtroStatus.addEventListener("change", () => listar());
+  if (btnCarregarMais) btnCarregarMais.addEventListener("click", () => listar(true));
 
   // INIT
   listar();
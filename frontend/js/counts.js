@@ -1,33 +1,132 @@
-
-const updateCounts = async () => {
-  const elCargos = document.getElementById('count-cargos');
-  const elFuncs = document.getElementById('count-funcionarios');
-  const elRels = document.getElementById('count-relatorios');
-  if (!elCargos && !elFuncs && !elRels) return;
-
-  try {
-    const res = await fetch(`${API_URL}/counts`);
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const data = await res.json();
-
-    if (elCargos) elCargos.textContent = (data.cargos ?? 0).toString();
-    if (elFuncs)  elFuncs.textContent  = (data.funcionarios ?? 0).toString();
-
-    // mostra "—" se relatorios não existir (null), senão número
-    if (elRels) {
-      elRels.textContent = (data.relatorios === null || data.relatorios === undefined) ? '—' : data.relatorios.toString();
-    }
-  } catch (err) {
-    console.error('Erro ao buscar counts:', err);
-    if (elCargos) elCargos.textContent = '!';
-    if (elFuncs)  elFuncs.textContent  = '!';
-    if (elRels)   elRels.textContent   = '!';
-  }
-};
-
-// inicia ao carregar e repete a cada 5s
-document.addEventListener('DOMContentLoaded', () => {
-  updateCounts();
-  setInterval(updateCounts, 5000);
-});
-
+const renderCounts = (data) => {
+  const elCargos = document.getElementById('count-cargos');
+  const elFuncs = document.getElementById('count-funcionarios');
+  const elRels = document.getElementById('count-relatorios');
+
+  if (elCargos) elCargos.textContent = (data.cargos ?? 0).toString();
+  if (elFuncs)  elFuncs.textContent  = (data.funcionarios ?? 0).toString();
+
+  // mostra "—" se relatorios não existir (null), senão número
+  if (elRels) {
+    elRels.textContent = (data.relatorios === null || data.relatorios === undefined) ? '—' : data.relatorios.toString();
+  }
+};
+
+const temCounts = () =>
+  Boolean(document.getElementById('count-cargos') || document.getElementById('count-funcionarios') ||
+          document.getElementById('count-relatorios'));
+
+const updateCounts = async () => {
+  if (!temCounts()) return;
+
+  try {
+    const res = await fetch(`${API_URL}/counts`);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    renderCounts(await res.json());
+  } catch (err) {
+    console.error('Erro ao buscar counts:', err);
+    ['count-cargos', 'count-funcionarios', 'count-relatorios'].forEach((id) => {
+      const el = document.getElementById(id);
+      if (el) el.textContent = '!';
+    });
+  }
+};
+
+// ==============================
+// POLLING (só quando não há SSE)
+// ==============================
+let pollingId = null;
+
+const iniciarPolling = () => {
+  if (pollingId) return;
+  updateCounts();
+  pollingId = setInterval(updateCounts, 5000);
+};
+
+const pararPolling = () => {
+  clearInterval(pollingId);
+  pollingId = null;
+};
+
+// ==============================
+// EVENTOS DO SERVIDOR (/api/events)
+// ==============================
+// As telas de listagem ouvem as mudanças por ouvirMudancas (abaixo)
+const conectarEventos = () => {
+  if (!window.EventSource) {
+    iniciarPolling();
+    return;
+  }
+
+  const fonte = new EventSource(`${API_URL}/events`);
+  let falhas = 0;
+
+  fonte.addEventListener('open', () => {
+    falhas = 0;
+    pararPolling();
+  });
+
+  fonte.addEventListener('counts', (e) => renderCounts(JSON.parse(e.data)));
+
+  fonte.addEventListener('mudanca', (e) => {
+    const mudanca = JSON.parse(e.data);
+    if (mudanca.counts) renderCounts(mudanca.counts);
+    document.dispatchEvent(new CustomEvent('medcore:mudanca', { detail: mudanca }));
+  });
+
+  // Eventos perdidos (cliente lento ou servidor reiniciado): recarrega os totais
+  fonte.addEventListener('reset', () => {
+    updateCounts();
+    document.dispatchEvent(new CustomEvent('medcore:reset'));
+  });
+
+  fonte.addEventListener('error', () => {
+    // O EventSource reconecta sozinho; se continuar falhando (ex.: 503 por limite), volta ao polling
+    falhas += 1;
+    if (fonte.readyState === EventSource.CLOSED || falhas >= 3) {
+      fonte.close();
+      iniciarPolling();
+      setTimeout(() => { pararPolling(); conectarEventos(); }, 60000);
+    }
+  });
+};
+
+let eventosIniciados = false;
+
+const iniciarEventos = () => {
+  if (eventosIniciados) return;
+  eventosIniciados = true;
+  conectarEventos();
+};
+
+// ==============================
+// MUDANÇAS NAS TELAS DE LISTAGEM
+// ==============================
+// aplicar(mudanca) devolve true quando já atualizou a tabela; senão a lista é recarregada,
+// uma vez por rajada de eventos. Um 'reset' (eventos perdidos) também recarrega.
+const ouvirMudancas = (entidades, aplicar, recarregar) => {
+  let espera = null;
+  const agendarRecarga = () => {
+    clearTimeout(espera);
+    espera = setTimeout(recarregar, 300);
+  };
+
+  document.addEventListener('medcore:mudanca', (e) => {
+    const mudanca = e.detail;
+    if (!entidades.includes(mudanca.entidade)) return;
+    if (!aplicar(mudanca)) agendarRecarga();
+  });
+  document.addEventListener('medcore:reset', agendarRecarga);
+  iniciarEventos();
+};
+
+// Remove a linha <tr data-id="..."> do registro excluído (se estiver na página)
+const removerLinha = (tbody, id) => {
+  const linha = tbody.querySelector(`tr[data-id="${id}"]`);
+  if (linha) linha.remove();
+  return true;
+};
+
+document.addEventListener('DOMContentLoaded', () => {
+  if (temCounts()) iniciarEventos();
+});
@@ -87,6 +87,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     FUNCIONARIOS_CACHE.forEach(f => {
       const tr = document.createElement("tr");
+      tr.dataset.id = f.id;
 
       tr.innerHTML = `
         <td>${f.id}</td>
@@ -122,6 +123,23 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
+  // Mudanças de outras estações (/api/events): exclusões saem da tabela, o resto recarrega
+  // (cargo renomeado muda a coluna de cargo, e a lista de cargos do formulário)
+  if (typeof ouvirMudancas === "function") {
+    ouvirMudancas(["funcionarios", "cargos"], m => {
+      if (m.entidade === "funcionarios" && m.acao === "DELETE" && m.id) {
+        FUNCIONARIOS_CACHE = FUNCIONARIOS_CACHE.filter(f => f.id !== m.id);
+        return removerLinha(tabelaBody, m.id);
+      }
+      return false;
+    }, async () => {
+      const cargoEscolhido = cargoSelect.value;
+      await carregarCargos();
+      cargoSelect.value = cargoEscolhido;
+      listarFuncionarios();
+    });
+  }
+
   form.addEventListener("submit", async e => {
     e.preventDefault();
 
@@ -2,7 +2,6 @@ document.addEventListener("DOMContentLoaded", () => {
   console.log("paciente.js carregado");
 
   const API_PACIENTES = API_URL + "/pacientes";
-  const API_CONSULTAS = API_URL + "/consultas";
 
   // ==============================
   // ELEMENTOS
@@ -66,6 +65,23 @@ document.addEventListener("DOMContentLoaded", () => {
     inputId.value = "";
   }
 
+  function linhaPaciente(p) {
+    return `
+          <tr data-id="${p.id}">
+            <td>${p.id || "-"}</td>
+            <td>${p.nome || "-"}</td>
+            <td>${p.cpf || "-"}</td>
+            <td>${formatarDataBR(p.data_nascimento)}</td>
+            <td>${p.telefone || "-"}</td>
+            <td>${p.email || "-"}</td>
+            <td>
+              <button class="btn btn-secondary btn-sm" onclick="editar(${p.id})">✏️</button>
+              <button class="btn btn-danger btn-sm" onclick="excluir(${p.id})">🗑️</button>
+            </td>
+          </tr>
+        `;
+  }
+
   // ==============================
   // LISTAR PACIENTES (COM BUSCA)
   // ==============================
@@ -88,20 +104,7 @@ document.addEventListener("DOMContentLoaded", () => {
       }
 
       pacientes.forEach(p => {
-        lista.innerHTML += `
-          <tr>
-            <td>${p.id || "-"}</td>
-            <td>${p.nome || "-"}</td>
-            <td>${p.cpf || "-"}</td>
-            <td>${formatarDataBR(p.data_nascimento)}</td>
-            <td>${p.telefone || "-"}</td>
-            <td>${p.email || "-"}</td>
-            <td>
-              <button class="btn btn-secondary btn-sm" onclick="editar(${p.id})">✏️</button>
-              <button class="btn btn-danger btn-sm" onclick="excluir(${p.id})">🗑️</button>
-            </td>
-          </tr>
-        `;
+        lista.innerHTML += linhaPaciente(p);
       });
     } catch (err) {
       console.error("Erro ao listar pacientes:", err);
@@ -139,9 +142,17 @@ document.addEventListener("DOMContentLoaded", () => {
         email: email.value.trim()
       };
 
+      // Novo cadastro: paciente e consulta numa requisição só (mesma transação no servidor)
+      if (!isEdicao) {
+        paciente.consulta = consulta.value;
+        paciente.data = dataConsulta.value;
+        paciente.hora = horaConsulta.value;
+        paciente.status = "Agendada";
+      }
+
       const urlPaciente = isEdicao
         ? `${API_PACIENTES}/${inputId.value}`
-        : API_PACIENTES;
+        : `${API_PACIENTES}/com-consulta`;
 
       const methodPaciente = isEdicao ? "PUT" : "POST";
 
@@ -152,33 +163,11 @@ document.addEventListener("DOMContentLoaded", () => {
       });
 
       if (!resPaciente.ok) {
-        const errorData = await resPaciente.json();
+        // 409: o horário da especialidade já foi ocupado (o paciente não é gravado)
+        const errorData = await resPaciente.json().catch(() => ({}));
         throw new Error(errorData.erro || "Erro ao salvar paciente.");
       }
 
-      const pacienteSalvo = await resPaciente.json();
-
-      // Se for novo cadastro, cria a consulta vinculada
-      if (!isEdicao) {
-        const consultaObj = {
-          paciente_id: pacienteSalvo.id,
-          consulta: consulta.value,
-          data: dataConsulta.value,
-          hora: horaConsulta.value,
-          status: "Agendada"
-        };
-
-        const resConsulta = await fetch(API_CONSULTAS, {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(consultaObj)
-        });
-
-        if (!resConsulta.ok) {
-          throw new Error("Paciente salvo, mas erro ao criar consulta.");
-        }
-      }
-
       limparForm();
       listar();
       alert(isEdicao ? "Paciente atualizado com sucesso!" : "Paciente e consulta cadastrados com sucesso!");
@@ -255,6 +244,38 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   };
 
+  // ==============================
+  // MUDANÇAS DE OUTRAS ESTAÇÕES (/api/events)
+  // ==============================
+  async function atualizarLinha(id) {
+    const linha = lista.querySelector(`tr[data-id="${id}"]`);
+    if (!linha) return;  // fora da lista aberta
+    try {
+      const res = await fetch(`${API_PACIENTES}/${id}`);
+      if (res.status === 404) {
+        linha.remove();
+        return;
+      }
+      if (!res.ok) throw new Error("Erro ao buscar paciente");
+      linha.outerHTML = linhaPaciente(await res.json());
+    } catch (err) {
+      console.error("Erro ao atualizar paciente na lista:", err);
+    }
+  }
+
+  function aplicarMudanca(m) {
+    if (!m.id) return false;  // importação em lote: recarrega
+    if (m.acao === "DELETE") return removerLinha(lista, m.id);
+    if (m.acao === "UPDATE") {
+      atualizarLinha(m.id);
+      return true;
+    }
+    // Paciente novo: a ordem e a busca dependem do servidor
+    return false;
+  }
+
+  if (typeof ouvirMudancas === "function") ouvirMudancas(["pacientes"], aplicarMudanca, listar);
+
   // ==============================
   // EVENTOS DE BUSCA
   // ==============================
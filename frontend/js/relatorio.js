@@ -1,42 +1,61 @@
-
 if(!window.API_URL){
   var el = document.createElement('script'); el.src = "../js/config.js"; document.head.appendChild(el);
 }
 
 const tabelaBody = document.querySelector('#tabela_relatorio tbody');
 const btnFilter = document.getElementById('btn_filter');
+const btnExport = document.getElementById('btn_export');
 
 async function fetchCargos(){
   const res = await fetch(`${API_URL}/cargos`);
   return res.json();
 }
-async function fetchFuncionarios(nome='', cargo=''){
-  // cargo filter: we'll filter clientside by cargo id if backend doesn't support direct join filter param
-  const res = await fetch(`${API_URL}/funcionarios?nome=${encodeURIComponent(nome)}`);
+
+// Filtro, contagem e folha por cargo saem prontos do servidor (um GROUP BY só)
+function urlRelatorio(nome='', cargo=''){
+  const params = new URLSearchParams();
+  if (nome) params.set('nome', nome);
+  if (cargo) params.set('cargo_id', cargo);
+  return `${API_URL}/relatorios/funcionarios?${params.toString()}`;
+}
+
+async function fetchRelatorio(nome='', cargo=''){
+  const res = await fetch(urlRelatorio(nome, cargo));
+  if (!res.ok) {
+    const erro = await res.json().catch(() => ({}));
+    throw new Error(erro.erro || 'Erro ao gerar relatório');
+  }
   return res.json();
 }
 
-function renderRelatorio(funcs){
+function renderRelatorio(relatorio){
   tabelaBody.innerHTML = '';
 
- 
-  funcs.forEach((f, idx) => {
+  relatorio.cargos.forEach((c, idx) => {
     const tr = document.createElement('tr');
 
-
     tr.innerHTML = `
       <td>${idx + 1}</td>
-      <td>${f.nome || ''}</td>
-      <td>${f.telefone || ''}</td>
-      <td>${f.cargo_nome || f.cargo || ''}</td>
-      <td>${f.cargo_salario || ''}</td>
+      <td>${c.cargo || ''}</td>
+      <td>${c.funcionarios}</td>
+      <td>${c.salario || ''}</td>
+      <td>${c.folha || ''}</td>
     `;
     tabelaBody.appendChild(tr);
   });
 
-  
+  const total = document.createElement('tr');
+  total.innerHTML = `
+    <td></td>
+    <td><strong>Total</strong></td>
+    <td><strong>${relatorio.totais.funcionarios}</strong></td>
+    <td>${relatorio.totais.media_salario || ''}</td>
+    <td><strong>${relatorio.totais.folha || ''}</strong></td>
+  `;
+  tabelaBody.appendChild(total);
+
   try {
-    localStorage.setItem('relatorios_count', String(funcs.length));
+    localStorage.setItem('relatorios_count', String(relatorio.totais.funcionarios));
   } catch (e) {
     // se storage falhar, não atrapalha a renderização
     console.warn('Não foi possível salvar relatorios_count em localStorage', e);
@@ -54,13 +73,25 @@ async function loadFilters(){
   });
 }
 
+function filtrosAtuais(){
+  return [document.getElementById('filter_nome').value, document.getElementById('filter_cargo').value];
+}
+
 btnFilter.onclick = async ()=>{
-  const nome = document.getElementById('filter_nome').value;
-  const cargo = document.getElementById('filter_cargo').value;
-  const funcs = await fetchFuncionarios(nome);
-  const filtered = cargo ? funcs.filter(f=> String(f.cargo_id) === String(cargo)) : funcs;
-  renderRelatorio(filtered);
+  try {
+    renderRelatorio(await fetchRelatorio(...filtrosAtuais()));
+  } catch (err) {
+    console.error(err);
+    alert(err.message);
+  }
 };
 
+if (btnExport) {
+  // CSV gerado e enviado linha a linha pelo servidor
+  btnExport.onclick = ()=>{
+    window.location.href = `${urlRelatorio(...filtrosAtuais())}&stream=csv`;
+  };
+}
+
 loadFilters();
 btnFilter.click();